@@ -0,0 +1,144 @@
+"""
+Benchmark of the dedup kernel (common_function.latestRowMask) against the previous
+sort_values + drop_duplicates implementation of deduplicateRecords / mergeSilver.
+
+The input mimics a bronze delta: several ingestion batches, each holding a random subset
+of (date, title) keys, so a key appears once per batch with a distinct _tf_ingestion_time.
+Every measurement runs in a fresh process; peak memory is numpy/python allocations
+(tracemalloc) plus the arrow memory pool (arrow-backed strings).
+
+Usage (from the repository root):
+    python benchmark/dedup_benchmark.py
+    python benchmark/dedup_benchmark.py --rows 3000000 --batches 4 --strings object
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline"))
+
+KEYS = ['date', 'title']
+ORDER_BY = '_tf_ingestion_time'
+
+
+def makeDelta(rows: int, batches: int, strings: str, seed: int = 0) -> pd.DataFrame:
+    """Synthetic bronze delta with revenues_per_day columns and duplicate keys across batches."""
+    rng = np.random.default_rng(seed)
+    string_dtype = pd.StringDtype("pyarrow") if strings == "arrow" else object
+
+    per_batch = rows // batches
+    dates = pd.date_range("2000-01-01", periods=max(per_batch // 100, 1)).strftime("%Y-%m-%d").to_numpy()
+    titles = np.array([f"Movie title {i}" for i in range(1000)])
+    distributors = np.array([f"Distributor {i}" for i in range(60)])
+
+    parts = []
+    for batch in range(batches):
+        # a batch holds every key at most once - duplicates come from later batches
+        key = np.unique(rng.integers(0, len(dates) * len(titles), per_batch))
+        parts.append(pd.DataFrame({
+            'id': pd.array([f"{batch}-{k}" for k in key], dtype=string_dtype),
+            'date': pd.array(dates[key // len(titles)], dtype=string_dtype),
+            'title': pd.array(titles[key % len(titles)], dtype=string_dtype),
+            'revenue': rng.integers(0, 5_000_000, len(key)),
+            'theaters': rng.integers(1, 4_000, len(key)),
+            'distributor': pd.array(distributors[rng.integers(0, len(distributors), len(key))], dtype=string_dtype),
+            '_tf_ingestion_time': 1_700_000_000 + batch * 86_400,
+            '_tf_ingestion_date': pd.array([f"2023-11-{14 + batch:02d}"] * len(key), dtype=string_dtype)
+        }))
+
+    # interleave batches the way a bronze scan returns them (file order is not time order)
+    df = pd.concat(parts[::-1], ignore_index=True)
+    return df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+
+def previousDeduplicate(df: pd.DataFrame) -> pd.DataFrame:
+    """deduplicateRecords before the kernel: full sort, then drop_duplicates on the keys."""
+    df_sorted = df.sort_values(by=ORDER_BY, ascending=False)
+    return df_sorted.drop_duplicates(subset=KEYS, keep='first').reset_index(drop=True)
+
+
+def kernelDeduplicate(df: pd.DataFrame) -> pd.DataFrame:
+    from common_function import latestRowMask
+
+    return df[latestRowMask(df, KEYS, ORDER_BY, ties='first')].reset_index(drop=True)
+
+
+def previousMerge(df: pd.DataFrame) -> pd.DataFrame:
+    """mergeSilver / mergePartitions before the kernel: stable sort, keep last per key."""
+    df_sorted = df.sort_values(by=ORDER_BY, ascending=True, kind="stable")
+    return df_sorted.drop_duplicates(subset=KEYS, keep='last')
+
+
+def kernelMerge(df: pd.DataFrame) -> pd.DataFrame:
+    from common_function import latestRowMask
+
+    return df[latestRowMask(df, KEYS, ORDER_BY)]
+
+
+IMPLEMENTATIONS = {
+    'deduplicate': (previousDeduplicate, kernelDeduplicate),
+    'merge': (previousMerge, kernelMerge),
+}
+
+
+def _measure(task: tuple) -> dict:
+    """Run one implementation in this (fresh) process: seconds, peak MB and kept ids."""
+    import tracemalloc
+    import pyarrow as pa
+
+    operation, variant, rows, batches, strings = task
+    df = makeDelta(rows, batches, strings)
+    function = IMPLEMENTATIONS[operation][0 if variant == "previous" else 1]
+
+    pool = pa.default_memory_pool()
+    arrow_before = pool.bytes_allocated()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(df)
+    seconds = time.perf_counter() - start
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_peak = max(pool.max_memory() - arrow_before, 0)
+
+    return {'seconds': seconds, 'peak_mb': (python_peak + arrow_peak) / 2**20,
+            'rows_in': len(df), 'rows_out': len(result), 'ids': set(result['id'])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dedup kernel against sort + drop_duplicates")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="rows of the synthetic delta")
+    parser.add_argument("--batches", type=int, default=3, help="ingestion batches (duplicates per key)")
+    parser.add_argument("--strings", choices=["arrow", "object"], default="arrow",
+                        help="string columns as readTable returns them (arrow) or python objects")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per implementation, best time is reported")
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows, {args.batches} batches, {args.strings} strings")
+    print(f"{'operation':<12} {'variant':<9} {'rows in':>10} {'rows out':>10} {'best s':>8} {'peak MB':>8}")
+
+    for operation in IMPLEMENTATIONS:
+        results = {}
+        for variant in ("previous", "kernel"):
+            runs = []
+            for _ in range(args.repeat):
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    runs.append(pool.submit(_measure, (operation, variant, args.rows, args.batches, args.strings)).result())
+            best = min(runs, key=lambda run: run['seconds'])
+            results[variant] = best
+            print(f"{operation:<12} {variant:<9} {best['rows_in']:>10} {best['rows_out']:>10} "
+                  f"{best['seconds']:>8.2f} {max(run['peak_mb'] for run in runs):>8.0f}")
+
+        same = results['previous']['ids'] == results['kernel']['ids']
+        speedup = results['previous']['seconds'] / results['kernel']['seconds']
+        print(f"{operation:<12} {'':<9} same rows kept: {same}, speedup {speedup:.1f}x")
+        if not same:
+            raise SystemExit(f"{operation}: kernel keeps different rows than the previous implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Local stand-in for the OMDB API, for benchmarks and offline runs of OMDB-Bronze.
+
+Answers GET /?apikey=...&t=<title> like www.omdbapi.com: a movie record for most titles
+(fields derived from a hash of the title, so every run gets the same answers) and
+{"Response": "False", "Error": "Movie not found!"} for not_found_rate of them. Optional
+latency per request and a request limit ("Request limit reached!") reproduce the
+behaviour fetchOMDBData has to cope with.
+
+Point the OMDB-Bronze config "source" -> "url" at it (any OMDB_API_KEY is accepted):
+
+    python benchmark/mock_omdb.py --port 8765 --latency-ms 20
+
+or in-process:
+
+    with MockOMDBServer(latency_ms=20) as server:
+        fetchOMDBData(titles, api_key="benchmark", base_url=server.url)
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family",
+          "Fantasy", "Horror", "Mystery", "Romance", "Sci-Fi", "Thriller"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def movieRecord(title: str) -> dict:
+    """OMDB response of a found title - every field is a function of the title."""
+    digest = hashlib.sha256(title.encode("utf-8")).digest()
+    value = lambda i, n: digest[i] % n
+
+    year = 1980 + value(0, 45)
+    rating = 1 + value(1, 90) / 10
+    genres = sorted({GENRES[value(2, len(GENRES))], GENRES[value(3, len(GENRES))]})
+    box_office = "N/A" if value(4, 10) == 0 else f"${int.from_bytes(digest[5:8], 'big') * 10:,}"
+
+    return {
+        "Title": title,
+        "Year": str(year),
+        "Rated": ["G", "PG", "PG-13", "R"][value(8, 4)],
+        "Released": f"{1 + value(9, 28):02d} {MONTHS[value(10, 12)]} {year}",
+        "Runtime": f"{80 + value(11, 100)} min",
+        "Genre": ", ".join(genres),
+        "Director": f"Director {value(12, 200)}",
+        "Writer": f"Writer {value(13, 200)}",
+        "Actors": f"Actor {value(14, 250)}, Actor {value(15, 250)}",
+        "Plot": f"Plot of {title}.",
+        "Language": "English",
+        "Country": "United States",
+        "Awards": "N/A",
+        "Poster": "N/A",
+        "Ratings": [
+            {"Source": "Internet Movie Database", "Value": f"{rating:.1f}/10"},
+            {"Source": "Rotten Tomatoes", "Value": f"{value(16, 101)}%"},
+            {"Source": "Metacritic", "Value": f"{value(17, 101)}/100"}
+        ],
+        "Metascore": str(value(17, 101)),
+        "imdbRating": f"{rating:.1f}",
+        "imdbVotes": f"{int.from_bytes(digest[18:21], 'big'):,}",
+        "imdbID": f"tt{int.from_bytes(digest[21:25], 'big') % 10**7:07d}",
+        "Type": "movie",
+        "BoxOffice": box_office,
+        "Production": "N/A",
+        "Website": "N/A",
+        "Response": "True"
+    }
+
+
+class MockOMDBServer:
+    """
+    Threaded HTTP server answering like OMDB, run in a background thread.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 = any free port, see .url)
+        latency_ms: Delay added to every response
+        not_found_rate: Fraction of titles answered "Movie not found!"
+        request_limit: Requests answered before "Request limit reached!" (None = unlimited)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0,
+                 not_found_rate: float = 0.1, request_limit: int = None):
+        self.latency_ms = latency_ms
+        self.not_found_rate = not_found_rate
+        self.request_limit = request_limit
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def respond(self, query: dict) -> dict:
+        """Response body for the query parameters of one request."""
+        with self._lock:
+            self.requests += 1
+            limited = self.request_limit is not None and self.requests > self.request_limit
+        if limited:
+            return {"Response": "False", "Error": "Request limit reached!"}
+        if not query.get("apikey"):
+            return {"Response": "False", "Error": "No API key provided."}
+
+        title = query.get("t", "")
+        bucket = int.from_bytes(hashlib.md5(title.encode("utf-8")).digest()[-2:], "big") / 65536
+        if not title or bucket < self.not_found_rate:
+            return {"Response": "False", "Error": "Movie not found!"}
+        return movieRecord(title)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                body = json.dumps(server.respond(query)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockOMDBServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local mock of the OMDB API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every response")
+    parser.add_argument("--not-found-rate", type=float, default=0.1, help="fraction of titles not found")
+    parser.add_argument("--request-limit", type=int, default=None, help="requests before the rate limit error")
+    args = parser.parse_args()
+
+    server = MockOMDBServer(args.host, args.port, args.latency_ms, args.not_found_rate, args.request_limit)
+    print(f"✓ Mock OMDB API on {server.url} (Ctrl+C to stop)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+End-to-end benchmark of the medallion pipelines on synthetic data.
+
+Builds a scratch project (metadata/config copied from the repository, OMDB-Bronze pointed
+at a local mock of the OMDB API), writes a synthetic revenues_per_day.csv of --rows rows
+and runs every pipeline in dependency order, each in a fresh process. Later rounds write
+the next version of the snapshot (new days, late corrections of older rows) and run the
+DAG again, so the incremental paths are measured as well as the initial load.
+
+Per stage timings come from the run records of instrumentation.py (wall / cpu seconds,
+peak RSS, rows, bytes read / written of appendMode, loadBronzeInDelta, deduplicateRecords,
+mergeSilver, createHashKey, the gold builds, ...). The dashboard is measured with
+streamlit's AppTest in a fresh process: first load (gold read, arrow cache build), a
+rerun and a filter change.
+
+Results are written as JSON keyed by (round, pipeline, stage path) together with the
+commit, the environment and the parameters, so runs of different commits can be compared
+and a regression fails the run:
+
+    python benchmark/pipeline_benchmark.py --rows 100000
+    python benchmark/pipeline_benchmark.py --rows 100000 --baseline benchmark/results/<file>.json
+    python benchmark/pipeline_benchmark.py --compare <baseline>.json <candidate>.json
+
+(from the repository root; --engine duckdb runs the silver merges and rollups on DuckDB)
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+PIPELINE_DIR = os.path.join(REPO_DIR, "pipeline")
+DASHBOARD = os.path.join(REPO_DIR, "dashboard", "dashboard.py")
+
+sys.path.insert(0, PIPELINE_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from mock_omdb import MockOMDBServer  # noqa: E402
+from synthetic_data import generateRevenues  # noqa: E402
+
+# pipelines the engine option applies to (see duckdb_engine.py)
+ENGINE_PIPELINES = ["Revenues-Silver", "OMDB-Silver", "aggRevenues-Gold"]
+# stages printed in the summary - the JSON holds every recorded stage
+REPORTED_STAGES = ["run", "appendMode", "loadBronzeInDelta", "deduplicateRecords", "mergeSilver",
+                   "mergePartitions", "createHashKey", "lookupSurrogateKeys", "fetchOMDBData",
+                   "replaceByKey", "_revenueRollups", "revenueRollups", "cold", "rerun", "filter"]
+METRICS = ["wall_s", "cpu_s", "peak_rss_mb", "rows_in", "rows_out", "bytes_read", "bytes_written"]
+
+
+def scratchProject(root: str, omdb_url: str, engine: str = None) -> str:
+    """
+    Project root with the repository configs, OMDB-Bronze reading from omdb_url.
+
+    Returns:
+        str: Path of the revenues_per_day.csv Revenues-Bronze reads
+    """
+    config_dir = os.path.join(root, "metadata", "config")
+    shutil.copytree(os.path.join(REPO_DIR, "metadata", "config"), config_dir, dirs_exist_ok=True)
+    os.makedirs(os.path.join(root, "pipeline"), exist_ok=True)
+
+    def edit(pipeline_id, change):
+        config_path = os.path.join(config_dir, f"{pipeline_id}.json")
+        with open(config_path, "r") as f:
+            config = json.load(f)
+        change(config)
+        with open(config_path, "w") as f:
+            json.dump(config, f, indent=4)
+
+    def mockSource(config):
+        config['source']['url'] = omdb_url
+        config['source']['rate_per_second'] = 1000
+        config['source']['max_in_flight'] = 16
+
+    edit("OMDB-Bronze", mockSource)
+    if engine:
+        for pipeline_id in ENGINE_PIPELINES:
+            edit(pipeline_id, lambda config: config.update(engine={'name': engine}))
+
+    with open(os.path.join(config_dir, "Revenues-Bronze.json"), "r") as f:
+        return os.path.join(root, json.load(f)['source']['path'])
+
+
+def _runPipeline(task: tuple) -> list:
+    """Run one pipeline in this (fresh) process and return the records of its run."""
+    root, pipeline_id, log_path = task
+    os.environ['PROJECT_PATH'] = root
+    os.environ.setdefault('OMDB_API_KEY', "benchmark")
+    # metadata paths are resolved relative to pipeline/, like in the notebooks
+    os.chdir(os.path.join(root, "pipeline"))
+
+    from jobs import PIPELINES
+    from instrumentation import readRuns
+
+    with open(log_path, "a", encoding="utf-8") as log, redirect_stdout(log), redirect_stderr(log):
+        print(f"---- {pipeline_id} {datetime.now().isoformat()}")
+        PIPELINES[pipeline_id](pipeline_id)
+    return readRuns(pipeline_id)[-1]
+
+
+def _runDashboard(task: tuple) -> list:
+    """Load the dashboard on the scratch gold tables in this (fresh) process: first run, rerun, filter change."""
+    import resource
+    from streamlit.testing.v1 import AppTest
+
+    root, log_path = task
+    # the pipelines join Windows paths ("data\\03_gold\\") - elsewhere that is one directory name
+    gold_path = os.path.join(root, "data\\03_gold\\")
+    if os.sep != "\\":
+        os.makedirs(os.path.join(root, "data"), exist_ok=True)
+        link = os.path.join(root, "data", "03_gold")
+        if not os.path.lexists(link):
+            os.symlink(gold_path, link, target_is_directory=True)
+    os.environ['PROJECT_PATH'] = root
+
+    def selectDistributor(app):
+        distributor = app.sidebar.selectbox[0]
+        distributor.select(distributor.options[-1])
+
+    records = []
+    with open(log_path, "a", encoding="utf-8") as log, redirect_stdout(log), redirect_stderr(log):
+        app = AppTest.from_file(DASHBOARD, default_timeout=3600)
+        for name, action in [("cold", None), ("rerun", None), ("filter", selectDistributor)]:
+            if action:
+                action(app)
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            app.run()
+            records.append({
+                'pipeline_id': "dashboard", 'stage': name, 'path': f"dashboard/{name}",
+                'status': 'failed' if app.exception else 'success',
+                'wall_s': round(time.perf_counter() - wall_start, 6),
+                'cpu_s': round(time.process_time() - cpu_start, 6),
+                'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10, 1),
+                'rows_in': None, 'rows_out': None, 'bytes_read': 0, 'bytes_written': 0
+            })
+            if app.exception:
+                raise RuntimeError(f"Dashboard failed on {name}: {app.exception[0].value}")
+    return records
+
+
+def _pipelineOrder(task=None) -> list:
+    """Pipeline ids of the repository configs in dependency order."""
+    os.chdir(PIPELINE_DIR)
+    from runner import loadDag, topologicalOrder
+
+    _, dag = loadDag()
+    return topologicalOrder(dag)
+
+
+def _inFreshProcess(function, task):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(function, task).result()
+
+
+def runScenario(args, order: list, log_path: str) -> list:
+    """
+    One benchmark pass in a new scratch project: every round generates the next snapshot and runs the DAG.
+
+    Returns:
+        list: Stage records, each with its round
+    """
+    root = tempfile.mkdtemp(prefix="pipeline-benchmark-", dir=args.root)
+    records = []
+    try:
+        with MockOMDBServer(latency_ms=args.omdb_latency_ms, not_found_rate=args.omdb_not_found_rate) as omdb:
+            csv_path = scratchProject(root, omdb.url, None if args.engine == "pandas" else args.engine)
+
+            for round_number in range(1, args.rounds + 1):
+                if round_number > 1:
+                    # bronze partitions are keyed by the ingestion second
+                    time.sleep(1.1)
+
+                start = time.perf_counter()
+                stats = generateRevenues(csv_path, args.rows, version=round_number, new_days=args.new_days,
+                                         duplicate_rate=args.duplicate_rate, late_update_rate=args.late_update_rate,
+                                         seed=args.seed)
+                print(f"  round {round_number}: {stats['rows']} source rows ({stats['days']} days, "
+                      f"{stats['late_updates']} late updates) generated in {time.perf_counter() - start:.1f}s")
+
+                for pipeline_id in order:
+                    run = _inFreshProcess(_runPipeline, (root, pipeline_id, log_path))
+                    records.extend({**record, 'round': round_number} for record in run)
+                    summary = run[0]
+                    print(f"    {pipeline_id:<22} {summary['wall_s']:>8.2f}s  {summary['peak_rss_mb'] or 0:>7.0f} MB")
+
+                if args.dashboard:
+                    dashboard = _inFreshProcess(_runDashboard, (root, log_path))
+                    records.extend({**record, 'round': round_number} for record in dashboard)
+                    print(f"    {'dashboard':<22} {dashboard[0]['wall_s']:>8.2f}s  {dashboard[-1]['peak_rss_mb']:>7.0f} MB")
+    finally:
+        if args.keep:
+            print(f"  scratch project kept: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return records
+
+
+def aggregate(passes: list) -> dict:
+    """
+    Stages keyed "round/pipeline/path": per pass the calls of a path are summed (rows, bytes,
+    seconds) and peak RSS is the highest; over passes the best time and the highest peak are kept.
+    """
+    stages = {}
+    for records in passes:
+        per_pass = {}
+        for record in records:
+            key = f"{record['round']}/{record['pipeline_id']}/{record['path']}"
+            total = per_pass.setdefault(key, {'round': record['round'], 'pipeline_id': record['pipeline_id'],
+                                              'path': record['path'], 'stage': record['stage'], 'calls': 0,
+                                              **{metric: 0 for metric in METRICS}})
+            total['calls'] += 1
+            for metric in METRICS:
+                if metric == 'peak_rss_mb':
+                    total[metric] = max(total[metric], record.get(metric) or 0)
+                else:
+                    total[metric] += record.get(metric) or 0
+
+        for key, total in per_pass.items():
+            best = stages.get(key)
+            if best is None:
+                stages[key] = total
+                continue
+            peak = max(best['peak_rss_mb'], total['peak_rss_mb'])
+            if total['wall_s'] < best['wall_s']:
+                stages[key] = total
+            stages[key]['peak_rss_mb'] = peak
+    return stages
+
+
+def commitInfo() -> dict:
+    """Commit of the working tree and whether it has uncommitted changes (None outside of git)."""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip() != ""
+        return {'sha': sha, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'sha': None, 'dirty': None}
+
+
+def environment() -> dict:
+    versions = {}
+    for package in ("pandas", "pyarrow", "numpy", "duckdb", "streamlit"):
+        try:
+            versions[package] = __import__(package).__version__
+        except ImportError:
+            versions[package] = None
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'packages': versions}
+
+
+def compareResults(baseline: dict, candidate: dict, threshold: float = 1.25,
+                   min_seconds: float = 0.05, min_mb: float = 32) -> list:
+    """
+    Stages of candidate slower or more memory-hungry than in baseline.
+
+    A stage regresses when its wall time grows by more than threshold and min_seconds, or its
+    peak RSS by more than threshold and min_mb (the floors keep millisecond stages out of the noise).
+    Only stages present in both results are compared - compare runs with the same parameters.
+
+    Returns:
+        list: (stage key, metric, baseline value, candidate value)
+    """
+    regressions = []
+    for key, stage in candidate['stages'].items():
+        before = baseline['stages'].get(key)
+        if before is None:
+            continue
+        for metric, floor in (('wall_s', min_seconds), ('peak_rss_mb', min_mb)):
+            old, new = before[metric], stage[metric]
+            if new > old * threshold and new - old > floor:
+                regressions.append((key, metric, old, new))
+    return regressions
+
+
+def printComparison(baseline: dict, candidate: dict, regressions: list):
+    if baseline['parameters'] != candidate['parameters']:
+        print("⚠️  Results were produced with different parameters:")
+        for name in sorted(set(baseline['parameters']) | set(candidate['parameters'])):
+            if baseline['parameters'].get(name) != candidate['parameters'].get(name):
+                print(f"    {name}: {baseline['parameters'].get(name)} -> {candidate['parameters'].get(name)}")
+
+    print(f"{'stage':<76} {'base s':>8} {'new s':>8} {'ratio':>6}")
+    for key, stage in candidate['stages'].items():
+        before = baseline['stages'].get(key)
+        if before is None or stage['stage'] not in REPORTED_STAGES:
+            continue
+        ratio = stage['wall_s'] / before['wall_s'] if before['wall_s'] else float("nan")
+        print(f"{key:<76} {before['wall_s']:>8.2f} {stage['wall_s']:>8.2f} {ratio:>6.2f}")
+
+    base_commit, new_commit = baseline['commit']['sha'] or "?", candidate['commit']['sha'] or "?"
+    if not regressions:
+        print(f"✓ No regressions of {new_commit[:10]} against {base_commit[:10]}")
+        return
+    print(f"⚠️  {len(regressions)} regressions of {new_commit[:10]} against {base_commit[:10]}:")
+    for key, metric, old, new in regressions:
+        print(f"    {key} {metric}: {old:.2f} -> {new:.2f}")
+
+
+def printStages(stages: dict):
+    print(f"{'stage':<76} {'calls':>5} {'wall s':>8} {'cpu s':>8} {'rows out':>10} "
+          f"{'MB read':>8} {'MB written':>10} {'peak MB':>8}")
+    for key, stage in stages.items():
+        if stage['stage'] not in REPORTED_STAGES:
+            continue
+        print(f"{key:<76} {stage['calls']:>5} {stage['wall_s']:>8.2f} {stage['cpu_s']:>8.2f} "
+              f"{stage['rows_out']:>10} {stage['bytes_read'] / 2**20:>8.1f} "
+              f"{stage['bytes_written'] / 2**20:>10.1f} {stage['peak_rss_mb']:>8.0f}")
+
+
+def _readResult(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipelines and the dashboard on synthetic data")
+    parser.add_argument("--rows", type=int, default=100_000, help="approximate source rows of the first round")
+    parser.add_argument("--rounds", type=int, default=2, help="initial load plus incremental rounds")
+    parser.add_argument("--new-days", type=int, default=1, help="days every incremental round adds")
+    parser.add_argument("--duplicate-rate", type=float, default=0.01, help="fraction of source rows sent twice")
+    parser.add_argument("--late-update-rate", type=float, default=0.01,
+                        help="fraction of earlier rows corrected by every round")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["pandas", "duckdb"], default="pandas",
+                        help="engine of the silver merges and rollups")
+    parser.add_argument("--omdb-latency-ms", type=float, default=0, help="latency of the mock OMDB API")
+    parser.add_argument("--omdb-not-found-rate", type=float, default=0.1, help="titles the mock OMDB API does not know")
+    parser.add_argument("--no-dashboard", dest="dashboard", action="store_false", help="skip the dashboard stages")
+    parser.add_argument("--repeat", type=int, default=1, help="passes, best time per stage is reported")
+    parser.add_argument("--root", default=None, help="parent folder of the scratch projects (default: temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch projects")
+    parser.add_argument("--output", default=None, help="result file (default: benchmark/results/<commit>-<rows>-<engine>.json)")
+    parser.add_argument("--baseline", default=None, help="result file to compare with - regressions exit with 1")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown / memory growth ratio counted as regression")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="smallest slowdown counted as regression")
+    parser.add_argument("--min-mb", type=float, default=32, help="smallest memory growth counted as regression")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), default=None,
+                        help="only compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, candidate = map(_readResult, args.compare)
+        regressions = compareResults(baseline, candidate, args.threshold, args.min_seconds, args.min_mb)
+        printComparison(baseline, candidate, regressions)
+        sys.exit(1 if regressions else 0)
+
+    if args.dashboard:
+        try:
+            import streamlit  # noqa: F401
+        except ImportError:
+            print("⚠️  streamlit is not installed - dashboard stages are skipped")
+            args.dashboard = False
+
+    # pipeline modules are only imported by the worker processes
+    order = _inFreshProcess(_pipelineOrder, None)
+    commit = commitInfo()
+    log_path = os.path.join(tempfile.gettempdir(), f"pipeline-benchmark-{os.getpid()}.log")
+
+    print(f"{args.rows} rows, {args.rounds} rounds, engine {args.engine}, commit {(commit['sha'] or '?')[:10]}"
+          f"{' (uncommitted changes)' if commit['dirty'] else ''}, pipeline output in {log_path}")
+    passes = []
+    for repeat in range(args.repeat):
+        print(f"pass {repeat + 1}/{args.repeat}")
+        passes.append(runScenario(args, order, log_path))
+
+    parameters = {name: getattr(args, name) for name in ("rows", "rounds", "new_days", "duplicate_rate",
+                                                         "late_update_rate", "seed", "engine",
+                                                         "omdb_latency_ms", "omdb_not_found_rate", "dashboard")}
+    result = {
+        'created_at': datetime.now().isoformat(),
+        'commit': commit,
+        'environment': environment(),
+        'parameters': parameters,
+        'repeat': args.repeat,
+        'stages': aggregate(passes)
+    }
+
+    printStages(result['stages'])
+
+    output = args.output or os.path.join(BENCHMARK_DIR, "results",
+                                         f"{(commit['sha'] or 'nocommit')[:10]}-{args.rows}-{args.engine}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = f"{output}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=4)
+    os.replace(tmp_path, output)
+    print(f"✓ Results written to {output}")
+
+    if args.baseline:
+        regressions = compareResults(_readResult(args.baseline), result, args.threshold, args.min_seconds, args.min_mb)
+        printComparison(_readResult(args.baseline), result, regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Synthetic revenues_per_day.csv at any scale (10k - 100M rows) for the pipeline benchmark.
+
+Every movie runs in theaters for 2-93 days from its release day, so the file looks like the
+real source: one row per (date, title), movies overlapping in time, revenue decaying over
+the run, a few missing theaters / distributors ("-"). The file is a full snapshot like the
+one the external system drops daily. Successive versions of it add new days and correct
+some older rows:
+
+    version 1: days [0, days)
+    version k: days [0, days + (k - 1) * new_days), late_update_rate of the rows of
+               earlier days carry corrected revenue / theaters
+
+duplicate_rate of the rows are written twice in a row - same (date, title), a new id and
+a corrected revenue - the way re-sent rows show up in the source; bronze -> silver
+deduplication keeps the later one.
+
+All values are hashes of (movie, day, version), not draws from a random stream, so a
+version is the same file whatever the chunk size and versions share their unchanged rows.
+The file is written in chunks of days - memory is bounded by chunk_rows.
+
+Usage (from the repository root):
+    python benchmark/synthetic_data.py out.csv --rows 1000000
+    python benchmark/synthetic_data.py out.csv --rows 1000000 --version 2 --late-update-rate 0.02
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+MIN_RUN_DAYS, MAX_RUN_DAYS = 2, 93
+WORDS = np.array(["Dark", "Last", "Silent", "Golden", "Lost", "Wild", "Broken", "Hidden", "Final", "Red",
+                  "Night", "River", "City", "Star", "Road", "Storm", "Heart", "Shadow", "Dream", "Winter",
+                  "Empire", "Garden", "Island", "Machine", "Kingdom", "Legacy", "Promise", "Secret", "Signal", "Voyage"])
+DISTRIBUTORS = np.array([f"Distributor {i}" for i in range(60)] + ["-"])
+
+
+def _hash(*values) -> np.ndarray:
+    """Deterministic 64-bit mix (splitmix64) of integer arrays."""
+    with np.errstate(over="ignore"):
+        h = np.uint64(0x9E3779B97F4A7C15)
+        for value in values:
+            h = h ^ (np.asarray(value).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15))
+            h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            h = h ^ (h >> np.uint64(31))
+    return h
+
+
+def _unit(*values) -> np.ndarray:
+    """Deterministic uniform [0, 1) per element."""
+    return (_hash(*values) >> np.uint64(11)).astype(np.float64) / 2**53
+
+
+def movieTitles(movies: np.ndarray) -> np.ndarray:
+    """Title of every movie id - two words and the id, unique per movie."""
+    first = WORDS[_hash(movies, 1) % np.uint64(len(WORDS))]
+    second = WORDS[_hash(movies, 2) % np.uint64(len(WORDS))]
+    return np.char.add(np.char.add(np.char.add(first, " "), second), np.char.add(" ", movies.astype(str)))
+
+
+def layout(rows: int, days: int = None) -> dict:
+    """
+    Movie count and day span giving about rows rows in version 1.
+
+    Returns:
+        dict: {'movies', 'days', 'release', 'run_days'} - release day and run length per movie
+    """
+    mean_run = (MIN_RUN_DAYS + MAX_RUN_DAYS) / 2
+    days = days or max(60, rows // 5_000)
+    # releases spread over the version 1 span plus room for the days later versions add
+    horizon = int(days * 1.25) + 30
+    movies = max(int(rows / mean_run * horizon / days), 10)
+
+    ids = np.arange(movies)
+    release = (_hash(ids, 3) % np.uint64(horizon)).astype(np.int64) - MAX_RUN_DAYS // 2
+    run_days = MIN_RUN_DAYS + (_hash(ids, 4) % np.uint64(MAX_RUN_DAYS - MIN_RUN_DAYS + 1)).astype(np.int64)
+    return {'movies': movies, 'days': days, 'release': release, 'run_days': run_days}
+
+
+def _chunkRows(plan: dict, first_day: int, last_day: int) -> tuple:
+    """(movie, day) of every screening in [first_day, last_day), ordered by day then movie."""
+    release, run_days = plan['release'], plan['run_days']
+    active = np.flatnonzero((release < last_day) & (release + run_days > first_day))
+    start = np.maximum(release[active], first_day)
+    end = np.minimum(release[active] + run_days[active], last_day)
+
+    counts = end - start
+    movie = np.repeat(active, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    day = np.repeat(start, counts) + offsets
+
+    order = np.lexsort((movie, day))
+    return movie[order], day[order]
+
+
+def generateRevenues(path: str, rows: int, version: int = 1, days: int = None, new_days: int = 1,
+                     duplicate_rate: float = 0.01, late_update_rate: float = 0.0, seed: int = 0,
+                     chunk_rows: int = 1_000_000, start_date: str = "2000-01-01") -> dict:
+    """
+    Write version of the synthetic revenues_per_day.csv.
+
+    Args:
+        path: CSV file to write
+        rows: Approximate rows of version 1
+        version: Snapshot version (1 = first file)
+        days: Days covered by version 1 (default: scaled with rows)
+        new_days: Days every later version adds
+        duplicate_rate: Fraction of rows written twice (same key, new id, corrected revenue)
+        late_update_rate: Fraction of rows of earlier days corrected by every later version
+        seed: Changes every value of the data set
+        chunk_rows: Approximate rows generated and written at a time
+        start_date: Date of day 0
+
+    Returns:
+        dict: Written rows, duplicates, late updates, days and movies
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    plan = layout(rows, days)
+    last_day = plan['days'] + (version - 1) * new_days
+    days_per_chunk = max(1, int(chunk_rows / max(rows / plan['days'], 1)))
+    epoch = np.datetime64(start_date, "D")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    stats = {'rows': 0, 'duplicates': 0, 'late_updates': 0, 'days': last_day, 'movies': 0}
+    movies_seen = np.zeros(plan['movies'], dtype=bool)
+
+    schema = pa.schema([("id", pa.string()), ("date", pa.string()), ("title", pa.string()),
+                        ("revenue", pa.int64()), ("theaters", pa.int64()), ("distributor", pa.string())])
+
+    with pv.CSVWriter(tmp_path, schema) as writer:
+        for first_day in range(0, last_day, days_per_chunk):
+            movie, day = _chunkRows(plan, first_day, min(first_day + days_per_chunk, last_day))
+            if len(movie) == 0:
+                continue
+            movies_seen[movie] = True
+            age = day - plan['release'][movie]
+
+            # opening weekend sized per movie, decaying over the run, daily noise
+            opening = 1_000 + (_unit(movie, seed, 5) ** 3 * 20_000_000)
+            revenue = opening * np.exp(-age / (5 + plan['run_days'][movie] / 4)) * (0.7 + 0.6 * _unit(movie, day, seed, 6))
+            theaters = np.maximum(1, (opening / 5_000) * np.exp(-age / 30)).astype(np.int64)
+
+            # every later version corrects late_update_rate of the rows of the days before it
+            corrected = np.zeros(len(movie), dtype=bool)
+            for later in range(2, version + 1):
+                earlier_day = day < plan['days'] + (later - 2) * new_days
+                hit = earlier_day & (_unit(movie, day, later, seed, 7) < late_update_rate)
+                revenue = np.where(hit, revenue * (0.9 + 0.2 * _unit(movie, day, later, seed, 8)), revenue)
+                theaters = np.where(hit, theaters + 1, theaters)
+                corrected |= hit
+            stats['late_updates'] += int(corrected.sum())
+
+            duplicate = _unit(movie, day, seed, 9) < duplicate_rate
+            missing_theaters = _unit(movie, day, seed, 10) < 0.01
+            distributor = DISTRIBUTORS[_hash(movie, seed, 11) % np.uint64(len(DISTRIBUTORS))]
+
+            # duplicated rows follow their original, with the next id and a corrected revenue
+            repeat = np.where(duplicate, 2, 1)
+            position = np.repeat(np.arange(len(movie)), repeat)
+            second = np.zeros(len(position), dtype=bool)
+            second[1:] = position[1:] == position[:-1]
+
+            revenue = np.repeat(revenue.astype(np.int64), repeat)
+            revenue = np.where(second, (revenue * 1.01).astype(np.int64) + 1, revenue)
+            ids = np.char.add(np.char.add(np.repeat(movie, repeat).astype(str), "-"),
+                              (np.repeat(day, repeat) * 2 + second).astype(str))
+            dates = np.datetime_as_string(epoch + np.repeat(day, repeat), unit="D")
+
+            writer.write_table(pa.table({
+                "id": ids,
+                "date": dates,
+                "title": movieTitles(np.repeat(movie, repeat)),
+                "revenue": revenue,
+                "theaters": pa.array(np.repeat(theaters, repeat), mask=np.repeat(missing_theaters, repeat)),
+                "distributor": np.repeat(distributor, repeat)
+            }, schema=schema))
+
+            stats['rows'] += len(position)
+            stats['duplicates'] += int(duplicate.sum())
+
+    os.replace(tmp_path, path)
+    stats['movies'] = int(movies_seen.sum())
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic revenues_per_day.csv")
+    parser.add_argument("path", help="CSV file to write")
+    parser.add_argument("--rows", type=int, default=100_000, help="approximate rows of version 1")
+    parser.add_argument("--version", type=int, default=1, help="snapshot version (later versions add days and corrections)")
+    parser.add_argument("--days", type=int, default=None, help="days covered by version 1")
+    parser.add_argument("--new-days", type=int, default=1, help="days every later version adds")
+    parser.add_argument("--duplicate-rate", type=float, default=0.01, help="fraction of rows written twice")
+    parser.add_argument("--late-update-rate", type=float, default=0.0,
+                        help="fraction of earlier rows every later version corrects")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = generateRevenues(args.path, args.rows, version=args.version, days=args.days, new_days=args.new_days,
+                             duplicate_rate=args.duplicate_rate, late_update_rate=args.late_update_rate,
+                             seed=args.seed)
+    print(f"✓ Wrote {stats['rows']} rows ({stats['movies']} movies, {stats['days']} days, "
+          f"{stats['duplicates']} duplicates, {stats['late_updates']} late updates) to {args.path} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,13 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import sys
 from dotenv import load_dotenv
 
+# gold tables are read with the pipeline's reader (manifest planning, column projection)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline"))
+from common_function import readTable
+
 # Load environment variables
 load_dotenv()
 PROJECT_PATH = os.getenv('PROJECT_PATH')
@@ -34,105 +39,522 @@ st.markdown("""
 st.title("🎬 Movie Revenue Analytics Dashboard")
 st.markdown("---")
 
-# Load data
-@st.cache_data
-def load_data():
-    """Load and join all tables from Gold layer"""
-    
-    # Load fact and dimensions
-    fact_path = os.path.join(PROJECT_PATH, "data", "03_gold", "factRevenues")
-    dim_movie_path = os.path.join(PROJECT_PATH, "data", "03_gold", "dimMovies")
-    dim_dist_path = os.path.join(PROJECT_PATH, "data", "03_gold", "dimDistributor")
-    
-    fact = pd.read_parquet(fact_path, engine='fastparquet')
-    dim_movies = pd.read_parquet(dim_movie_path, engine='fastparquet')
-    dim_distributor = pd.read_parquet(dim_dist_path, engine='fastparquet')
-    
-    # Join fact with dimensions
-    df = (fact
-          .merge(dim_movies, on='_sk_movie', how='left')
-          .merge(dim_distributor, on='_sk_distributor', how='left'))
-    
-    # Convert date to datetime
+GOLD_PATH = os.path.join(PROJECT_PATH, "data", "03_gold")
+
+# Gold tables are served from uncompressed Arrow IPC copies in this folder. They are memory-mapped
+# and shared by all sessions (st.cache_resource), so a rerun never copies a table - the OS pages
+# in the parts a filter touches.
+ARROW_CACHE_PATH = os.path.join(GOLD_PATH, "_dashboard_cache")
+
+# Aggregated results kept per chart (one entry per filter combination, least recently used evicted)
+CHART_CACHE_ENTRIES = 64
+
+# Columns of the joined fact table (load_facts) - year and month are derived from the date
+FACT_COLUMNS = ['date', '_sk_movie', '_sk_distributor', 'revenue', 'theaters']
+FACT_MOVIE_COLUMNS = ['_sk_movie', 'title', 'imdb_rating', 'genre', 'is_enriched']
+FACT_DISTRIBUTOR_COLUMNS = ['_sk_distributor', 'distributor']
+
+ROLLUP_TABLES = {
+    'daily': "aggDailyDistributor",
+    'monthly': "aggMonthlyDistributor",
+    'movies': "aggMovieTotals",
+    'genre': "aggGenreDaily"
+}
+
+
+def source_signature(tables):
+    """Short hash of the file names, sizes and modification times of gold tables"""
+    import hashlib
+
+    digest = hashlib.md5()
+    for table in tables:
+        path = os.path.join(GOLD_PATH, table)
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        for file in files:
+            stat = os.stat(file)
+            digest.update(f"{file}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+def arrow_cache(name, tables, build):
+    """
+    Memory-mapped Arrow IPC copy of a table derived from gold tables.
+
+    The file name carries the signature of the source tables, so the copy is rebuilt by
+    build() (a function returning a DataFrame) after a pipeline rewrote one of them.
+    Copies of older signatures are removed when they are no longer mapped.
+    """
+    import glob
+    import pyarrow as pa
+
+    signature = source_signature(tables)
+    path = os.path.join(ARROW_CACHE_PATH, f"{name}-{signature}.arrow")
+
+    if not os.path.exists(path):
+        os.makedirs(ARROW_CACHE_PATH, exist_ok=True)
+        table = pa.Table.from_pandas(build(), preserve_index=False).combine_chunks()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+
+        for old_path in glob.glob(os.path.join(ARROW_CACHE_PATH, f"{name}-*.arrow")):
+            if old_path != path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass  # still mapped by another dashboard process
+
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+class DateSortedTable:
+    """Arrow table sorted by 'date' - date ranges are cut out by binary search, not row masks"""
+
+    def __init__(self, table):
+        self.table = table
+        # datetime64 view of the single-chunk date column (zero-copy)
+        self.dates = table.column('date').to_numpy()
+
+    def min_date(self):
+        return pd.Timestamp(self.dates[0]).date()
+
+    def max_date(self):
+        return pd.Timestamp(self.dates[-1]).date()
+
+    def slice(self, date_range=None):
+        """Rows of the (inclusive) date range as DataFrame, all rows for None"""
+        import numpy as np
+
+        table = self.table
+        if date_range is not None and len(date_range) == 2:
+            start, end = np.searchsorted(self.dates, [np.datetime64(date_range[0], 'D'),
+                                                      np.datetime64(date_range[1], 'D') + 1])
+            table = table.slice(start, end - start)
+        return table.to_pandas()
+
+
+def by_date(df):
+    """Date column as datetime64, rows sorted by date (stable)"""
     df['date'] = pd.to_datetime(df['date'])
-    df['year'] = df['date'].dt.year
-    df['month'] = df['date'].dt.month
-    df['month_name'] = df['date'].dt.month_name()
-    df['day_of_week'] = df['date'].dt.day_name()
-    
-    # Convert numeric fields
-    df['revenue'] = pd.to_numeric(df['revenue'], errors='coerce')
-    df['theaters'] = pd.to_numeric(df['theaters'], errors='coerce')
-    df['imdb_rating'] = pd.to_numeric(df['imdb_rating'], errors='coerce')
-    
-    return df, fact, dim_movies, dim_distributor
+    return df.sort_values('date', kind='stable').reset_index(drop=True)
+
+
+@st.cache_resource
+def load_dimensions():
+    """Load dimension tables from Gold layer (shared read-only frames)"""
+    dim_movies = arrow_cache("dimMovies", ["dimMovies"],
+                             lambda: pd.read_parquet(os.path.join(GOLD_PATH, "dimMovies"))).to_pandas()
+    dim_distributor = arrow_cache("dimDistributor", ["dimDistributor"],
+                                  lambda: pd.read_parquet(os.path.join(GOLD_PATH, "dimDistributor"))).to_pandas()
+
+    return dim_movies, dim_distributor
+
+
+@st.cache_resource
+def load_genres():
+    """Load movie -> genre bridge joined with the genre dimension (one row per movie and genre)"""
+    def build():
+        bridge = pd.read_parquet(os.path.join(GOLD_PATH, "bridgeMovieGenre"), columns=['_sk_movie', '_sk_genre'])
+        dim_genre = pd.read_parquet(os.path.join(GOLD_PATH, "dimGenre"), columns=['_sk_genre', 'genre'])
+        return bridge.merge(dim_genre, on='_sk_genre', how='inner')[['_sk_movie', 'genre']]
+
+    return arrow_cache("movieGenres", ["bridgeMovieGenre", "dimGenre"], build).to_pandas()
+
+
+@st.cache_resource
+def load_facts():
+    """Fact table joined with its dimensions, sorted by date (only the columns charts and filters use)"""
+    def build():
+        # gold tables are stored typed (dictionary keys, downcast numerics) - read as categoricals / numbers;
+        # readTable plans the files from the table's manifest and decodes only the listed columns
+        fact = readTable(os.path.join(GOLD_PATH, "factRevenues"), columns=FACT_COLUMNS)
+        dim_movies = readTable(os.path.join(GOLD_PATH, "dimMovies"), columns=FACT_MOVIE_COLUMNS)
+        dim_distributor = readTable(os.path.join(GOLD_PATH, "dimDistributor"), columns=FACT_DISTRIBUTOR_COLUMNS)
+
+        df = by_date(fact
+                     .merge(dim_movies, on='_sk_movie', how='left')
+                     .merge(dim_distributor, on='_sk_distributor', how='left'))
+        df['year'] = df['date'].dt.year
+        df['month'] = df['date'].dt.month
+        df['month_name'] = df['date'].dt.month_name()
+        df['day_of_week'] = df['date'].dt.day_name()
+        return df
+
+    return DateSortedTable(arrow_cache("facts", ["factRevenues", "dimMovies", "dimDistributor"], build))
+
+
+@st.cache_resource
+def load_rollups():
+    """Load pre-aggregated rollup tables from Gold layer (None if aggRevenues-Gold has not run yet)"""
+    if not all(os.path.exists(os.path.join(GOLD_PATH, name)) for name in ROLLUP_TABLES.values()):
+        return None
+
+    def build(name):
+        dim_distributor = pd.read_parquet(os.path.join(GOLD_PATH, "dimDistributor"))
+        df = pd.read_parquet(os.path.join(GOLD_PATH, name)).merge(dim_distributor, on='_sk_distributor', how='left')
+        return by_date(df) if 'date' in df.columns else df
+
+    rollups = {key: arrow_cache(name, [name, "dimDistributor"], lambda name=name: build(name))
+               for key, name in ROLLUP_TABLES.items()}
+    rollups['daily'] = DateSortedTable(rollups['daily'])
+    rollups['genre'] = DateSortedTable(rollups['genre'])
+    # small - kept as shared read-only frames
+    rollups['monthly'] = rollups['monthly'].to_pandas()
+    rollups['movies'] = rollups['movies'].to_pandas()
+    return rollups
+
+
+def date_index_files(table, date_range):
+    """
+    Files of a date range from the table's date index (_date_index.parquet, written by
+    factRevenues-Gold) in date order, None without a (current) index
+    """
+    path = os.path.join(GOLD_PATH, table)
+    index_path = os.path.join(path, "_date_index.parquet")
+    if not os.path.exists(index_path):
+        return None
+
+    index = pd.read_parquet(index_path, columns=['date', 'file'])
+    if len(date_range) == 2:
+        index = index[(index['date'] >= str(date_range[0])) & (index['date'] <= str(date_range[1]))]
+    files = [os.path.join(path, *file.split("/")) for file in index['file'].unique()]
+    return files if all(os.path.exists(file) for file in files) else None
+
+
+@st.cache_data
+def load_sample(date_range, distributor, rows=20):
+    """First fact rows matching date/distributor filters - reads only as much of the fact table as needed"""
+    import pyarrow.dataset as ds
+
+    fact_path = os.path.join(GOLD_PATH, "factRevenues")
+    dim_movies, dim_distributor = load_dimensions()
+
+    condition = None
+    if len(date_range) == 2:
+        condition = (ds.field('date') >= str(date_range[0])) & (ds.field('date') <= str(date_range[1]))
+    if distributor != 'All':
+        sk_distributor = dim_distributor.loc[dim_distributor['distributor'] == distributor, '_sk_distributor'].iloc[0]
+        distributor_condition = ds.field('_sk_distributor') == sk_distributor
+        condition = distributor_condition if condition is None else condition & distributor_condition
+
+    # with a date index only the files of the date range are opened
+    files = date_index_files("factRevenues", date_range)
+    if files is None:
+        dataset = ds.dataset(fact_path, format="parquet", partitioning="hive")
+    elif files:
+        dataset = ds.dataset(files, format="parquet", partitioning="hive", partition_base_dir=fact_path)
+    else:
+        return pd.DataFrame(columns=['date', 'title', 'revenue', 'theaters', 'distributor', 'imdb_rating', 'is_enriched'])
+    sample = dataset.head(rows, filter=condition).to_pandas()
+
+    return (sample
+            .merge(dim_movies, on='_sk_movie', how='left')
+            .merge(dim_distributor, on='_sk_distributor', how='left'))
+
+
+def weighted_mean(sums, counts):
+    """Mean from additive rollup measures"""
+    return sums.sum() / counts.sum() if counts.sum() > 0 else float('nan')
+
+
+# === FILTERED ROWS ===
+# filters = (date_range, full_range, distributor, genre, enriched_only), hashable so chart results
+# can be cached per filter combination
+
+def use_rollups(filters):
+    """Rollups answer every chart unless rows have to be filtered by movie attributes"""
+    _, _, _, genre, enriched_only = filters
+    return load_rollups() is not None and not enriched_only and genre == 'All'
+
+
+def rollup_rows(filters):
+    """Daily and genre x day rollup rows of the date range and distributor"""
+    date_range, full_range, distributor, _, _ = filters
+    rollups = load_rollups()
+
+    daily = rollups['daily'].slice(None if full_range else date_range)
+    genre_daily = rollups['genre'].slice(None if full_range else date_range)
+    if distributor != 'All':
+        daily = daily[daily['distributor'] == distributor]
+        genre_daily = genre_daily[genre_daily['distributor'] == distributor]
+    return daily, genre_daily
+
+
+@st.cache_resource(max_entries=2)
+def fact_rows(filters):
+    """Raw fact rows - only when a chart can't be answered by a rollup (shared, read-only)"""
+    date_range, _, distributor, genre, enriched_only = filters
+
+    df = load_facts().slice(date_range)
+    if enriched_only:
+        df = df[df['is_enriched'] == 1]
+    if distributor != 'All':
+        df = df[df['distributor'] == distributor]
+    if genre != 'All':
+        movie_genres = load_genres()
+        genre_movies = movie_genres.loc[movie_genres['genre'] == genre, '_sk_movie']
+        df = df[df['_sk_movie'].isin(genre_movies)]
+    return df
+
+
+def movie_totals_rows(filters):
+    """Movie totals rollup of the distributor - answers movie level charts over the whole history only"""
+    _, _, distributor, _, _ = filters
+    dim_movies, _ = load_dimensions()
+
+    movie_totals = load_rollups()['movies']
+    if distributor != 'All':
+        movie_totals = movie_totals[movie_totals['distributor'] == distributor]
+    movie_totals = (movie_totals
+                    .groupby('_sk_movie')
+                    .agg(revenue=('revenue', 'sum'),
+                         theaters_sum=('theaters_sum', 'sum'),
+                         theaters_rows=('theaters_rows', 'sum'),
+                         distributor=('distributor', 'first'))
+                    .reset_index()
+                    .merge(dim_movies[['_sk_movie', 'title', 'imdb_rating', 'genre', 'year', 'is_enriched']],
+                           on='_sk_movie', how='left'))
+    movie_totals['theaters'] = movie_totals['theaters_sum'] / movie_totals['theaters_rows']
+    return movie_totals
+
+
+def use_movie_totals(filters):
+    return use_rollups(filters) and filters[1]
+
+
+def movie_level_rows(filters):
+    """One row per movie - from movie totals rollup or aggregated from fact rows"""
+    if use_movie_totals(filters):
+        return movie_totals_rows(filters)
+    return (fact_rows(filters).groupby(['title', '_sk_movie'])
+            .agg({
+                'revenue': 'sum',
+                'theaters': 'mean',
+                'imdb_rating': 'first',
+                'distributor': 'first',
+                'genre': 'first',
+                'year': 'first',
+                'is_enriched': 'first'
+            })
+            .reset_index())
+
+
+# === CHART DATA (memoized per filter combination) ===
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def key_metrics(filters):
+    """Record count, KPI values and data quality counts"""
+    rollups = load_rollups()
+    metrics = {'total_records': rollups['daily'].table.column('rows').to_pandas().sum() if rollups is not None
+               else load_facts().table.num_rows}
+
+    if use_rollups(filters):
+        daily, _ = rollup_rows(filters)
+        record_count = int(daily['rows'].sum())
+        metrics.update(
+            total_revenue=daily['revenue'].sum(),
+            avg_theaters=weighted_mean(daily['theaters_sum'], daily['theaters_rows']),
+            avg_rating=weighted_mean(daily['rating_sum'], daily['rating_rows']),
+            enriched_count=daily['enriched_rows'].sum(),
+            missing_revenue=record_count - daily['revenue_rows'].sum(),
+            missing_theaters=record_count - daily['theaters_rows'].sum(),
+            missing_distributor=daily.loc[daily['distributor'].isna(), 'rows'].sum()
+        )
+    else:
+        df = fact_rows(filters)
+        record_count = len(df)
+        metrics.update(
+            total_revenue=df['revenue'].sum(),
+            avg_theaters=df['theaters'].mean(),
+            avg_rating=df['imdb_rating'].mean(),
+            enriched_count=df['is_enriched'].sum(),
+            missing_revenue=df['revenue'].isna().sum(),
+            missing_theaters=df['theaters'].isna().sum(),
+            missing_distributor=df['distributor'].isna().sum()
+        )
+
+    metrics['record_count'] = record_count
+    metrics['unique_movies'] = (movie_totals_rows(filters)['_sk_movie'].nunique() if use_movie_totals(filters)
+                                else fact_rows(filters)['_sk_movie'].nunique())
+    return metrics
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def revenue_trends(filters):
+    """Daily, monthly and day of week revenue"""
+    full_range, distributor = filters[1], filters[2]
+
+    if use_rollups(filters):
+        daily, _ = rollup_rows(filters)
+        daily_revenue = daily.groupby('date')['revenue'].sum().reset_index()
+
+        # whole months only in the monthly rollup, otherwise sum the filtered days
+        monthly = load_rollups()['monthly'] if full_range else daily
+        if full_range and distributor != 'All':
+            monthly = monthly[monthly['distributor'] == distributor]
+        monthly_revenue = monthly.groupby('month')['revenue'].sum().reset_index()
+        month_start = pd.to_datetime(monthly_revenue['month'])
+        monthly_revenue['period'] = month_start.dt.month_name() + ' ' + month_start.dt.year.astype(str)
+
+        dow_source = daily.assign(day_of_week=daily['date'].dt.day_name())
+    else:
+        df = fact_rows(filters)
+        daily_revenue = df.groupby('date')['revenue'].sum().reset_index()
+
+        monthly_revenue = df.groupby(['year', 'month_name'])['revenue'].sum().reset_index()
+        monthly_revenue['period'] = monthly_revenue['month_name'] + ' ' + monthly_revenue['year'].astype(str)
+
+        dow_source = df
+
+    dow_revenue = dow_source.groupby('day_of_week')['revenue'].sum().reindex([
+        'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
+    ]).reset_index()
+
+    return daily_revenue, monthly_revenue, dow_revenue
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def genre_analysis(filters):
+    """Revenue, average rating and rows per genre"""
+    if use_rollups(filters):
+        # genre x day rollup (enriched rows only)
+        _, genre_daily = rollup_rows(filters)
+        genre_totals = (genre_daily
+                        .groupby('genre')[['revenue', 'rating_sum', 'rating_rows', 'rows']]
+                        .sum())
+        genre_totals['imdb_rating'] = genre_totals['rating_sum'] / genre_totals['rating_rows']
+    else:
+        df = fact_rows(filters)
+        enriched_df = df[df['is_enriched'] == 1]
+
+        # One row per fact row and genre of its movie
+        genre_df = enriched_df[['_sk_movie', 'revenue', 'theaters', 'imdb_rating']].merge(load_genres(), on='_sk_movie')
+        genre_totals = genre_df.groupby('genre').agg(
+            revenue=('revenue', 'sum'),
+            imdb_rating=('imdb_rating', 'mean'),
+            rows=('revenue', 'size')
+        )
+    return genre_totals
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def distributor_analysis(filters):
+    """Revenue and number of movies per distributor"""
+    distributor = filters[2]
+
+    source = rollup_rows(filters)[0] if use_rollups(filters) else fact_rows(filters)
+    dist_revenue = source.groupby('distributor')['revenue'].sum().sort_values(ascending=False)
+
+    dist_movies = load_rollups()['movies'] if use_movie_totals(filters) else fact_rows(filters)
+    if use_movie_totals(filters) and distributor != 'All':
+        dist_movies = dist_movies[dist_movies['distributor'] == distributor]
+    dist_movies = dist_movies.groupby('distributor')['_sk_movie'].nunique().sort_values(ascending=False).head(10)
+
+    return dist_revenue.head(10), dist_movies, dist_revenue.head(8)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def top_performers(filters):
+    """Top movies by revenue and rating, revenue vs rating of enriched movies"""
+    movie_level = movie_level_rows(filters)
+
+    top_revenue = (movie_level
+                  .sort_values('revenue', ascending=False)
+                  .head(10)
+                  .reset_index(drop=True))
+
+    top_revenue['revenue'] = top_revenue['revenue'].apply(lambda x: f"${x/1e6:.2f}M")
+    top_revenue['theaters'] = top_revenue['theaters'].apply(lambda x: f"{x:,.0f}" if pd.notna(x) else "N/A")
+
+    top_rated = None
+    if movie_level['is_enriched'].sum() > 0:
+        top_rated = (movie_level[movie_level['is_enriched'] == 1]
+                    .sort_values('imdb_rating', ascending=False)
+                    .head(10)
+                    .reset_index(drop=True))
+
+        top_rated['revenue'] = top_rated['revenue'].apply(lambda x: f"${x/1e6:.2f}M")
+
+    movie_stats = (movie_level[movie_level['is_enriched'] == 1]
+        [['title', 'revenue', 'imdb_rating', 'theaters']]
+        .dropna())  # Add this to remove any rows with NaN
+
+    return (top_revenue[['title', 'revenue', 'theaters', 'imdb_rating', 'distributor']],
+            None if top_rated is None else top_rated[['title', 'imdb_rating', 'revenue', 'genre', 'year']],
+            movie_stats)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def sample_rows(filters):
+    """First rows of the selection"""
+    date_range, distributor = filters[0], filters[2]
+    sample_source = load_sample(date_range, distributor) if use_rollups(filters) else fact_rows(filters)
+    return sample_source[['date', 'title', 'revenue', 'theaters', 'distributor', 'imdb_rating', 'is_enriched']].head(20)
+
 
 try:
-    df, fact, dim_movies, dim_distributor = load_data()
+    dim_movies, dim_distributor = load_dimensions()
+    movie_genres = load_genres()
+    rollups = load_rollups()
     
     # Sidebar Filters
     st.sidebar.header("🔍 Filters")
     
     # Enrichment filter
     show_enriched_only = st.sidebar.checkbox("Show only enriched movies (with OMDB data)", value=False)
-    if show_enriched_only:
-        df = df[df['is_enriched'] == 1]
     
-    # Date range filter
-    min_date = df['date'].min().date()
-    max_date = df['date'].max().date()
+    # Date range filter (bounds are the first / last row of the date sorted table)
+    dated = rollups['daily'] if rollups is not None else load_facts()
+    min_date = dated.min_date()
+    max_date = dated.max_date()
     date_range = st.sidebar.date_input(
         "Date Range",
         value=(min_date, max_date),
         min_value=min_date,
         max_value=max_date
     )
-    
-    if len(date_range) == 2:
-        df = df[(df['date'].dt.date >= date_range[0]) & (df['date'].dt.date <= date_range[1])]
+    full_range = len(date_range) != 2 or (date_range[0] <= min_date and date_range[1] >= max_date)
     
     # Distributor filter
-    distributors = ['All'] + sorted(df['distributor'].dropna().unique().tolist())
+    distributors = ['All'] + sorted(dim_distributor['distributor'].dropna().unique().tolist())
     selected_distributor = st.sidebar.selectbox("Distributor", distributors)
-    if selected_distributor != 'All':
-        df = df[df['distributor'] == selected_distributor]
     
     # Genre filter (if enriched)
-    if 'genre' in df.columns:
-        # Split genres (they might be comma-separated)
-        all_genres = set()
-        for genre_str in df['genre'].dropna():
-            all_genres.update([g.strip() for g in str(genre_str).split(',')])
-        genres = ['All'] + sorted(list(all_genres))
-        selected_genre = st.sidebar.selectbox("Genre", genres)
-        if selected_genre != 'All':
-            df = df[df['genre'].str.contains(selected_genre, na=False, case=False)]
+    genres = ['All'] + sorted(movie_genres['genre'].unique().tolist())
+    selected_genre = st.sidebar.selectbox("Genre", genres)
+
+    filters = (tuple(date_range), full_range, selected_distributor, selected_genre, show_enriched_only)
+    metrics = key_metrics(filters)
+    record_count = metrics['record_count']
+    enriched_count = metrics['enriched_count']
     
     st.sidebar.markdown("---")
-    st.sidebar.markdown(f"**Records:** {len(df):,}")
+    st.sidebar.markdown(f"**Records:** {record_count:,}")
     
     # === KPI METRICS ===
     st.subheader("📊 Key Metrics")
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        total_revenue = df['revenue'].sum()
+        total_revenue = metrics['total_revenue']
         st.metric("Total Revenue", f"${total_revenue/1e6:.1f}M")
     
     with col2:
-        unique_movies = df['_sk_movie'].nunique()
+        unique_movies = metrics['unique_movies']
         st.metric("Unique Movies", f"{unique_movies:,}")
     
     with col3:
-        avg_theaters = df['theaters'].mean()
+        avg_theaters = metrics['avg_theaters']
         st.metric("Avg Theaters", f"{avg_theaters:,.0f}")
     
     with col4:
-        avg_rating = df['imdb_rating'].mean()
+        avg_rating = metrics['avg_rating']
         st.metric("Avg IMDB Rating", f"{avg_rating:.1f}" if pd.notna(avg_rating) else "N/A")
     
     with col5:
-        enrichment_rate = (df['is_enriched'].sum() / len(df) * 100) if len(df) > 0 else 0
+        enrichment_rate = (enriched_count / record_count * 100) if record_count > 0 else 0
         st.metric("Enrichment Rate", f"{enrichment_rate:.0f}%")
     
     st.markdown("---")
@@ -150,11 +572,12 @@ try:
     with tab1:
         st.subheader("Revenue Over Time")
         
+        daily_revenue, monthly_revenue, dow_revenue = revenue_trends(filters)
+        
         col1, col2 = st.columns(2)
         
         with col1:
             # Daily revenue trend
-            daily_revenue = df.groupby('date')['revenue'].sum().reset_index()
             fig_daily = px.line(
                 daily_revenue, 
                 x='date', 
@@ -166,8 +589,6 @@ try:
         
         with col2:
             # Monthly revenue
-            monthly_revenue = df.groupby(['year', 'month_name'])['revenue'].sum().reset_index()
-            monthly_revenue['period'] = monthly_revenue['month_name'] + ' ' + monthly_revenue['year'].astype(str)
             fig_monthly = px.bar(
                 monthly_revenue,
                 x='period',
@@ -178,10 +599,6 @@ try:
             st.plotly_chart(fig_monthly, use_container_width=True)
         
         # Revenue by day of week
-        dow_revenue = df.groupby('day_of_week')['revenue'].sum().reindex([
-            'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
-        ]).reset_index()
-        
         fig_dow = px.bar(
             dow_revenue,
             x='day_of_week',
@@ -194,29 +611,14 @@ try:
     with tab2:
         st.subheader("Genre Performance")
         
-        if 'genre' in df.columns and df['is_enriched'].sum() > 0:
-            enriched_df = df[df['is_enriched'] == 1].copy()
-            
-            # Split genres and aggregate
-            genre_data = []
-            for _, row in enriched_df.iterrows():
-                if pd.notna(row['genre']):
-                    genres = [g.strip() for g in str(row['genre']).split(',')]
-                    for genre in genres:
-                        genre_data.append({
-                            'genre': genre,
-                            'revenue': row['revenue'],
-                            'theaters': row['theaters'],
-                            'imdb_rating': row['imdb_rating']
-                        })
-            
-            genre_df = pd.DataFrame(genre_data)
-            
+        genre_totals = genre_analysis(filters)
+
+        if len(genre_totals) > 0:
             col1, col2 = st.columns(2)
             
             with col1:
                 # Revenue by genre
-                genre_revenue = genre_df.groupby('genre')['revenue'].sum().sort_values(ascending=False).head(10)
+                genre_revenue = genre_totals['revenue'].sort_values(ascending=False).head(10)
                 fig_genre_rev = px.bar(
                     x=genre_revenue.index,
                     y=genre_revenue.values,
@@ -227,7 +629,7 @@ try:
             
             with col2:
                 # Average rating by genre
-                genre_rating = genre_df.groupby('genre')['imdb_rating'].mean().sort_values(ascending=False).head(10)
+                genre_rating = genre_totals['imdb_rating'].sort_values(ascending=False).head(10)
                 fig_genre_rating = px.bar(
                     x=genre_rating.index,
                     y=genre_rating.values,
@@ -237,7 +639,7 @@ try:
                 st.plotly_chart(fig_genre_rating, use_container_width=True)
             
             # Genre distribution (pie chart)
-            genre_count = genre_df['genre'].value_counts().head(8)
+            genre_count = genre_totals['rows'].sort_values(ascending=False).head(8)
             fig_genre_pie = px.pie(
                 values=genre_count.values,
                 names=genre_count.index,
@@ -251,11 +653,12 @@ try:
     with tab3:
         st.subheader("Distributor Performance")
         
+        dist_revenue, dist_movies, dist_market = distributor_analysis(filters)
+        
         col1, col2 = st.columns(2)
         
         with col1:
             # Revenue by distributor
-            dist_revenue = df.groupby('distributor')['revenue'].sum().sort_values(ascending=False).head(10)
             fig_dist = px.bar(
                 x=dist_revenue.index,
                 y=dist_revenue.values,
@@ -266,7 +669,6 @@ try:
         
         with col2:
             # Number of movies by distributor
-            dist_movies = df.groupby('distributor')['_sk_movie'].nunique().sort_values(ascending=False).head(10)
             fig_dist_movies = px.bar(
                 x=dist_movies.index,
                 y=dist_movies.values,
@@ -276,7 +678,6 @@ try:
             st.plotly_chart(fig_dist_movies, use_container_width=True)
         
         # Distributor market share
-        dist_market = df.groupby('distributor')['revenue'].sum().sort_values(ascending=False).head(8)
         fig_dist_pie = px.pie(
             values=dist_market.values,
             names=dist_market.index,
@@ -288,65 +689,29 @@ try:
     with tab4:
         st.subheader("🏆 Top Performing Movies")
         
+        top_revenue, top_rated, movie_stats = top_performers(filters)
+        
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("#### By Total Revenue")
-            top_revenue = (df.groupby(['title', '_sk_movie'])
-                          .agg({
-                              'revenue': 'sum',
-                              'theaters': 'mean',
-                              'imdb_rating': 'first',
-                              'distributor': 'first'
-                          })
-                          .sort_values('revenue', ascending=False)
-                          .head(10)
-                          .reset_index())
-            
-            top_revenue['revenue'] = top_revenue['revenue'].apply(lambda x: f"${x/1e6:.2f}M")
-            top_revenue['theaters'] = top_revenue['theaters'].apply(lambda x: f"{x:,.0f}" if pd.notna(x) else "N/A")
-            
             st.dataframe(
-                top_revenue[['title', 'revenue', 'theaters', 'imdb_rating', 'distributor']],
+                top_revenue,
                 use_container_width=True,
                 hide_index=True
             )
         
         with col2:
             st.markdown("#### By IMDB Rating")
-            if df['is_enriched'].sum() > 0:
-                top_rated = (df[df['is_enriched'] == 1]
-                            .groupby(['title', '_sk_movie'])
-                            .agg({
-                                'imdb_rating': 'first',
-                                'revenue': 'sum',
-                                'genre': 'first',
-                                'year': 'first'  # year from dimMovies
-                            })
-                            .sort_values('imdb_rating', ascending=False)
-                            .head(10)
-                            .reset_index())
-                
-                top_rated['revenue'] = top_rated['revenue'].apply(lambda x: f"${x/1e6:.2f}M")
-                
+            if top_rated is not None:
                 st.dataframe(
-                    top_rated[['title', 'imdb_rating', 'revenue', 'genre', 'year']].rename(columns={'year': 'year'}),
+                    top_rated,
                     use_container_width=True,
                     hide_index=True
                 )
             else:
                 st.info("Enable enriched data to see ratings")
         
-            movie_stats = (df[df['is_enriched'] == 1]
-                .groupby('title')
-                .agg({
-                    'revenue': 'sum',
-                    'imdb_rating': 'first',
-                    'theaters': 'mean'
-                })
-                .reset_index()
-                .dropna())  # Add this to remove any rows with NaN
-
             fig_scatter = px.scatter(
                 movie_stats,
                 x='imdb_rating',
@@ -365,30 +730,32 @@ try:
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Records", f"{len(fact):,}")
+            total_records = metrics['total_records']
+            st.metric("Total Records", f"{total_records:,}")
             st.metric("Movies in Dimension", f"{len(dim_movies):,}")
             st.metric("Distributors in Dimension", f"{len(dim_distributor):,}")
         
         with col2:
-            enriched_count = df['is_enriched'].sum()
-            enrichment_pct = (enriched_count / len(df) * 100) if len(df) > 0 else 0
+            enrichment_pct = (enriched_count / record_count * 100) if record_count > 0 else 0
             st.metric("Enriched Records", f"{enriched_count:,}")
             st.metric("Enrichment Rate", f"{enrichment_pct:.1f}%")
             
-            missing_revenue = df['revenue'].isna().sum()
+            missing_revenue = metrics['missing_revenue']
             st.metric("Missing Revenue", f"{missing_revenue:,}")
         
         with col3:
-            missing_theaters = df['theaters'].isna().sum()
+            missing_theaters = metrics['missing_theaters']
             st.metric("Missing Theaters", f"{missing_theaters:,}")
             
-            missing_distributor = df['distributor'].isna().sum()
+            missing_distributor = metrics['missing_distributor']
             st.metric("Missing Distributor", f"{missing_distributor:,}")
         
         # Enrichment over time
         st.markdown("#### OMDB Enrichment Coverage")
-        enrichment_pie = df.groupby('is_enriched').size().reset_index()
-        enrichment_pie.columns = ['is_enriched', 'count']
+        enrichment_pie = pd.DataFrame({
+            'is_enriched': [0, 1],
+            'count': [record_count - enriched_count, enriched_count]
+        })
 
         fig_enrich = px.pie(
             enrichment_pie,
@@ -401,7 +768,7 @@ try:
         
         # Sample of data
         st.markdown("#### Sample Data")
-        sample_df = df[['date', 'title', 'revenue', 'theaters', 'distributor', 'imdb_rating', 'is_enriched']].head(20)
+        sample_df = sample_rows(filters)
         st.dataframe(sample_df, use_container_width=True, hide_index=True)
 
 except FileNotFoundError as e:
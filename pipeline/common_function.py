@@ -8,10 +8,13 @@ from pathlib import Path
 from datetime import datetime
 
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 import json
 
+from instrumentation import instrumented, countIO, countRows
+
 def readConfig(pipeline_id):
     """
     Read pipeline configuration from JSON file.
@@ -52,69 +55,593 @@ def readConfig(pipeline_id):
         sys.exit(1)
 
 
-def appendMode(df: pd.DataFrame, path: str, format: str = "parquet", partition_cols: list = []):
+def storageConfig(config: dict, table: str) -> dict:
+    """
+    Storage settings of one table from the "storage" section of a pipeline's target config.
+
+    Args:
+        config: Pipeline configuration
+        table: Table name (e.g., 'factRevenues')
+
+    Returns:
+        dict: e.g. {"compression": "zstd", "row_group_size": 100000,
+                    "columns": {"_sk_movie": "dictionary", "theaters": "int32"}}, None if not declared
+    """
+    return config["target"].get("storage", {}).get(table)
+
+
+ENGINES = ("pandas", "duckdb")
+
+
+def engineConfig(config: dict) -> dict:
+    """
+    Execution engine of a pipeline from the optional "engine" config section - a name or a
+    dict with "name" and engine settings (see duckdb_engine.connect; pandas: "workers" for
+    parallelMap). Defaults to pandas.
+
+    Args:
+        config: Pipeline configuration
+
+    Returns:
+        dict: e.g. {"name": "duckdb", "memory_limit": "4GB", "temp_directory": "data\\_spill"}
+
+    Raises:
+        ValueError: Unknown engine name
+    """
+    engine = config.get("engine", "pandas")
+    if isinstance(engine, str):
+        engine = {"name": engine}
+    if engine.get("name") not in ENGINES:
+        raise ValueError(f"Unsupported engine: {engine.get('name')} (expected one of {ENGINES})")
+    return engine
+
+
+def _storageType(name: str):
+    import pyarrow as pa
+
+    types = {
+        "dictionary": pa.dictionary(pa.int32(), pa.string()),
+        "string": pa.string(),
+        "date": pa.date32(),
+        "bool": pa.bool_(),
+        "int8": pa.int8(),
+        "int16": pa.int16(),
+        "int32": pa.int32(),
+        "int64": pa.int64(),
+        "float32": pa.float32(),
+        "float64": pa.float64()
+    }
+    if name not in types:
+        raise ValueError(f"Unsupported storage type: {name} (expected one of {sorted(types)})")
+    return types[name]
+
+
+def toStorageTable(df, storage: dict = None):
+    """
+    Convert df to the arrow table that is written to parquet, with the column types
+    declared in the table's storage config:
+    - "dictionary": low-cardinality strings (surrogate keys, titles, distributors) are
+      stored once per row group and read back as pandas categoricals
+    - "int8" ... "float32": downcast numerics - casts are checked, a value that does not
+      fit raises instead of wrapping around
+    - "date": ISO date strings / timestamps / datetime.date objects stored as date32
+    Columns that are not declared keep the type pandas gives them.
+
+    Args:
+        df: Data to write (DataFrame or pyarrow.Table)
+        storage: Table storage config (see storageConfig), None = no casts
+
+    Returns:
+        pyarrow.Table: Table in storage types
+    """
+    import pyarrow as pa
+
+    columns = dict((storage or {}).get("columns", {}))
+    if not isinstance(df, pa.Table):
+        # datetime.date objects, possibly mixed with the timestamps fastparquet reads dates as, via timestamps
+        mixed = [name for name, type_name in columns.items()
+                 if type_name == "date" and name in df and df[name].dtype == object]
+        if mixed:
+            df = df.assign(**{name: pd.to_datetime(df[name]) for name in mixed})
+    table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+
+    # categoricals come with the smallest index type that fits their categories - a later chunk
+    # with more categories could not be cast to it, so string dictionaries always use int32 indices
+    for field in table.schema:
+        if (field.name not in columns and pa.types.is_dictionary(field.type)
+                and (pa.types.is_string(field.type.value_type) or pa.types.is_large_string(field.type.value_type))):
+            columns[field.name] = "dictionary"
+
+    cast = set()
+    for name, type_name in columns.items():
+        if name not in table.column_names:
+            continue
+        i = table.schema.get_field_index(name)
+        table = table.set_column(i, name, table.column(i).cast(_storageType(type_name)))
+        cast.add(name)
+
+    # pandas metadata of cast columns describes their dtype before the cast (e.g. a date as str) and
+    # would turn them back on read - drop it, other columns keep theirs (nullable Int64 etc.).
+    # Dates get an entry of their own, fastparquet requires one (and reads them as timestamps)
+    metadata = table.schema.metadata or {}
+    if cast and b'pandas' in metadata:
+        pandas_metadata = json.loads(metadata[b'pandas'])
+        pandas_metadata['columns'] = [c for c in pandas_metadata['columns'] if c['name'] not in cast]
+        pandas_metadata['columns'] += [{'name': name, 'field_name': name, 'pandas_type': 'date', 'numpy_type': 'datetime64[ns]',
+                                        'metadata': None}
+                                       for name in cast if pa.types.is_date32(table.schema.field(name).type)]
+        table = table.replace_schema_metadata({**metadata, b'pandas': json.dumps(pandas_metadata).encode()})
+
+    return table
+
+
+def parquetWriteOptions(storage: dict = None) -> dict:
+    """
+    Parquet writer options (compression codec and level) of a table's storage config.
+    """
+    storage = storage or {}
+    options = {"compression": storage.get("compression", "snappy")}
+    if "compression_level" in storage:
+        options["compression_level"] = storage["compression_level"]
+    return options
+
+
+@instrumented
+def writeParquetFile(df: pd.DataFrame, path: str, storage: dict = None):
+    """
+    Write df as a single parquet file in its storage types. The file is written under
+    a hidden temporary name and renamed into place.
+
+    Args:
+        df: Data to write
+        path: Target parquet file
+        storage: Table storage config (see storageConfig)
+    """
+    import pyarrow.parquet as pq
+
+    table = toStorageTable(df, storage)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, tmp_path, row_group_size=(storage or {}).get("row_group_size"),
+                   **parquetWriteOptions(storage))
+    os.replace(tmp_path, path)
+    countIO(written=[path])
+
+
+@instrumented
+def appendMode(df, path: str, format: str = "parquet", partition_cols: list = [],
+               mode: str = "append", row_group_size: int = 100_000, storage: dict = None):
     """
-    Append dataframe to existing file or create new one.
+    Append dataframe to existing dataset or create new one.
+
+    In "append" mode only new files are written - existing data is never read or
+    rewritten. For parquet every partition value (e.g. _tf_ingestion_time=<ts>) gets
+    a new file, streamed in row groups of row_group_size rows.
+    In "compact" mode existing data is read, combined with df and the whole dataset
+    is rewritten (old behaviour, use it to merge many small files) - new files are swapped
+    in through the manifest, readers never see a missing or half rewritten table.
+
+    df may also be an iterable of DataFrames (e.g. pd.read_csv(..., chunksize=n)). In
+    append mode every chunk is written as soon as it is read, so memory stays bounded
+    by the chunk size; compaction has to collect the chunks first.
 
     Args:
-        df: pandas DataFrame to write
-        path: file path (e.g., "data/bronze/revenues/data.parquet")
+        df: pandas DataFrame, or iterable of DataFrames with the same columns
+        path: dataset path (e.g., "data/bronze/revenues")
         format: file format ("parquet", "csv", "json")
+        partition_cols: list of columns to partition parquet output by
+        mode: "append" (write new files only) or "compact" (full rewrite)
+        row_group_size: max rows per parquet row group in append mode
+        storage: Table storage config (column types, compression, row_group_size overrides
+                 the argument), see storageConfig
     """
-    from pathlib import Path
+    if format not in ("parquet", "csv", "json"):
+        raise ValueError(f"Unsupported format: {format}")
+    if mode not in ("append", "compact"):
+        raise ValueError(f"Unsupported mode: {mode}")
 
     # Create directory if doesn"t exist
     Path(path).parent.mkdir(parents=True, exist_ok=True)
 
-    # Check if file exists
+    # legacy single-file parquet cannot be appended to in place
+    if mode == "append" and format == "parquet" and Path(path).is_file():
+        print(f"⚠️  {path} is a single parquet file - falling back to compaction")
+        mode = "compact"
+
+    if mode == "compact":
+        if not isinstance(df, pd.DataFrame):
+            df = pd.concat(list(df), ignore_index=True)
+        _compactDataset(df, path, format, partition_cols, storage)
+        return
+
+    chunks = [df] if isinstance(df, pd.DataFrame) else df
+    rows = 0
+
+    def counted(chunks):
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    if format == "csv":
+        for chunk in counted(chunks):
+            chunk.to_csv(path, mode="a", header=not Path(path).exists(), index=False)
+    elif format == "json":
+        with open(path, "a", encoding="utf-8") as f:
+            for chunk in counted(chunks):
+                chunk.to_json(f, orient="records", lines=True)
+    else:
+        written = _writeParquetPartitions(counted(chunks), path, partition_cols,
+                                          (storage or {}).get("row_group_size", row_group_size), storage)
+        updateManifest(path, added=written)
+
+    countRows(rows_in=rows, rows_out=rows)
+    print(f"✓ Appended {rows} records to {path}")
+
+
+def _writeParquetPartitions(df, path: str, partition_cols: list, row_group_size: int, storage: dict = None) -> list:
+    """
+    Write df as new hive-style parquet files under path, one file per partition value.
+    Files are written under a hidden temporary name and renamed when complete, so
+    readers never see a half written file.
+
+    df may be an iterable of DataFrames: a partition's writer stays open across chunks
+    and rows are buffered until a full row group of row_group_size rows can be written,
+    so row groups don't depend on the chunk size. The schema of the first chunk is kept.
+    Chunks are written in the storage types and codec of storage (see toStorageTable).
+
+    Returns:
+        list: Paths of the written files
+    """
+    import uuid
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    chunks = [df] if isinstance(df, pd.DataFrame) else df
+    files = {}  # partition dir -> {'writer', 'schema', 'pending', 'rows', 'tmp', 'final'}
+
+    def flush(state, final=False):
+        while state['rows'] >= row_group_size or (final and state['rows'] > 0):
+            pending = pa.concat_tables(state['pending'])
+            state['writer'].write_table(pending.slice(0, row_group_size))
+            rest = pending.slice(row_group_size)
+            state['pending'], state['rows'] = [rest], len(rest)
+
+    try:
+        for chunk in chunks:
+            if partition_cols:
+                groups = chunk.groupby(partition_cols, sort=False, observed=True, dropna=False)
+            else:
+                groups = [((), chunk)]
+
+            for keys, part in groups:
+                if not isinstance(keys, tuple):
+                    keys = (keys,)
+                part_dir = Path(path).joinpath(*[f"{col}={val}" for col, val in zip(partition_cols, keys)])
+                table = toStorageTable(part.drop(columns=partition_cols), storage)
+
+                if part_dir not in files:
+                    part_dir.mkdir(parents=True, exist_ok=True)
+                    file_name = f"{uuid.uuid4().hex}-0.parquet"
+                    tmp_file = part_dir / f".{file_name}.tmp"
+                    files[part_dir] = {'writer': pq.ParquetWriter(tmp_file, table.schema, **parquetWriteOptions(storage)),
+                                       'schema': table.schema,
+                                       'pending': [], 'rows': 0, 'tmp': tmp_file, 'final': part_dir / file_name}
+                state = files[part_dir]
+                state['pending'].append(table.cast(state['schema']))
+                state['rows'] += len(table)
+                flush(state)
+    except BaseException:
+        for state in files.values():
+            state['writer'].close()
+            state['tmp'].unlink(missing_ok=True)
+        raise
+
+    written = []
+    for state in files.values():
+        flush(state, final=True)
+        state['writer'].close()
+        os.replace(state['tmp'], state['final'])
+        written.append(str(state['final']))
+
+    countIO(written=written)
+    return written
+
+
+def readCsvChunks(path: str, schema: list, delimiter: str = ",", encoding: str = "utf-8",
+                  header: bool = True, block_size_mb: int = 4):
+    """
+    Stream a CSV file as DataFrames typed by a config "schema" ([{"name": ..., "type": ...}]).
+
+    Uses the pyarrow CSV reader: the file is parsed block by block (block_size_mb of text
+    per chunk). The reader reads a few dozen blocks ahead, so memory stays bounded by a
+    multiple of the block size no matter how large the file is. Declared columns
+    are not inferred - strings come out arrow-backed, integers as nullable Int64 (values
+    like "12.0" are accepted, "12.5" raises).
+
+    Args:
+        path: CSV file path
+        schema: Column list from config (e.g., config["source"]["schema"])
+        delimiter: Field delimiter
+        encoding: File encoding
+        header: True if the first line holds the column names
+        block_size_mb: Size of the text block parsed per chunk
+
+    Yields:
+        pd.DataFrame: One chunk per parsed block
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.compute as pc
+
+    # integers are parsed as float64 and cast back with overflow/truncation checks
+    read_types = {"string": pa.string(), "integer": pa.float64(), "float": pa.float64(), "boolean": pa.bool_()}
+    unknown = [column["type"] for column in schema if column["type"] not in read_types]
+    if unknown:
+        raise ValueError(f"Unsupported schema types: {unknown}")
+
+    names = [column["name"] for column in schema]
+    integer_columns = [column["name"] for column in schema if column["type"] == "integer"]
+
+    # a python file object: arrow's own file readers read ahead far more than one block
+    source = open(path, "rb")
+    reader = pv.open_csv(
+        source,
+        read_options=pv.ReadOptions(encoding=encoding,
+                                    block_size=block_size_mb << 20,
+                                    column_names=None if header else names),
+        parse_options=pv.ParseOptions(delimiter=delimiter),
+        convert_options=pv.ConvertOptions(column_types={column["name"]: read_types[column["type"]]
+                                                        for column in schema})
+    )
+
+    dtypes = {
+        pa.string(): pd.StringDtype("pyarrow"),
+        pa.int64(): pd.Int64Dtype(),
+        pa.float64(): pd.Float64Dtype(),
+        pa.bool_(): pd.BooleanDtype(),
+    }
+
+    countIO(read=[path])
+    with source:
+        for batch in reader:
+            table = pa.Table.from_batches([batch])
+            for column in integer_columns:
+                if column in table.column_names:
+                    index = table.schema.get_field_index(column)
+                    table = table.set_column(index, column, pc.cast(table[column], pa.int64()))
+            yield table.to_pandas(types_mapper=dtypes.get)
+
+
+@instrumented
+def fileChecksum(path: str, block_size: int = 8 << 20) -> str:
+    """
+    SHA-256 of a file, read in blocks.
+
+    Args:
+        path: File path
+        block_size: Bytes read per step
+
+    Returns:
+        str: Hex digest
+    """
+    import hashlib
+
+    digest = hashlib.sha256()
+    countIO(read=[path])
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SourceSnapshotIndex:
+    """
+    Compact per-row hash index of the last ingested snapshot of a source file.
+
+    Every row is stored as two 64-bit hashes - of its key columns and of all its
+    columns - in one parquet file, together with the checksum of the file it was
+    built from. A row of a new snapshot is unchanged if its row hash is in the index,
+    changed if only its key is, new otherwise. The index is replaced by the new
+    snapshot's one on save(). Rows missing from the new snapshot are only counted
+    (bronze is append-only).
+
+    Args:
+        path: Index parquet file path (created on first save)
+        key_columns: Columns identifying a row (e.g., ['date', 'title'])
+    """
+
+    def __init__(self, path: str, key_columns: list):
+        import numpy as np
+        import pyarrow.parquet as pq
+
+        self.path = Path(path)
+        self.key_columns = list(key_columns)
+        self.checksum = None
+        self._keys = np.array([], dtype='uint64')
+        self._rows = np.array([], dtype='uint64')
+
+        if self.path.exists():
+            table = pq.read_table(self.path)
+            metadata = table.schema.metadata or {}
+            self.checksum = metadata.get(b'source_checksum', b'').decode() or None
+            # sorted unique hashes - membership is a binary search per chunk row
+            self._keys = self._sortedUnique(table['key_hash'].to_numpy())
+            self._rows = self._sortedUnique(table['row_hash'].to_numpy())
+
+        self._new_keys, self._new_rows = [], []
+        self.stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'removed': 0}
+
+    @staticmethod
+    def _combine(hashes: list):
+        # order dependent fold of 64-bit column hashes (FNV style multiply, wraps around)
+        import numpy as np
+
+        combined = np.full(len(hashes[0]), 0xCBF29CE484222325, dtype='uint64')
+        for column_hash in hashes:
+            combined = (combined ^ column_hash) * np.uint64(0x100000001B3)
+        return combined
+
+    @staticmethod
+    def _sortedUnique(hashes):
+        # sort + drop adjacent duplicates, much faster than np.unique on 64-bit hashes
+        import numpy as np
+
+        hashes = np.sort(hashes)
+        return hashes[np.concatenate(([True], hashes[1:] != hashes[:-1]))] if len(hashes) else hashes
+
+    @staticmethod
+    def _isIn(hashes, sorted_hashes):
+        import numpy as np
+
+        if len(sorted_hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        # sorted queries walk the index in order (cache friendly binary searches)
+        order = np.argsort(hashes)
+        position = np.empty(len(hashes), dtype='int64')
+        position[order] = np.searchsorted(sorted_hashes, hashes[order])
+        position = position.clip(max=len(sorted_hashes) - 1)
+        return sorted_hashes[position] == hashes
+
+    def changedRows(self, chunks):
+        """
+        Rows of the new snapshot that are not in the index or whose content changed.
+
+        Args:
+            chunks: DataFrame or iterable of DataFrames (the whole new snapshot)
+
+        Yields:
+            pd.DataFrame: New/changed rows of every chunk
+        """
+        for chunk in ([chunks] if isinstance(chunks, pd.DataFrame) else chunks):
+            # every column is hashed once and shared by the key and the row hash
+            column_hash = {column: pd.util.hash_pandas_object(chunk[column], index=False, categorize=False).to_numpy()
+                           for column in chunk.columns}
+            key_hash = self._combine([column_hash[column] for column in self.key_columns])
+            row_hash = self._combine(list(column_hash.values()))
+            self._new_keys.append(key_hash)
+            self._new_rows.append(row_hash)
+
+            is_unchanged = self._isIn(row_hash, self._rows)
+            is_changed = ~is_unchanged & self._isIn(key_hash, self._keys)
+            is_new = ~is_unchanged & ~is_changed
+
+            self.stats['new'] += int(is_new.sum())
+            self.stats['changed'] += int(is_changed.sum())
+            self.stats['unchanged'] += int(is_unchanged.sum())
+
+            if not is_unchanged.all():
+                yield chunk[~is_unchanged]
+
+    def save(self, checksum: str):
+        """
+        Replace the index by the snapshot read through changedRows(), written aside and renamed.
+
+        Args:
+            checksum: Checksum of the snapshot's source file
+        """
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        keys = np.concatenate(self._new_keys) if self._new_keys else np.array([], dtype='uint64')
+        rows = np.concatenate(self._new_rows) if self._new_rows else np.array([], dtype='uint64')
+        sorted_keys, sorted_rows = self._sortedUnique(keys), self._sortedUnique(rows)
+        self.stats['removed'] = int((~self._isIn(self._keys, sorted_keys)).sum())
+
+        table = pa.table({'key_hash': keys, 'row_hash': rows},
+                         metadata={'source_checksum': checksum, 'key_columns': ','.join(self.key_columns)})
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        # random 64-bit hashes do not dictionary encode
+        pq.write_table(table, tmp_path, use_dictionary=False)
+        os.replace(tmp_path, self.path)
+
+        self._keys, self._rows, self.checksum = sorted_keys, sorted_rows, checksum
+        self._new_keys, self._new_rows = [], []
+        print(f"✓ Snapshot index saved: {self.stats['new']} new, {self.stats['changed']} changed, "
+              f"{self.stats['unchanged']} unchanged, {self.stats['removed']} removed rows")
+
+
+def _compactDataset(df: pd.DataFrame, path: str, format: str, partition_cols: list, storage: dict = None):
+    """
+    Rewrite the whole dataset at path as existing data + df.
+
+    A parquet table directory is rewritten in place like mergePartitions: the new files are
+    written next to the old ones, the manifest swaps them in at once (readers see the old or
+    the new table, never none or both) and the old files are removed afterwards. A date
+    index of the table is rebuilt for the new files. A single parquet file is replaced by
+    one rename.
+    """
+    import pyarrow.parquet as pq
+
     if Path(path).exists():
         # Read existing data
         if format == "parquet":
-            existing_df = pd.read_parquet(path)
+            existing_df = readTable(path)
         elif format == "csv":
             existing_df = pd.read_csv(path)
-        elif format == "json":
-            existing_df = pd.read_json(path)
         else:
-            raise ValueError(f"Unsupported format: {format}")
-
-        # Append new data
+            existing_df = pd.read_json(path, lines=True)
         combined_df = pd.concat([existing_df, df], ignore_index=True)
+    else:
+        combined_df = df
 
-        # Write combined data
-        if format == "parquet":
-            combined_df.to_parquet(path, index=False, partition_cols= partition_cols)
-        elif format == "csv":
-            combined_df.to_csv(path, index=False)
-        elif format == "json":
-            combined_df.to_json(path, orient="records", lines=True)
-
-        print(
-            f"✓ Appended {len(df)} records to {path} (total: {len(combined_df)})")
+    if format == "csv":
+        combined_df.to_csv(path, index=False)
+    elif format == "json":
+        combined_df.to_json(path, orient="records", lines=True)
+    elif not partition_cols and not Path(path).is_dir():
+        writeParquetFile(combined_df, path, storage)
     else:
-        # Create new file
-        if format == "parquet":
-            df.to_parquet(path, index=False, partition_cols= partition_cols)
-        elif format == "csv":
-            df.to_csv(path, index=False)
-        elif format == "json":
-            df.to_json(path, orient="records", lines=True)
+        # legacy single file becomes a directory - one-off migration like mergePartitions
+        if Path(path).is_file():
+            os.remove(path)
+        Path(path).mkdir(parents=True, exist_ok=True)
+
+        # the manifest is the commit point - a table without one gets it before new files appear
+        if readManifest(path) is None:
+            updateManifest(path)
+        old_files = tableFiles(path, use_index=False)
+        # partitions superseded by a compacted file are on disk but not in the table - they go too
+        on_disk = [str(file) for file in Path(path).rglob("*.parquet")
+                   if not any(part.startswith(tuple(_IGNORED_PREFIXES)) for part in file.relative_to(path).parts)]
+        index_path = Path(path) / DATE_INDEX
+        index_column = pq.read_schema(index_path).names[0] if index_path.is_file() else None
 
-        print(f"✓ Created {path} with {len(df)} records")
+        added = _writeParquetPartitions(combined_df, path, partition_cols,
+                                        (storage or {}).get("row_group_size", 100_000), storage)
+        updateManifest(path, added=added, removed=old_files)
+        for file in on_disk:
+            os.remove(file)
+            try:
+                os.rmdir(Path(file).parent)  # partition directories the rewrite left empty
+            except OSError:
+                pass
+        if index_column is not None:
+            updateDateIndex(path, index_column)
+
+    print(f"✓ Compacted {path} with {len(df)} new records (total: {len(combined_df)})")
 
 
 def absPath():
-    return r"C:\Users\rogoz\Documents\own_projects\futuremind-assesment"
+    # PROJECT_PATH (as in the dashboard's .env) points the pipelines at another project root
+    return os.getenv("PROJECT_PATH", r"C:\Users\rogoz\Documents\own_projects\futuremind-assesment")
 
 
 
-def updatePipelineStatus(pipeline_id: str, status: str = 'success'):
+def updatePipelineStatus(pipeline_id: str, status: str = 'success', watermark: dict = None):
     """
     Write pipeline execution status to metadata file.
     
     Args:
         pipeline_id: Pipeline identifier (e.g., 'Revenues-Bronze')
         status: Execution status ('success', 'failed', etc.)
+        watermark: Optional processed watermark per source, stored on success
+                   (e.g., {'revenues': 1770735989})
     """
     # Prepare metadata path
     metadata_dir = Path("../metadata/status/")
@@ -146,10 +673,15 @@ def updatePipelineStatus(pipeline_id: str, status: str = 'success'):
         metadata["last_success_timestamp"] = current_time.isoformat()
         metadata["last_success_timestamp_unix"] = current_unix
         metadata["last_success_date"] = current_time.strftime('%Y-%m-%d')
+        if watermark is not None:
+            metadata["watermark"] = {**metadata.get("watermark", {}), **watermark}
     
-    # Write updated metadata
-    with open(metadata_file, 'w') as f:
+    # Write updated metadata aside and rename it into place - readers (and parallel runs)
+    # never see a half written status file
+    tmp_file = metadata_dir / f".{pipeline_id}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as f:
         json.dump(metadata, indent=2, fp=f)
+    os.replace(tmp_file, metadata_file)
     
     print(f"✓ Updated pipeline status: {pipeline_id} - {status}")
 
@@ -185,7 +717,98 @@ def getLastSuccessUnix(pipeline_id: str) -> int:
         return 0
 
 
-def loadBronzeInDelta(bronze_path: str, partition_col: str, last_success_unix: int) -> pd.DataFrame:
+def getWatermark(pipeline_id: str, source: str) -> int:
+    """
+    Read processed watermark of a source from metadata.
+
+    The watermark is the highest _tf_ingestion_time of the source that the pipeline
+    has already processed (stored by updatePipelineStatus).
+    
+    Args:
+        pipeline_id: Pipeline identifier (e.g., 'factRevenues-Gold')
+        source: Source name (e.g., 'revenues')
+        
+    Returns:
+        int: Watermark, or 0 if not found (full load)
+    """
+    metadata_file = Path(f"../metadata/status/{pipeline_id}.json")
+
+    if not metadata_file.exists():
+        return 0
+
+    try:
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+        return metadata.get('watermark', {}).get(source, 0)
+    except:
+        return 0
+
+
+def getDeltaWatermark(df: pd.DataFrame, watermark: int, column: str = '_tf_ingestion_time') -> int:
+    """
+    New watermark after processing df - highest value of column, or the old watermark for an empty delta.
+    """
+    if df.empty:
+        return watermark
+    return max(int(watermark), int(df[column].max()))
+
+
+def dropTable(path: str):
+    """
+    Remove a table (single parquet file or dataset directory) if it exists.
+    """
+    import shutil
+
+    if Path(path).is_dir():
+        shutil.rmtree(path)
+    elif Path(path).exists():
+        os.remove(path)
+    print(f"✓ Dropped {path}")
+
+
+@instrumented
+def appendDimensionMembers(df: pd.DataFrame, target_path: str, primary_keys: list,
+                           storage: dict = None) -> pd.DataFrame:
+    """
+    Append only new members (by primary key) to a dimension stored as a parquet directory.
+    Existing members are never rewritten; only their key columns are read.
+
+    Args:
+        df: Candidate dimension members
+        target_path: Path to dimension dataset
+        primary_keys: List of columns identifying a member (e.g., ['_sk_distributor'])
+        storage: Table storage config (see storageConfig)
+
+    Returns:
+        pd.DataFrame: Members that were appended
+    """
+    df = df.drop_duplicates(subset=primary_keys)
+
+    # legacy single-file dimension becomes the first file of the dataset
+    if Path(target_path).is_file():
+        tmp_path = f"{target_path}.legacy"
+        os.replace(target_path, tmp_path)
+        Path(target_path).mkdir(parents=True)
+        os.replace(tmp_path, Path(target_path) / "legacy-0.parquet")
+
+    if Path(target_path).exists():
+        df_existing = readTable(target_path, columns=primary_keys, arrow_backed=False)
+        df_new = (df.merge(df_existing, on=primary_keys, how='left', indicator=True)
+                  .query("_merge == 'left_only'")
+                  .drop(columns='_merge'))
+    else:
+        df_new = df
+
+    if df_new.empty:
+        print(f"✓ No new members for {target_path}")
+        return df_new
+
+    appendMode(df_new, target_path, format="parquet", storage=storage)
+    return df_new
+
+
+@instrumented
+def loadBronzeInDelta(bronze_path: str, partition_col: str, last_success_unix: int, columns: list = None) -> pd.DataFrame:
     """
     Load Bronze data incrementally based on last success timestamp.
     
@@ -193,75 +816,1075 @@ def loadBronzeInDelta(bronze_path: str, partition_col: str, last_success_unix: i
         bronze_path: Path to bronze parquet data
         partition_col: Partition column name (e.g., '_tf_ingestion_time')
         last_success_unix: Last successful run Unix timestamp (0 for full load)
+        columns: Columns to read (default: all)
         
     Returns:
         pd.DataFrame: Filtered dataframe
     """
     
-    df = pd.read_parquet(
+    df = readTable(
         bronze_path,
-        engine='fastparquet',
+        columns=columns,
         filters=[(partition_col, '>', last_success_unix)]
     )
     
-    print(f"✓ Loaded {len(df)} records from {bronze_path}")
     return df
 
 
-def deduplicateRecords(df: pd.DataFrame, business_keys: list, order_by: list, ascending: bool = False) -> pd.DataFrame:
+# files/dirs inside a table directory that are not data (hidden temp files, sidecars)
+_IGNORED_PREFIXES = [".", "_metadata", "_common_metadata", "_date_index", "_manifest"]
+
+# sidecar of a table sorted / partitioned by a date column: date -> (file, row group, offset)
+DATE_INDEX = "_date_index.parquet"
+
+# sidecar listing every data file of a table directory (see updateManifest)
+MANIFEST = "_manifest.parquet"
+
+# lock file held by the writer updating the manifest (see _manifestLock)
+MANIFEST_LOCK = f".{MANIFEST}.lock"
+
+
+def tableFiles(path: str, partition_values: dict = None, use_index: bool = True, filters: list = None) -> list:
     """
-    Deduplicate records based on business keys, keeping record with highest/lowest order_by values.
-    
+    Data files of a parquet table (single file or hive partitioned directory), skipping the
+    hidden and sidecar entries readTable ignores.
+
+    Files of listed values of an indexed column come from the table's date index (see
+    updateDateIndex), the others from the table's manifest (see updateManifest) - no
+    directory of the table is listed. Only tables without a manifest are listed.
+
+    A planned file that is missing was replaced by a writer since the manifest was read: the
+    manifest is read once more. Files still missing were deleted by hand and are dropped
+    from the manifest.
+
+    Partitions and compacted files superseded by a compacted file (see compactTable) are
+    left out.
+
     Args:
-        df: Input DataFrame
-        business_keys: List of columns defining unique business records (e.g., ['id', 'date'])
-        order_by: List of columns to order by before deduplication (e.g., ['_tf_ingestion_time'])
-        ascending: If True, keep first (lowest); if False, keep last (highest)
-        
+        path: Table path
+        partition_values: Keep only partitions whose value is listed, e.g. {'date': ['2024-01-01']}
+        use_index: Take the files from the date index if the table has one
+        filters: Row filters as in readTable - files whose manifest min / max cannot match
+                 are left out (no effect without a manifest)
+
     Returns:
-        pd.DataFrame: Deduplicated DataFrame
+        list: Sorted file paths
     """
-    
-    initial_count = len(df)
-    
-    # Sort by order_by columns (descending by default to keep latest)
-    df_sorted = df.sort_values(by=order_by, ascending=ascending)
-    
-    # Drop duplicates based on business keys, keeping first after sort
-    df_deduped = df_sorted.drop_duplicates(subset=business_keys, keep='first')
-    
-    # Reset index
-    df_deduped = df_deduped.reset_index(drop=True)
-    
-    duplicates_removed = initial_count - len(df_deduped)
-    print(f"✓ Deduplication: {initial_count} → {len(df_deduped)} records ({duplicates_removed} duplicates removed)")
-    
-    return df_deduped
+    if use_index and partition_values and len(partition_values) == 1:
+        (column, values), = partition_values.items()
+        entries = _indexEntries(path, column, values=values)
+        if entries is not None:
+            return sorted(os.path.join(path, *file.split("/")) for file in entries['file'].unique())
+
+    if Path(path).is_dir():
+        manifest = readManifest(path)
+        if manifest is not None:
+            files = _plannedFiles(path, manifest, partition_values, filters)
+            if all(os.path.exists(file) for file in files):
+                return files
+            # a writer swapped its files in and deleted the old ones since the manifest was read
+            files = _plannedFiles(path, readManifest(path), partition_values, filters)
+            missing = [file for file in files if not os.path.exists(file)]
+            if not missing:
+                return files
+            # removed behind the writers' back - drop them from the manifest, never list the
+            # directory (it may hold files of a writer that are not in the manifest yet)
+            print(f"⚠️  Manifest of {path} lists {len(missing)} missing files - removing them from it")
+            updateManifest(path, removed=missing)
+            missing = set(missing)
+            return [file for file in files if file not in missing]
+
+    return _listFiles(path, partition_values)
+
+
+def _listFiles(path: str, partition_values: dict = None) -> list:
+    """Data files of a table by listing its directories (see tableFiles)."""
+    path = Path(path)
+    if path.is_file():
+        return [str(path)]
+    if not path.is_dir():
+        return []
 
+    wanted = {col: {str(value) for value in values} for col, values in (partition_values or {}).items()}
 
-def mergeSilver(df_bronze: pd.DataFrame, target_path: str, primary_keys: list, order_by: list):
+    def selected(name):
+        if name.startswith(tuple(_IGNORED_PREFIXES)):
+            return False
+        col, _, value = name.partition("=")
+        return col not in wanted or value in wanted[col]
+
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if selected(d)]
+        files += [os.path.join(root, name) for name in names
+                  if name.endswith(".parquet") and not name.startswith(tuple(_IGNORED_PREFIXES))]
+    if (path / COMPACTED_DIR).is_dir():
+        files = _liveFiles(str(path), files)
+    return sorted(files)
+
+
+def _statValue(value):
+    """Manifest min / max of a column statistic - None for types / long strings not worth keeping."""
+    import datetime as dt
+
+    if isinstance(value, str):
+        return value if len(value) <= 64 else None
+    if isinstance(value, (bool, int, float, dt.date)):
+        return value
+    return None
+
+
+def _manifestEntry(path: str, file: str) -> dict:
     """
-    Simulate SQL MERGE statement with proper ordering.
-    
-    Args:
-        df_bronze: New data from Bronze layer
-        target_path: Path to Silver parquet file
-        primary_keys: List of columns defining primary key (e.g., ['id', 'date'])
-        order_by: List of columns to order by (e.g., ['_tf_ingestion_time', 'revenue'])
+    Manifest row of one data file: path relative to the table, partition directory, rows,
+    bytes and min / max of every column (from the footer statistics, partition columns
+    from the directory names, typed like readTable infers them).
     """
-    import pandas as pd
-    from pathlib import Path
-    
-    Path(target_path).parent.mkdir(parents=True, exist_ok=True)
-    
-    # Read existing Silver
+    import pyarrow.parquet as pq
+
+    relative = Path(file).relative_to(path)
+    parent = relative.parent.as_posix()
+    entry = {'file': relative.as_posix(), 'partition': "" if parent == "." else parent,
+             'rows': 0, 'bytes': os.path.getsize(file)}
+
+    for part in relative.parts[:-1]:
+        col, _, value = part.partition("=")
+        if value:
+            value = int(value) if value.lstrip("-").isdigit() else value
+            entry[f"min_{col}"] = entry[f"max_{col}"] = value
+
+    metadata = pq.read_metadata(file)
+    entry['rows'] = metadata.num_rows
+    row_groups = [metadata.row_group(i) for i in range(metadata.num_row_groups)]
+    row_groups = [row_group for row_group in row_groups if row_group.num_rows > 0]
+    for i in range(metadata.num_columns):
+        name = metadata.schema.column(i).path
+        if "." in name or not row_groups:
+            continue
+        stats = [row_group.column(i).statistics for row_group in row_groups]
+        if any(stat is None or not stat.has_min_max for stat in stats):
+            continue
+        try:
+            low, high = min(stat.min for stat in stats), max(stat.max for stat in stats)
+        except TypeError:
+            continue
+        entry[f"min_{name}"], entry[f"max_{name}"] = _statValue(low), _statValue(high)
+    return entry
+
+
+def _manifestTable(entries: list):
+    """Arrow table of manifest rows, columns typed from their values (strings when types are mixed)."""
+    import pyarrow as pa
+
+    columns = {}
+    for entry in entries:
+        for name in entry:
+            columns.setdefault(name, None)
+
+    arrays = {}
+    for name in columns:
+        values = [entry.get(name) for entry in entries]
+        try:
+            arrays[name] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays[name] = pa.array([None if value is None else str(value) for value in values], pa.string())
+    return pa.table(arrays) if arrays else pa.table({'file': pa.array([], pa.string())})
+
+
+def readManifest(path: str):
+    """
+    Manifest of a table directory as arrow table (one row per data file), None if it has none.
+    """
+    import pyarrow.parquet as pq
+
+    manifest_path = Path(path) / MANIFEST
+    if not manifest_path.exists():
+        return None
+    return pq.read_table(manifest_path)
+
+
+@contextmanager
+def _manifestLock(path: str, timeout: float = 300):
+    """
+    Exclusive lock of a table's manifest for its read -> update -> write: an OS lock (flock,
+    msvcrt.locking on Windows) on a lock file next to it. Writers wait for each other. The OS
+    releases the lock of a writer that dies with its process, so no lock is ever judged stale
+    and broken; the lock file itself stays in place.
+
+    Raises:
+        TimeoutError: The manifest stayed locked for timeout seconds
+    """
+    lock_path = Path(path) / MANIFEST_LOCK
+    deadline = time.monotonic() + timeout
+    fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
     try:
-        df_silver = pd.read_parquet(target_path, engine='fastparquet')
-    except:
-        df_silver = pd.DataFrame()
-    
-    if df_silver.empty:
-        df_bronze.to_parquet(target_path, index=False)
+        while not _tryLock(fd):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Manifest of {path} is locked by another writer ({lock_path})")
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def _tryLock(fd: int) -> bool:
+    """Take the exclusive lock of an open lock file without waiting (see _manifestLock)."""
+    if os.name == "nt":
+        import msvcrt
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    import fcntl
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _unlock(fd: int):
+    if os.name == "nt":
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _writeManifest(path: str, table):
+    import pyarrow.parquet as pq
+
+    manifest_path = Path(path) / MANIFEST
+    tmp_path = manifest_path.with_name(f".{MANIFEST}.{os.getpid()}.tmp")
+    pq.write_table(table.sort_by('file') if table.num_rows else table, tmp_path, compression="zstd")
+    os.replace(tmp_path, manifest_path)
+
+
+@instrumented
+def updateManifest(path: str, added: list = (), removed: list = ()):
+    """
+    Record written / deleted data files in the table's manifest (_manifest.parquet).
+
+    Writers call it after their new files are in place and before old files are deleted:
+    the manifest is swapped in one rename, so a reader planning from it sees the table
+    either before or after the write, never in between. Only the footers of added files
+    are read. A table without a manifest gets one built from a listing of its files.
+    The read -> update -> write runs under the manifest lock (_manifestLock), so writers of
+    one table (e.g. a bronze load and Bronze-Compaction) apply their updates one after the
+    other and none is lost. Files deleted behind the writers' back are dropped from the
+    manifest by readers (see tableFiles); files added without updateManifest stay invisible
+    until rebuildManifest.
+
+    Args:
+        path: Table directory
+        added: Paths of data files written
+        removed: Paths of data files replaced (still on disk or already deleted)
+    """
+    with _manifestLock(path):
+        _updateManifest(path, added, removed)
+    countIO(read=[Path(path) / MANIFEST], written=[Path(path) / MANIFEST])
+
+
+def _updateManifest(path: str, added: list, removed: list):
+    """Read -> update -> write of updateManifest, called with the manifest lock held."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    manifest = readManifest(path)
+    removed_names = {Path(file).relative_to(path).as_posix() for file in removed}
+
+    if manifest is None:
+        files = [file for file in _listFiles(path) if Path(file).relative_to(path).as_posix() not in removed_names]
+        added, manifest = files, None
+    else:
+        added_names = {Path(file).relative_to(path).as_posix() for file in added}
+        keep = pc.invert(pc.is_in(manifest['file'], value_set=pa.array(sorted(removed_names | added_names), pa.string())))
+        manifest = manifest.filter(keep)
+
+    entries = _manifestTable([_manifestEntry(path, file) for file in added])
+    if manifest is not None and manifest.num_rows:
+        try:
+            entries = pa.concat_tables([manifest, entries], promote_options="permissive")
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            entries = _manifestTable(manifest.to_pylist() + entries.to_pylist())
+
+    _writeManifest(path, entries)
+
+
+def rebuildManifest(path: str):
+    """
+    Manifest of a table built from a listing of its files - for tables written before
+    manifests or changed by hand. Run it while no job writes the table: the listing also
+    holds files a writer has written but not recorded yet, next to the files they replace.
+
+    Returns:
+        pyarrow.Table: The new manifest
+    """
+    with _manifestLock(path):
+        table = _manifestTable([_manifestEntry(path, file) for file in _listFiles(path)])
+        _writeManifest(path, table)
+    print(f"✓ Rebuilt manifest of {path} ({table.num_rows} files)")
+    return table
+
+
+def _plannedFiles(path: str, manifest, partition_values: dict = None, filters: list = None) -> list:
+    """
+    Files of a manifest in listed partitions whose min / max can match every filter. Unknown
+    statistics and filters the statistics cannot answer keep the file.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    keep = pa.array([True] * manifest.num_rows, pa.bool_())
+
+    # like the listing: files outside of any partition of col (compacted, unpartitioned) stay
+    for col, values in (partition_values or {}).items():
+        wanted = {f"{col}={value}" for value in values}
+        in_partition = []
+        for partition in manifest['partition'].to_pylist():
+            parts = partition.split("/")
+            in_partition.append(any(part in wanted for part in parts)
+                                or not any(part.startswith(f"{col}=") for part in parts))
+        keep = pc.and_(keep, pa.array(in_partition, pa.bool_()))
+
+    for col, op, value in filters or []:
+        if f"min_{col}" not in manifest.column_names:
+            continue
+        low, high = manifest[f"min_{col}"], manifest[f"max_{col}"]
+        try:
+            if op == '>':
+                match = pc.greater(high, value)
+            elif op == '>=':
+                match = pc.greater_equal(high, value)
+            elif op == '<':
+                match = pc.less(low, value)
+            elif op == '<=':
+                match = pc.less_equal(low, value)
+            elif op in ('=', '=='):
+                match = pc.and_(pc.less_equal(low, value), pc.greater_equal(high, value))
+            elif op == 'in':
+                match = pa.array([False] * manifest.num_rows, pa.bool_())
+                for item in value:
+                    match = pc.or_(match, pc.and_(pc.less_equal(low, item), pc.greater_equal(high, item)))
+            else:
+                continue
+        except pa.ArrowException:
+            continue
+        keep = pc.and_(keep, pc.fill_null(match, True))
+
+    files = manifest.filter(keep)['file'].to_pylist()
+    return sorted(os.path.join(path, *file.split("/")) for file in files)
+
+
+# folder of a table's compacted files - <first>-<last>-<id>.parquet, named by the range of the
+# (integer) partition values they hold as a column
+COMPACTED_DIR = "compacted"
+
+
+def _compactedRange(name: str) -> tuple:
+    """(first, last) partition value of a compacted file name, None if it is not one."""
+    first, _, rest = name.partition("-")
+    last, _, _ = rest.partition("-")
+    if not (first.isdigit() and last.isdigit() and name.endswith(".parquet")):
+        return None
+    return int(first), int(last)
+
+
+def _liveRanges(ranges: list) -> list:
+    """Ranges not contained in another range (the current compacted files), sorted."""
+    live = []
+    for first, last in sorted(set(ranges), key=lambda r: (r[0], -r[1])):
+        if live and live[-1][0] <= first and last <= live[-1][1]:
+            continue
+        live.append((first, last))
+    return live
+
+
+def _isCovered(live: list, first: int, last: int) -> bool:
+    """Whether [first, last] lies inside one of the live ranges."""
+    import bisect
+
+    i = bisect.bisect_right(live, (first, float("inf"))) - 1
+    return i >= 0 and live[i][0] <= first and last <= live[i][1]
+
+
+def _liveFiles(path: str, files: list) -> list:
+    """
+    Files of a compacted table without the ones a compacted file supersedes: partitions
+    whose value lies in the range of a compacted file and compacted files inside a larger
+    range. They stay on disk until the next compaction removes them.
+    """
+    compacted = {}
+    for file in files:
+        parts = Path(file).relative_to(path).parts
+        if len(parts) == 2 and parts[0] == COMPACTED_DIR and _compactedRange(parts[1]):
+            compacted[file] = _compactedRange(parts[1])
+    live = _liveRanges(list(compacted.values()))
+    if not live:
+        return files
+
+    def superseded(file):
+        if file in compacted:
+            first, last = compacted[file]
+            return (first, last) not in live
+        _, _, value = Path(file).relative_to(path).parts[0].partition("=")
+        return value.lstrip("-").isdigit() and _isCovered(live, int(value), int(value))
+
+    return [file for file in files if not superseded(file)]
+
+
+def _tableUnits(path: str) -> tuple:
+    """
+    Partition directories and compacted files of a table partitioned by one integer column.
+
+    Returns:
+        tuple: (live units, superseded units) - dicts with first / last partition value,
+               files, bytes and whether the unit is a compacted file, sorted by first
+    """
+    units = []
+    for entry in os.scandir(path):
+        if entry.name.startswith(tuple(_IGNORED_PREFIXES)):
+            continue
+        col, _, value = entry.name.partition("=")
+        if entry.is_dir() and value.lstrip("-").isdigit():
+            files = sorted(os.path.join(entry.path, name) for name in os.listdir(entry.path)
+                           if name.endswith(".parquet") and not name.startswith(tuple(_IGNORED_PREFIXES)))
+            units.append({'first': int(value), 'last': int(value), 'path': entry.path, 'files': files,
+                          'compacted': False})
+        elif entry.is_dir() and entry.name == COMPACTED_DIR:
+            for name in sorted(os.listdir(entry.path)):
+                if _compactedRange(name) and not name.startswith(tuple(_IGNORED_PREFIXES)):
+                    first, last = _compactedRange(name)
+                    file = os.path.join(entry.path, name)
+                    units.append({'first': first, 'last': last, 'path': file, 'files': [file], 'compacted': True})
+
+    for unit in units:
+        unit['bytes'] = sum(os.path.getsize(file) for file in unit['files'])
+
+    live_ranges = _liveRanges([(unit['first'], unit['last']) for unit in units if unit['compacted']])
+    live, superseded = [], []
+    for unit in sorted(units, key=lambda unit: (unit['first'], unit['last'])):
+        covered = _isCovered(live_ranges, unit['first'], unit['last'])
+        if covered and not (unit['compacted'] and (unit['first'], unit['last']) in live_ranges):
+            superseded.append(unit)
+        else:
+            live.append(unit)
+    return live, superseded
+
+
+def _removeUnit(unit: dict):
+    """Delete a partition directory (hidden by a rename first) or a compacted file."""
+    import shutil
+
+    if unit['compacted']:
+        os.remove(unit['path'])
+        return
+    hidden = os.path.join(os.path.dirname(unit['path']), f".{os.path.basename(unit['path'])}.removed")
+    os.replace(unit['path'], hidden)
+    shutil.rmtree(hidden)
+
+
+def _writeCompacted(path: str, partition_col: str, group: list, row_group_size: int, storage: dict = None) -> tuple:
+    """
+    Write the rows of group (consecutive units) as one compacted file, in partition value
+    order with the partition value as a column, and rename it into place.
+
+    Returns:
+        tuple: (written file, rows)
+    """
+    import uuid
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    files = [(unit, file) for unit in group for file in unit['files']]
+    schemas = [pq.read_schema(file) for _, file in files]
+    schemas.append(pa.schema([(partition_col, pa.int64())]))
+    schema = _unifySchemas(schemas)
+    schema = schema.set(schema.get_field_index(partition_col), pa.field(partition_col, pa.int64()))
+
+    compacted_dir = Path(path) / COMPACTED_DIR
+    compacted_dir.mkdir(exist_ok=True)
+    name = f"{group[0]['first']}-{group[-1]['last']}-{uuid.uuid4().hex[:8]}.parquet"
+    tmp_file = compacted_dir / f".{name}.tmp"
+
+    rows = 0
+    pending, pending_rows = [], 0
+    try:
+        with pq.ParquetWriter(tmp_file, schema, **parquetWriteOptions(storage)) as writer:
+            for unit, file in files:
+                table = pq.read_table(file)
+                if not unit['compacted']:
+                    table = table.append_column(partition_col, pa.array([unit['first']] * table.num_rows, pa.int64()))
+                for field in schema:
+                    if field.name not in table.column_names:
+                        table = table.append_column(field.name, pa.nulls(table.num_rows, field.type))
+                pending.append(table.select(schema.names).cast(schema))
+                pending_rows += table.num_rows
+                rows += table.num_rows
+
+                # full row groups only - small partitions are packed together
+                while pending_rows >= row_group_size:
+                    combined = pa.concat_tables(pending)
+                    writer.write_table(combined.slice(0, row_group_size))
+                    pending = [combined.slice(row_group_size)]
+                    pending_rows -= row_group_size
+            if pending_rows:
+                writer.write_table(pa.concat_tables(pending))
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+    final_file = compacted_dir / name
+    os.replace(tmp_file, final_file)
+    return str(final_file), rows
+
+
+@instrumented
+def compactTable(path: str, partition_col: str, target_file_mb: float = 128, min_age_hours: float = 24,
+                 retention_before: int = None, row_group_size: int = 100_000, storage: dict = None) -> dict:
+    """
+    Merge small partitions of an append-only table partitioned by one integer column (bronze
+    _tf_ingestion_time=<unix>) into compacted files of about target_file_mb, optionally
+    dropping old partitions.
+
+    Consecutive partitions older than min_age_hours (and compacted files under half the
+    target size) are written to compacted/<first>-<last>-<id>.parquet in partition value
+    order. The partition value is kept as a column, so filters on it (loadBronzeInDelta's
+    watermark) still work - through row-group statistics instead of directory names.
+
+    A compacted file supersedes every partition in its range the moment it is renamed into
+    place (and replaces them in the manifest right after): tableFiles / readTable skip
+    superseded files, so readers see either the old partitions or the compacted file,
+    never both or a half written one. Superseded files
+    are deleted by the next run, after readers that listed them before the swap are done.
+    min_age_hours has to exceed the runtime of a writer, so a partition still being written
+    is never in a compacted range.
+
+    Args:
+        path: Table path
+        partition_col: Integer partition column (e.g., '_tf_ingestion_time')
+        target_file_mb: On-disk size compacted files are filled up to
+        min_age_hours: Partitions younger than this (by partition value, unix seconds) are left alone
+        retention_before: Drop partitions / compacted files whose values all lie below it (None = keep all)
+        row_group_size: Rows per row group of the compacted files
+        storage: Table storage config (see storageConfig)
+
+    Returns:
+        dict: Counts of compacted, written, expired and removed units and rows compacted
+    """
+    stats = {'compacted_units': 0, 'files_written': 0, 'rows': 0, 'expired_units': 0, 'removed_units': 0}
+    if not Path(path).is_dir():
+        print(f"⚠️  No table at {path} - nothing to compact")
+        return stats
+
+    live, superseded = _tableUnits(path)
+
+    # superseded by an earlier run, past retention - out of the manifest first, then deleted
+    expired = [unit for unit in live if retention_before is not None and unit['last'] < retention_before]
+    live = [unit for unit in live if unit not in expired]
+    if superseded or expired:
+        updateManifest(path, removed=[file for unit in superseded + expired for file in unit['files']])
+        for unit in superseded + expired:
+            _removeUnit(unit)
+    stats['removed_units'], stats['expired_units'] = len(superseded), len(expired)
+
+    # runs of consecutive small, old units - a compacted range must not span a unit it leaves out
+    min_age_before = int(time.time() - min_age_hours * 3600)
+    target_bytes = target_file_mb * 2**20
+    groups, group = [], []
+    for unit in live:
+        eligible = unit['last'] < min_age_before and not (unit['compacted'] and unit['bytes'] >= target_bytes / 2)
+        if group and (not eligible or sum(u['bytes'] for u in group) + unit['bytes'] > target_bytes):
+            groups.append(group)
+            group = []
+        if eligible:
+            group.append(unit)
+    groups.append(group)
+
+    written = []
+    for group in groups:
+        if len(group) < 2:
+            continue
+        file, rows = _writeCompacted(path, partition_col, group, (storage or {}).get("row_group_size", row_group_size),
+                                     storage)
+        countIO(read=[file for unit in group for file in unit['files']], written=[file])
+        updateManifest(path, added=[file], removed=[file for unit in group for file in unit['files']])
+        written.append(file)
+        stats['compacted_units'] += len(group)
+        stats['rows'] += rows
+
+    stats['files_written'] = len(written)
+    countRows(rows_in=stats['rows'], rows_out=stats['rows'])
+
+    print(f"✓ Compacted {stats['compacted_units']} partitions / files of {path} into {len(written)} files "
+          f"({stats['rows']} rows), {stats['expired_units']} expired, {stats['removed_units']} superseded removed")
+    return stats
+
+
+
+
+@instrumented
+def readTable(path: str, columns: list = None, filters: list = None, arrow_backed: bool = True,
+              use_threads: bool = True) -> pd.DataFrame:
+    """
+    Read a parquet table (single file or hive partitioned directory) with column
+    projection and row filters pushed down to the parquet reader.
+
+    Only the requested columns are decoded, partitions and row groups that cannot
+    match the filters are skipped (partition values / row-group statistics) and the
+    remaining row groups are read in parallel. A table with a manifest is neither listed
+    nor are the footers of files the manifest rules out read.
+    
+    Args:
+        path: Path to parquet file or dataset directory
+        columns: Columns to read (default: all)
+        filters: Row filters as list of (column, op, value) tuples,
+                 e.g. [('_tf_ingestion_time', '>', 1770720298)]
+        arrow_backed: Keep strings in arrow memory (pyarrow backed string dtype)
+                      instead of converting them to python objects
+        use_threads: Read row groups in parallel
+        
+    Returns:
+        pd.DataFrame: Projected and filtered data
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    # tables with a manifest are planned from it (only files that can match the filters),
+    # a compacted table still holds the partitions its compacted files superseded
+    source, base_dir = path, None
+    if Path(path).is_dir() and (Path(path, MANIFEST).exists() or Path(path, COMPACTED_DIR).is_dir()):
+        source, base_dir = tableFiles(path, use_index=False, filters=filters), path
+        if not source:
+            # no file can match - one of them still gives the schema of the empty result
+            source = tableFiles(path, use_index=False)[:1]
+
+    dataset = ds.dataset(source, format="parquet", partitioning="hive", partition_base_dir=base_dir,
+                         ignore_prefixes=_IGNORED_PREFIXES)
+
+    # files may disagree on types (e.g. all-null column in one partition)
+    fragments = list(dataset.get_fragments())
+    if len(fragments) > 1:
+        schema = _unifySchemas([dataset.schema] + [f.physical_schema for f in fragments])
+        dataset = ds.dataset(source, format="parquet", partitioning="hive", partition_base_dir=base_dir,
+                             ignore_prefixes=_IGNORED_PREFIXES, schema=schema)
+
+    expression = pq.filters_to_expression(filters) if filters else None
+    if filters and any(op == 'in' and len(value) == 0 for _, op, value in filters):
+        # an empty "in" list matches nothing (and has no type arrow could compare the column with)
+        expression = pc.scalar(False)
+    countIO(read=[fragment.path for fragment in dataset.get_fragments(filter=expression)])
+
+    table = dataset.to_table(
+        columns=columns,
+        filter=expression,
+        use_threads=use_threads
+    )
+
+    if arrow_backed:
+        string_dtype = pd.StringDtype("pyarrow")
+        df = table.to_pandas(types_mapper={pa.string(): string_dtype, pa.large_string(): string_dtype}.get)
+    else:
+        df = table.to_pandas()
+
+    print(f"✓ Loaded {len(df)} records ({len(df.columns)} columns) from {path}")
+    return df
+
+
+def _unifySchemas(schemas: list):
+    """
+    Common schema of the files of a table. Files written before a storage type was
+    declared hold the column as plain strings - they are read as the declared type
+    (dictionary, date), the scanner casts them.
+    """
+    import pyarrow as pa
+
+    try:
+        return pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        is_string = lambda t: pa.types.is_string(t) or pa.types.is_large_string(t)
+        typed = {field.name: field.type for schema in schemas for field in schema if not is_string(field.type)}
+        schemas = [pa.schema([field.with_type(typed[field.name]) if is_string(field.type) and field.name in typed
+                              else field for field in schema], metadata=schema.metadata)
+                   for schema in schemas]
+        return pa.unify_schemas(schemas, promote_options="permissive")
+
+
+def _indexFileEntries(file: str, relative: str, column: str) -> list:
+    """
+    Date index rows (value, file, row_group, offset, rows) of one parquet file. A partition
+    value in the path covers the whole file; otherwise the column is read and every run of
+    equal values within a row group becomes one row.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(file)
+    metadata = parquet_file.metadata
+
+    partition = [part.split("=", 1)[1] for part in relative.split("/") if part.startswith(f"{column}=")]
+    if partition:
+        return [(partition[0], relative, i, 0, metadata.row_group(i).num_rows)
+                for i in range(metadata.num_row_groups) if metadata.row_group(i).num_rows]
+
+    entries = []
+    for i in range(metadata.num_row_groups):
+        values = parquet_file.read_row_group(i, columns=[column]).column(0).cast("string").to_pandas()
+        # start of every run of equal values
+        starts = values.index[values.ne(values.shift())].tolist() + [len(values)]
+        entries += [(values.iloc[start], relative, i, start, end - start) for start, end in zip(starts, starts[1:])]
+    return entries
+
+
+@instrumented
+def updateDateIndex(path: str, column: str = 'date', values: list = None) -> pd.DataFrame:
+    """
+    Maintain the date index of a table (DATE_INDEX inside the table directory): one row
+    per date, file and row group with the offset of the date's first row in the row group
+    and its number of rows, sorted by date. Readers (readDates, tableFiles, the dashboard)
+    open only the files and row groups of the dates they need instead of listing and
+    scanning the whole table.
+
+    Only the entries of values are rebuilt - from the footers of the files of their
+    partitions, the data is not read. Without an index yet, or with values None, the
+    whole table is indexed. Call it after every write of the table.
+
+    Args:
+        path: Table directory (partitioned by column, or holding it sorted)
+        column: Indexed date column
+        values: Dates whose files were (re)written, None = all
+
+    Returns:
+        pd.DataFrame: The index
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not Path(path).is_dir():
+        return None
+
+    existing = _readDateIndex(path, column) if values is not None else None
+    if existing is None:
+        files = tableFiles(path, use_index=False)
+    else:
+        values = {str(value) for value in values}
+        files = tableFiles(path, {column: values}, use_index=False)
+
+    relative = {file: Path(file).relative_to(path).as_posix() for file in files}
+    entries = pd.DataFrame([entry for file in files for entry in _indexFileEntries(file, relative[file], column)],
+                           columns=[column, 'file', 'row_group', 'offset', 'rows'])
+
+    if existing is not None:
+        # files of touched dates were replaced - their old entries go, as do those of rewritten files
+        stale = existing[column].isin(values) | existing['file'].isin(set(relative.values()))
+        entries = pd.concat([existing[~stale], entries], ignore_index=True)
+
+    entries = entries.sort_values([column, 'file', 'row_group', 'offset'], ignore_index=True)
+    table = pa.table({
+        column: pa.array(entries[column], pa.string()),
+        'file': pa.array(entries['file'], pa.string()),
+        'row_group': pa.array(entries['row_group'], pa.int32()),
+        'offset': pa.array(entries['offset'], pa.int64()),
+        'rows': pa.array(entries['rows'], pa.int64())
+    })
+
+    index_path = Path(path) / DATE_INDEX
+    tmp_path = index_path.with_name(f".{index_path.name}.tmp")
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, index_path)
+    countIO(written=[index_path])
+
+    print(f"✓ Date index of {path}: {entries[column].nunique()} dates, {entries['file'].nunique()} files")
+    return entries
+
+
+def _readDateIndex(path: str, column: str = 'date') -> pd.DataFrame:
+    """The table's date index, None if it has none (for column)."""
+    import pyarrow.parquet as pq
+
+    index_path = Path(path) / DATE_INDEX
+    if not index_path.is_file():
+        return None
+    entries = pq.read_table(index_path).to_pandas()
+    return entries if column in entries.columns else None
+
+
+def _indexEntries(path: str, column: str, values=None, start=None, end=None) -> pd.DataFrame:
+    """
+    Index rows of the listed dates / of the inclusive range [start, end], in date order.
+    None when the table has no index or the index lists a file that no longer exists
+    (written by an older run) - callers fall back to listing the table.
+    """
+    entries = _readDateIndex(path, column)
+    if entries is None:
+        return None
+
+    selected = pd.Series(True, index=entries.index)
+    if values is not None:
+        selected &= entries[column].isin({str(value) for value in values})
+    if start is not None:
+        selected &= entries[column] >= str(start)
+    if end is not None:
+        selected &= entries[column] <= str(end)
+    entries = entries[selected]
+
+    if not all(os.path.exists(os.path.join(path, *file.split("/"))) for file in entries['file'].unique()):
+        print(f"⚠️  Date index of {path} is out of date - listing the table instead")
+        return None
+    return entries
+
+
+@instrumented
+def readDates(path: str, values: list = None, start=None, end=None, columns: list = None,
+              column: str = 'date', arrow_backed: bool = True) -> pd.DataFrame:
+    """
+    Read the rows of some dates of a table through its date index: only the row groups
+    holding them are decoded and each is cut to the date's rows (offset, rows). Rows come
+    back in date order. Tables without an index are read with readTable filters.
+
+    Args:
+        path: Table directory
+        values: Dates to read (e.g. ['2024-01-01', '2024-01-03']), None = no restriction
+        start: First date of a range (inclusive), None = open
+        end: Last date of a range (inclusive), None = open
+        columns: Columns to read (default: all)
+        column: Indexed date column
+        arrow_backed: Keep strings in arrow memory (see readTable)
+
+    Returns:
+        pd.DataFrame: Rows of the selected dates
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    entries = _indexEntries(path, column, values=values, start=start, end=end)
+    if entries is None:
+        filters = []
+        if values is not None:
+            filters.append((column, 'in', [str(value) for value in values]))
+        if start is not None:
+            filters.append((column, '>=', str(start)))
+        if end is not None:
+            filters.append((column, '<=', str(end)))
+        return readTable(path, columns=columns, filters=filters or None, arrow_backed=arrow_backed)
+
+    tables = []
+    countIO(read=[os.path.join(path, *file.split("/")) for file in entries['file'].unique()])
+    for file, file_entries in entries.groupby('file', sort=False):
+        parquet_file = pq.ParquetFile(os.path.join(path, *file.split("/")))
+        names = parquet_file.schema_arrow.names
+        row_groups = sorted(file_entries['row_group'].unique().tolist())
+        table = parquet_file.read_row_groups(row_groups, columns=[c for c in columns if c in names] if columns else None)
+
+        # first row of every read row group within table
+        first_row, position = {}, 0
+        for row_group in row_groups:
+            first_row[row_group] = position
+            position += parquet_file.metadata.row_group(row_group).num_rows
+
+        for entry in file_entries.itertuples(index=False):
+            part = table.slice(first_row[entry.row_group] + entry.offset, entry.rows)
+            if column not in names and (columns is None or column in columns):
+                # partition column - its value comes from the index
+                part = part.append_column(column, pa.array([getattr(entry, column)] * entry.rows, pa.string()))
+            tables.append(part)
+
+    if tables:
+        schema = _unifySchemas([table.schema for table in tables])
+        table = pa.concat_tables([table.select(schema.names).cast(schema) for table in tables])
+    else:
+        # no rows for these dates - empty table with the columns of the table
+        table = pq.read_schema(tableFiles(path, use_index=False)[0]).empty_table()
+        if column not in table.column_names:
+            table = table.append_column(column, pa.array([], pa.string()))
+    if columns:
+        table = table.select(columns)
+
+    if arrow_backed:
+        string_dtype = pd.StringDtype("pyarrow")
+        df = table.to_pandas(types_mapper={pa.string(): string_dtype, pa.large_string(): string_dtype}.get)
+    else:
+        df = table.to_pandas()
+
+    print(f"✓ Loaded {len(df)} records ({len(df.columns)} columns) from {path} "
+          f"({entries['file'].nunique()} files via date index)")
+    return df
+
+
+def _groupCodes(df: pd.DataFrame, columns: list) -> tuple:
+    """
+    Integer group id per row for the value combination of columns (missing values form
+    their own group, like drop_duplicates). Every column is factorized once and the codes
+    are combined arithmetically - no tuples of strings are hashed.
+
+    Returns:
+        tuple: (codes as int64 array, upper bound of the codes)
+    """
+    import numpy as np
+
+    codes, n_groups = np.zeros(len(df), dtype='int64'), 1
+    for column in columns:
+        column_codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        codes = codes * max(len(uniques), 1) + column_codes
+        n_groups *= max(len(uniques), 1)
+        # keep codes dense enough to index an array by them (and far from int64 overflow)
+        if n_groups > max(2 * len(df), 1 << 20):
+            codes, uniques = pd.factorize(codes)
+            n_groups = len(uniques)
+    return codes, n_groups
+
+
+def _orderCodes(df: pd.DataFrame, order_by: list, highest: bool):
+    """
+    Rank of every row's order_by values (lexicographic over the columns) as int64.
+    Missing values rank as the least preferred.
+    """
+    import numpy as np
+
+    ranks, n_ranks = np.zeros(len(df), dtype='int64'), 1
+    for column in order_by:
+        column_ranks, uniques = pd.factorize(df[column], sort=True)
+        column_ranks = column_ranks.astype('int64')
+        column_ranks[column_ranks < 0] = -1 if highest else len(uniques)
+        ranks = ranks * (len(uniques) + 2) + column_ranks + 1
+        n_ranks *= len(uniques) + 2
+        # order preserving re-numbering keeps ranks below len(df)
+        if n_ranks > max(len(df), 1 << 20):
+            ranks, uniques = pd.factorize(ranks, sort=True)
+            ranks, n_ranks = ranks.astype('int64'), len(uniques)
+    return ranks
+
+
+def latestRowMask(df: pd.DataFrame, keys: list, order_by=None, highest: bool = True, ties: str = None):
+    """
+    Boolean mask of the row kept per key: the one with the highest (or lowest) order_by
+    values, on ties / without order_by the first or last row (see ties).
+
+    Sort free dedup kernel: keys and order_by are factorized to integer codes once and a
+    single scatter-max over (order rank, row position) picks the winner of every group
+    in O(n). Unlike sort_values + drop_duplicates no sorted copy of the frame is made.
+
+    Args:
+        df: Input DataFrame
+        keys: Columns identifying a record (e.g., ['date', 'title'])
+        order_by: Column or list of columns ranking duplicates (e.g., '_tf_ingestion_time'), or None
+        highest: True = keep highest order_by, False = lowest
+        ties: 'first' / 'last' row wins ties; None = the last row for highest, the first for lowest
+
+    Returns:
+        np.ndarray: Boolean mask, True for the kept rows
+    """
+    import numpy as np
+
+    n = len(df)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+
+    codes, n_groups = _groupCodes(df, keys)
+    # the tie break is the row position, reversed when the other end has to win
+    reversed_ties = (ties or ('last' if highest else 'first')) != ('last' if highest else 'first')
+    position = np.arange(n, dtype='int64')
+    if reversed_ties:
+        position = n - 1 - position
+
+    if order_by:
+        order_by = [order_by] if isinstance(order_by, str) else list(order_by)
+        score = _orderCodes(df, order_by, highest) * n + position
+    else:
+        score = position
+
+    if highest:
+        best = np.full(n_groups, -1, dtype='int64')
+        np.maximum.at(best, codes, score)
+        best = best[best >= 0]
+    else:
+        best = np.full(n_groups, np.iinfo('int64').max, dtype='int64')
+        np.minimum.at(best, codes, score)
+        best = best[best < np.iinfo('int64').max]
+
+    rows = best % n
+    keep[n - 1 - rows if reversed_ties else rows] = True
+    return keep
+
+
+@instrumented
+def deduplicateRecords(df: pd.DataFrame, business_keys: list, order_by: list, ascending: bool = False) -> pd.DataFrame:
+    """
+    Deduplicate records based on business keys, keeping record with highest/lowest order_by values.
+    
+    Args:
+        df: Input DataFrame
+        business_keys: List of columns defining unique business records (e.g., ['id', 'date'])
+        order_by: List of columns to order by before deduplication (e.g., ['_tf_ingestion_time'])
+        ascending: If True, keep first (lowest); if False, keep last (highest).
+                   Ties keep the first row and missing order_by values lose, as with
+                   sort_values + drop_duplicates(keep='first')
+        
+    Returns:
+        pd.DataFrame: Deduplicated DataFrame (rows in input order)
+    """
+    
+    initial_count = len(df)
+    
+    # One winning row per business key - no sorted copy of the frame, rows keep their order
+    keep = latestRowMask(df, business_keys, order_by, highest=not ascending, ties='first')
+    
+    # Reset index
+    df_deduped = df[keep].reset_index(drop=True)
+    
+    duplicates_removed = initial_count - len(df_deduped)
+    print(f"✓ Deduplication: {initial_count} → {len(df_deduped)} records ({duplicates_removed} duplicates removed)")
+    
+    return df_deduped
+
+
+@instrumented
+def mergeSilver(df_bronze: pd.DataFrame, target_path: str, primary_keys: list, order_by: list,
+                partition_by: list = None, storage: dict = None):
+    """
+    Simulate SQL MERGE statement with proper ordering.
+
+    When partition_by is given the target is a hive partitioned dataset and only
+    the partitions touched by df_bronze are read and rewritten - the rest of the
+    table is left alone, so merge cost scales with the delta, not the table.
+    
+    Args:
+        df_bronze: New data from Bronze layer
+        target_path: Path to Silver parquet file (directory when partitioned)
+        primary_keys: List of columns defining primary key (e.g., ['id', 'date'])
+        order_by: List of columns to order by (e.g., ['_tf_ingestion_time', 'revenue']),
+                  None means incoming records always win
+        partition_by: List of partition columns (e.g., ['date']), should be part of primary_keys
+                      (or determined by them)
+        storage: Table storage config (see storageConfig)
+    """
+    import pandas as pd
+    from pathlib import Path
+
+    if partition_by:
+        mergePartitions(df_bronze, target_path, primary_keys, order_by, partition_by, storage=storage)
+        return
+    
+    Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+    
+    # Read existing Silver
+    countIO(read=[target_path])
+    try:
+        df_silver = pd.read_parquet(target_path, engine='fastparquet')
+    except:
+        df_silver = pd.DataFrame()
+    
+    if df_silver.empty:
+        writeParquetFile(df_bronze, target_path, storage)
         print(f"✓ First load: {len(df_bronze)} records")
         return
     
@@ -270,14 +1893,12 @@ def mergeSilver(df_bronze: pd.DataFrame, target_path: str, primary_keys: list, o
     # Concat both
     df_combined = pd.concat([df_silver, df_bronze], ignore_index=True)
     
-    # Sort by order_by columns (ascending) so latest is last
-    df_sorted = df_combined.sort_values(by=order_by, ascending=True)
-    
-    # Keep last (latest) for each primary key
-    df_merged = df_sorted.drop_duplicates(subset=primary_keys, keep='last')
+    # Keep latest for each primary key (highest order_by, later row on ties - incoming wins)
+    df_merged = df_combined[latestRowMask(df_combined, primary_keys, order_by)]
     
     # Write back
-    df_merged.to_parquet(target_path, index=False)
+    writeParquetFile(df_merged, target_path, storage)
+    countRows(rows_out=len(df_merged))
     
     updates = len(df_bronze) - (len(df_merged) - initial_silver_count)
     inserts = len(df_merged) - initial_silver_count
@@ -288,29 +1909,1017 @@ def mergeSilver(df_bronze: pd.DataFrame, target_path: str, primary_keys: list, o
     print(f"  - Total: {len(df_merged)} records")
 
 
-def createHashKey(df: pd.DataFrame, key_columns: list, hash_column: str = 'hash_key') -> pd.DataFrame:
+@instrumented
+def createHashKey(df: pd.DataFrame, key_columns: list, hash_column: str = 'hash_key',
+                  key_format: str = 'hex', n_workers: int = 1) -> pd.DataFrame:
     """
     Create a hash key from list of columns.
+
+    Keys are MD5 of the '|' joined string values, so 'hex' output is byte-identical
+    to hashing row by row. The joined strings are built column-wise and only the
+    distinct values are hashed (in one vectorized call, see _md5Keys), then mapped
+    back to the rows.
     
     Args:
         df: Input DataFrame
         key_columns: List of column names to hash
         hash_column: Name of the new hash column (default: 'hash_key')
+        key_format: 'hex' (32 char MD5 hex), 'int64' (first 8 bytes of the digest
+                    as signed integer) or 'binary' (16 byte digest as arrow
+                    fixed_size_binary(16) column)
+        n_workers: Processes hashing row chunks (see parallelMap), >1 only pays off
+                   for millions of rows
         
     Returns:
         pd.DataFrame: DataFrame with new hash column
     """
-    import hashlib
-    import pandas as pd
+    import functools
+    import numpy as np
+    import pyarrow as pa
+
+    if key_format not in ('hex', 'int64', 'binary'):
+        raise ValueError(f"Unsupported key_format: {key_format}")
+
+    transform = functools.partial(_hashKeys, key_columns=key_columns, key_format=key_format)
+    if n_workers > 1:
+        hashed = parallelMap(df[key_columns], transform, n_workers=n_workers)
+    else:
+        hashed = transform(df)
+
+    if key_format == 'binary':
+        df[hash_column] = hashed['hash'].astype(pd.ArrowDtype(pa.binary(16))).array
+    else:
+        df[hash_column] = hashed['hash'].to_numpy(dtype=np.int64 if key_format == 'int64' else object)
     
-    # Concatenate all key columns with a delimiter
-    df[hash_column] = df[key_columns].astype(str).agg('|'.join, axis=1)
+    return df
+
+
+def _hashKeys(df: pd.DataFrame, key_columns: list, key_format: str) -> pd.DataFrame:
+    """Hash column of createHashKey for the rows of df - {'hash': key per row}."""
+    import numpy as np
+
+    # Concatenate all key columns with a delimiter, vectorized per column
+    parts = [_keyStrings(df[col]) for col in key_columns]
+    joined = parts[0]
+    if len(parts) > 1:
+        joined = joined.str.cat(parts[1:], sep='|')
+
+    # Hash every distinct value once
+    codes, uniques = pd.factorize(joined, use_na_sentinel=False)
+    hashed = _md5Keys(uniques, key_format)
+
+    return pd.DataFrame({'hash': hashed.take(codes).reset_index(drop=True)})
+
+
+@instrumented
+def parallelMap(df: pd.DataFrame, transform, n_workers: int = None, chunk_rows: int = 250_000) -> pd.DataFrame:
+    """
+    Apply transform to row chunks of df in a process pool, results concatenated in chunk order.
+
+    df is converted to arrow once and every chunk is written as an Arrow IPC stream into
+    one shared memory block. Workers copy their chunk out of the block (a memcpy, no
+    unpickling of python objects) and send their result back as an Arrow IPC buffer, so
+    frames with string columns cross process boundaries at memory speed. With one worker
+    or a single chunk transform runs in this process.
+
+    Args:
+        df: Input DataFrame - only the columns transform needs
+        transform: DataFrame -> DataFrame, picklable (a module level function or a
+                   functools.partial of one)
+        n_workers: Processes (default: cpu count)
+        chunk_rows: Rows per chunk
+
+    Returns:
+        pd.DataFrame: Results of all chunks in order
+    """
+    import numpy as np
+    import pyarrow as pa
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers <= 1 or len(df) <= chunk_rows:
+        return transform(df).reset_index(drop=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    chunks = [table.slice(start, chunk_rows) for start in range(0, table.num_rows, chunk_rows)]
+    sizes = [_writeIpcStream(chunk, pa.MockOutputStream()) for chunk in chunks]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).tolist()
+
+    block = shared_memory.SharedMemory(create=True, size=sum(sizes))
+    try:
+        # chunks back to back, at offsets
+        writer = pa.FixedSizeBufferWriter(pa.py_buffer(block.buf))
+        for chunk in chunks:
+            _writeIpcStream(chunk, writer)
+        writer.close()
+        del writer
+
+        tasks = [(block.name, offset, size, transform) for offset, size in zip(offsets, sizes)]
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(chunks))) as pool:
+            results = [pa.ipc.open_stream(result).read_all() for result in pool.map(_transformChunk, tasks)]
+    finally:
+        block.close()
+        block.unlink()
+
+    print(f"✓ Transformed {len(df)} rows in {len(chunks)} chunks on {min(n_workers, len(chunks))} processes")
+    return pa.concat_tables(results, promote_options="permissive").to_pandas()
+
+
+def _writeIpcStream(table, sink) -> int:
+    """Write table as one Arrow IPC stream to sink, returns its size in bytes."""
+    import pyarrow as pa
+
+    start = sink.tell()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.tell() - start
+
+
+def _transformChunk(task: tuple):
+    """parallelMap worker: transform one chunk of the shared memory block, result as Arrow IPC."""
+    import pyarrow as pa
+    from multiprocessing import shared_memory
+
+    name, offset, size, transform = task
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(block.buf[offset:offset + size])
+    finally:
+        block.close()
+
+    result = transform(pa.ipc.open_stream(data).read_all().to_pandas())
+    sink = pa.BufferOutputStream()
+    _writeIpcStream(pa.Table.from_pandas(result, preserve_index=False), sink)
+    return sink.getvalue()
+
+
+@instrumented
+def lookupSurrogateKeys(df: pd.DataFrame, key_column: str, hash_column: str, dictionary_path: str,
+                        n_workers: int = 1) -> pd.DataFrame:
+    """
+    Map a natural key column to its MD5 surrogate key through a persistent key dictionary.
+
+    The dictionary (natural key -> surrogate key) is a small parquet file shared by
+    the gold jobs. It is loaded once per process, only natural keys missing from it
+    are hashed, and those are appended to the file. Rows are mapped through the
+    distinct values of key_column, never hashed one by one.
+
+    Args:
+        df: Input DataFrame
+        key_column: Natural key column (e.g., 'title')
+        hash_column: Name of the new surrogate key column (e.g., '_sk_movie')
+        dictionary_path: Path of the dictionary parquet file (e.g., 'data/03_gold/_keys/_sk_movie.parquet')
+        n_workers: Processes hashing the missing keys (see createHashKey)
+
+    Returns:
+        pd.DataFrame: DataFrame with new hash column
+    """
+    codes, uniques = pd.factorize(df[key_column], use_na_sentinel=False)
+    natural_keys = _keyStrings(pd.Series(uniques, dtype=df[key_column].dtype))
+
+    dictionary = loadKeyDictionary(dictionary_path)
+    surrogate_keys = dictionary.reindex(natural_keys.to_numpy())
+
+    missing = surrogate_keys.isna().to_numpy()
+    if missing.any():
+        df_new = createHashKey(
+            pd.DataFrame({'natural_key': natural_keys[missing].to_numpy()}),
+            key_columns=['natural_key'],
+            hash_column='surrogate_key',
+            n_workers=n_workers
+        )
+        dictionary = _appendKeyDictionary(dictionary_path, df_new)
+        surrogate_keys = dictionary.reindex(natural_keys.to_numpy())
+        print(f"✓ Key dictionary {Path(dictionary_path).name}: {missing.sum()} new keys (total: {len(dictionary)})")
+
+    df[hash_column] = surrogate_keys.to_numpy(dtype=object)[codes]
+
+    return df
+
+
+_KEY_DICTIONARIES = {}
+
+
+def loadKeyDictionary(dictionary_path: str) -> pd.Series:
+    """
+    Load key dictionary as Series indexed by natural key, cached per process until the file changes.
+
+    Returns:
+        pd.Series: surrogate keys indexed by natural key (empty if file doesn't exist)
+    """
+    path = Path(dictionary_path)
+    if not path.exists():
+        return pd.Series([], dtype=object, index=pd.Index([], dtype=object))
+
+    mtime = path.stat().st_mtime_ns
+    cached = _KEY_DICTIONARIES.get(str(path))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    df = pd.read_parquet(path)
+    dictionary = pd.Series(df['surrogate_key'].to_numpy(dtype=object),
+                           index=pd.Index(df['natural_key'].to_numpy(dtype=object)))
+    _KEY_DICTIONARIES[str(path)] = (mtime, dictionary)
+    return dictionary
+
+
+def _appendKeyDictionary(dictionary_path: str, df_new: pd.DataFrame) -> pd.Series:
+    """
+    Add new natural/surrogate key pairs to the dictionary file (written aside, then swapped in).
+    """
+    path = Path(dictionary_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    dictionary = loadKeyDictionary(dictionary_path)
+    new_keys = pd.Series(df_new['surrogate_key'].to_numpy(dtype=object),
+                         index=pd.Index(df_new['natural_key'].to_numpy(dtype=object)))
+    dictionary = pd.concat([dictionary, new_keys])
+    dictionary = dictionary[~dictionary.index.duplicated(keep='first')]
+
+    # jobs running in parallel may swap the file concurrently; the last writer wins, which only
+    # costs re-hashing the other writer's new keys later (keys are deterministic)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pd.DataFrame({'natural_key': dictionary.index, 'surrogate_key': dictionary.to_numpy()}).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    _KEY_DICTIONARIES[str(path)] = (path.stat().st_mtime_ns, dictionary)
+    return dictionary
+
+
+def _keyStrings(col: pd.Series) -> pd.Series:
+    """
+    String form of a key column as astype(str) renders it, missing values as 'None'/'nan'.
+    """
+    strings = col.astype(str)
+    missing = strings.isna()
+    if missing.any():
+        strings = strings.astype(object)
+        strings[missing] = col[missing].map(str)
+    return strings
+
+
+def _md5Keys(values, key_format: str) -> pd.Series:
+    """
+    MD5 of every string of values as key_format (see createHashKey), in order.
+
+    With duckdb installed all values are hashed in one vectorized md5() call on an arrow
+    array, otherwise one hashlib call per value - the digests are the same.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    strings = pa.array(values, pa.string())
+    try:
+        import duckdb
+    except ImportError:
+        duckdb = None
+
+    if duckdb is not None:
+        con = duckdb.connect()
+        try:
+            con.register("key_strings", pa.table({'key': strings}))
+            expression = "md5(key)" if key_format == 'hex' else "unhex(md5(key))"
+            digests = con.execute(f"SELECT {expression} AS digest FROM key_strings").fetch_arrow_table()['digest']
+        finally:
+            con.close()
+        if key_format == 'hex':
+            return pd.Series(digests.to_numpy(zero_copy_only=False), dtype=object)
+        digests = digests.cast(pa.binary(16))
+    else:
+        import hashlib
+
+        md5 = hashlib.md5
+        if key_format == 'hex':
+            return pd.Series([md5(v.encode()).hexdigest() for v in strings.to_pylist()], dtype=object)
+        digests = pa.array([md5(v.encode()).digest() for v in strings.to_pylist()], pa.binary(16))
+
+    digests = digests.combine_chunks() if isinstance(digests, pa.ChunkedArray) else digests
+    if key_format == 'int64':
+        if not len(digests):
+            return pd.Series([], dtype=np.int64)
+        # first 8 of every 16 digest bytes, read little endian
+        return pd.Series(np.frombuffer(digests.buffers()[1], dtype='<i8', count=2 * len(digests))[::2].copy())
+    return pd.Series(pd.arrays.ArrowExtensionArray(digests))
+
+
+@instrumented
+def mergePartitions(df_delta: pd.DataFrame, target_path: str, primary_keys: list, order_by: list,
+                    partition_by: list, row_group_size: int = 100_000, storage: dict = None):
+    """
+    Partition scoped MERGE: upsert df_delta into a hive partitioned parquet dataset.
+
+    Only partitions present in df_delta are read, merged (latest order_by wins per
+    primary key, df_delta wins when order_by is None) and rewritten. The merged
+    partition is written as a new file first; the manifest then swaps all rewritten
+    partitions at once and the old files are removed afterwards.
+    Partition columns must be part of (or determined by) the primary key, otherwise
+    an updated record moving to another partition leaves its old version behind.
+
+    Args:
+        df_delta: New/changed records
+        target_path: Path to partitioned parquet dataset
+        primary_keys: List of columns defining primary key (e.g., ['date', 'title'])
+        order_by: Column(s) to order by, latest is kept (e.g., '_tf_ingestion_time'), or None
+        partition_by: List of partition columns (e.g., ['date'])
+        row_group_size: max rows per parquet row group (storage row_group_size overrides it)
+        storage: Table storage config (see storageConfig)
+    """
+    import pyarrow.parquet as pq
+
+    # legacy unpartitioned table - migrate it with a one-off full merge
+    if Path(target_path).is_file():
+        df_legacy = pd.read_parquet(target_path, engine='fastparquet')
+        df_delta = pd.concat([df_legacy, df_delta], ignore_index=True)
+        os.remove(target_path)
+        print(f"✓ Migrating {len(df_legacy)} records from unpartitioned {target_path}")
+
+    Path(target_path).mkdir(parents=True, exist_ok=True)
+
+    # files of the touched partitions - from the manifest, without listing the table
+    touched = df_delta[partition_by].drop_duplicates()
+    files_by_dir = {}
+    for file in tableFiles(target_path, {col: touched[col].tolist() for col in partition_by}, use_index=False):
+        files_by_dir.setdefault(Path(file).parent, []).append(file)
+
+    updates, inserts, partitions, written = 0, 0, 0, 0
+    added, removed = [], []
+    for keys, df_part in df_delta.groupby(partition_by, sort=False, observed=True):
+        if not isinstance(keys, tuple):
+            keys = (keys,)
+        part_dir = Path(target_path).joinpath(*[f"{col}={val}" for col, val in zip(partition_by, keys)])
+        old_files = files_by_dir.get(part_dir, [])
+
+        # read only this partition and restore partition columns from the path
+        countIO(read=old_files)
+        existing = [pq.read_table(f).to_pandas() for f in old_files]
+        if existing:
+            df_existing = pd.concat(existing, ignore_index=True)
+            for col, val in zip(partition_by, keys):
+                df_existing[col] = val
+            df_combined = pd.concat([df_existing, df_part], ignore_index=True)
+        else:
+            df_existing = df_part.iloc[0:0]
+            df_combined = df_part
+
+        df_merged = df_combined[latestRowMask(df_combined, primary_keys, order_by)]
+
+        added += _writeParquetPartitions(df_merged, target_path, partition_by,
+                                         (storage or {}).get("row_group_size", row_group_size), storage)
+        removed += old_files
+
+        inserts += len(df_merged) - len(df_existing)
+        updates += len(df_part) - (len(df_merged) - len(df_existing))
+        partitions += 1
+        written += len(df_merged)
+
+    # the new version of the table becomes visible in one manifest swap, then old files go
+    updateManifest(target_path, added=added, removed=removed)
+    for f in removed:
+        os.remove(f)
+
+    countRows(rows_out=written)
+
+    print(f"✓ MERGE complete ({partitions} partitions rewritten):")
+    print(f"  - Updated: {updates} records")
+    print(f"  - Inserted: {inserts} records")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Args:
+        rate: Tokens added per second (sustained requests per second)
+        capacity: Max tokens stored, i.e. allowed burst (default: 1 - no burst)
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        import threading
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@instrumented
+def fetchOMDBData(titles: list, api_key: str = None, base_url: str = "http://www.omdbapi.com/",
+                  max_in_flight: int = 8, rate_per_second: float = 5, max_retries: int = 3,
+                  backoff_seconds: float = 0.5, timeout: float = 10, checkpoint_path: str = None,
+                  cache: "OMDBResponseCache" = None) -> pd.DataFrame:
+    """
+    Fetch movie data from OMDB API for multiple titles.
+    Handles rate limits gracefully - stops when limit hit (or the API key is rejected),
+    returns what was fetched.
+
+    Up to max_in_flight requests run concurrently over one pooled keep-alive session,
+    paced by a token bucket at rate_per_second. Network errors, HTTP 429 and 5xx are
+    retried with exponential backoff. Every fetched record is appended to
+    checkpoint_path (JSON lines) so an interrupted run resumes where it stopped.
+    With a response cache, fresh cached answers (found or not found) are used
+    without any network call. Found titles and "Movie not found!" answers are stored in
+    the cache - other errors ("Too many results.", a rejected key) are not cached, so the
+    titles are requested again by the next run.
     
-    # Apply MD5 hash
-    df[hash_column] = df[hash_column].apply(
-        lambda x: hashlib.md5(x.encode()).hexdigest()
-    )
+    Args:
+        titles: List of movie titles to fetch
+        api_key: OMDB API key (default: OMDB_API_KEY environment variable)
+        base_url: OMDB API url (point it to a local stub server for testing)
+        max_in_flight: Max concurrent requests
+        rate_per_second: Max requests started per second
+        max_retries: Retries per title on network errors / 429 / 5xx
+        backoff_seconds: Initial retry delay, doubled on every retry
+        timeout: Request timeout in seconds
+        checkpoint_path: Optional JSON lines file with already fetched records
+        cache: Optional OMDBResponseCache consulted before every request
+        
+    Returns:
+        pd.DataFrame: Movie metadata from OMDB (partial if rate limited)
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    api_key = api_key or os.getenv('OMDB_API_KEY')
     
+    if not api_key:
+        print("⚠️  OMDB_API_KEY not found in environment")
+        return pd.DataFrame()
+
+    # resume from checkpoint - titles fetched by an interrupted run are not requested again
+    results = {}
+    if checkpoint_path and Path(checkpoint_path).exists():
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                results[entry['query']] = entry['record']
+        print(f"✓ Resumed {len(results)} records from checkpoint {checkpoint_path}")
+    pending = [title for title in titles if title not in results]
+
+    # answer from the response cache where possible
+    if cache is not None:
+        cache_hits, not_found = 0, 0
+        for title in list(pending):
+            cached = cache.get(title)
+            if cached is None:
+                continue
+            if cached['status'] == 'found':
+                results[title] = parseOMDBResponse(json.loads(cached['payload']))
+                cache_hits += 1
+            else:
+                not_found += 1
+            pending.remove(title)
+        print(f"✓ Response cache: {cache_hits} found, {not_found} known not found, {len(pending)} to request")
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    bucket = TokenBucket(rate_per_second)
+    stop = threading.Event()
+    stopped_by = []
+    lock = threading.Lock()
+    checkpoint = None
+    if checkpoint_path:
+        Path(checkpoint_path).parent.mkdir(parents=True, exist_ok=True)
+        checkpoint = open(checkpoint_path, 'a', encoding='utf-8')
+
+    def fetch(title):
+        delay = backoff_seconds
+        for attempt in range(max_retries + 1):
+            if stop.is_set():
+                return
+            bucket.acquire()
+            if stop.is_set():
+                return
+            try:
+                response = session.get(base_url, params={
+                    'apikey': api_key,
+                    't': title,
+                    'type': 'movie'
+                }, timeout=timeout)
+
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.exceptions.HTTPError(f"HTTP {response.status_code}")
+
+                data = response.json()
+
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if attempt == max_retries:
+                    print(f"  ⚠️  Network error fetching {title}: {e}")
+                    return
+                time.sleep(delay)
+                delay *= 2
+                continue
+
+            # Only "Movie not found!" is an answer about the title - cache it. Rate limit and
+            # key errors stop the run, anything else is retried by the next run
+            if data.get('Response') == 'False':
+                error = data.get('Error', '')
+                if error == "Movie not found!":
+                    print(f"  ⚠️  Not found: {title}")
+                    if cache is not None:
+                        cache.put(title, 'not_found', response.text)
+                elif 'limit' in error.lower():
+                    if not stop.is_set():
+                        print(f"  ⚠️  API rate limit reached: {error}")
+                        stopped_by.append("Rate limit hit")
+                    stop.set()
+                elif response.status_code == 401 or 'api key' in error.lower():
+                    if not stop.is_set():
+                        print(f"  ⚠️  API key rejected: {error}")
+                        stopped_by.append("API key rejected")
+                    stop.set()
+                else:
+                    print(f"  ⚠️  OMDB error for {title}: {error}")
+                return
+
+            if cache is not None:
+                cache.put(title, 'found', response.text)
+
+            record = parseOMDBResponse(data)
+            with lock:
+                results[title] = record
+                if checkpoint:
+                    checkpoint.write(json.dumps({'query': title, 'record': record}) + "\n")
+                    checkpoint.flush()
+                print(f"✓ Fetched {len(results)}/{len(titles)}: {title}")
+            return
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            list(pool.map(fetch, pending))
+    finally:
+        session.close()
+        if checkpoint:
+            checkpoint.close()
+
+    # keep the input order of titles
+    df = pd.DataFrame([results[title] for title in titles if title in results])
+    
+    if stop.is_set():
+        print(f"\n⚠️  {stopped_by[0] if stopped_by else 'Stopped'} - fetched {len(df)}/{len(titles)} movies")
+        print(f"   Remaining titles will be fetched on next run")
+    else:
+        print(f"\n✓ Fetched {len(df)} movies from OMDB")
+    
+    return df
+
+
+def parseOMDBResponse(data: dict) -> dict:
+    """
+    Flatten a single OMDB API response into a bronze record.
+
+    Args:
+        data: Parsed JSON response of a successful OMDB request
+
+    Returns:
+        dict: Bronze OMDB record
+    """
+    # Parse Ratings array
+    imdb_rating = None
+    rotten_tomatoes = None
+    metacritic = None
+
+    for rating in data.get('Ratings', []):
+        source = rating.get('Source', '')
+        value = rating.get('Value', '')
+        if 'Internet Movie Database' in source or 'IMDb' in source:
+            imdb_rating = value
+        elif 'Rotten Tomatoes' in source:
+            rotten_tomatoes = value
+        elif 'Metacritic' in source:
+            metacritic = value
+
+    return {
+        'title': data.get('Title'),
+        'year': data.get('Year'),
+        'rated': data.get('Rated'),
+        'released': data.get('Released'),
+        'runtime': data.get('Runtime'),
+        'genre': data.get('Genre'),
+        'director': data.get('Director'),
+        'writer': data.get('Writer'),
+        'actors': data.get('Actors'),
+        'plot': data.get('Plot'),
+        'language': data.get('Language'),
+        'country': data.get('Country'),
+        'awards': data.get('Awards'),
+        'poster': data.get('Poster'),
+        'imdb_rating': imdb_rating or data.get('imdbRating'),
+        'rotten_tomatoes': rotten_tomatoes,
+        'metacritic': metacritic,
+        'metascore': data.get('Metascore'),
+        'imdb_votes': data.get('imdbVotes'),
+        'imdb_id': data.get('imdbID'),
+        'box_office': data.get('BoxOffice'),
+        'production': data.get('Production'),
+        'website': data.get('Website')
+    }
+
+
+# Typed OMDB silver columns: column -> (raw OMDB field, RE2 pattern of the value, type). Thousands
+# separators are removed before matching, the patterns bound the digits so every match fits its type.
+# Both engines parse with these patterns (parseOMDBFields here and in duckdb_engine).
+OMDB_NUMERIC_FIELDS = {
+    'imdb_rating': ('imdb_rating', r"^\s*(?P<value>\d{1,2}(?:\.\d{1,3})?)\s*(?:/\s*10\s*)?$", "float64"),
+    'imdb_votes': ('imdb_votes', r"^\s*(?P<value>\d{1,18})\s*$", "int64"),
+    'runtime': ('runtime', r"^\s*(?P<value>\d{1,9})\s*min", "int32"),
+    'box_office': ('box_office', r"^\s*\$\s*(?P<value>\d{1,18})\s*$", "int64"),
+    'year': ('year', r"^\s*(?P<value>\d{4})(?:\D|$)", "int32"),
+    'year_end': ('year', r"(?:^|\D)(?P<value>\d{4})\s*$", "int32")
+}
+OMDB_DATE_FIELDS = {'released': "%d %b %Y"}
+
+
+@instrumented
+def parseOMDBFields(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse the raw OMDB strings of df into typed columns (see OMDB_NUMERIC_FIELDS), vectorized
+    with arrow string kernels:
+
+        imdb_rating  "7.5/10"       -> 7.5
+        imdb_votes   "1,234,567"    -> 1234567
+        runtime      "142 min"      -> 142 (minutes)
+        box_office   "$12,345,678"  -> 12345678 (USD)
+        released     "16 Jul 2010"  -> date
+        year         "2011–2013"    -> 2011, year_end 2013 (null while running, "2011–")
+
+    Values that do not parse ("N/A") become null. Columns that are typed already are left
+    alone, so rows parsed before can go through again.
+
+    Args:
+        df: OMDB records with raw string fields
+
+    Returns:
+        pd.DataFrame: df with typed fields
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    def isText(col):
+        return pd.api.types.is_string_dtype(col.dtype) and pd.api.types.infer_dtype(col, skipna=True) in ('string', 'empty')
+
+    nullable = {pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype()}
+    raw = {source: df[source] for source, _, _ in OMDB_NUMERIC_FIELDS.values() if source in df and isText(df[source])}
+
+    parsed = {}
+    for column, (source, pattern, type_name) in OMDB_NUMERIC_FIELDS.items():
+        if source in raw:
+            text = pc.replace_substring(pa.array(raw[source], type=pa.string(), from_pandas=True), ",", "")
+            value = pc.struct_field(pc.extract_regex(text, pattern), [0]).cast(_storageType(type_name))
+            parsed[column] = value.to_pandas(types_mapper=nullable.get)
+    for column, format in OMDB_DATE_FIELDS.items():
+        if column in df and isText(df[column]):
+            text = pa.array(df[column], type=pa.string(), from_pandas=True)
+            parsed[column] = pc.strptime(text, format=format, unit="s", error_is_null=True).cast(pa.date32()).to_pandas()
+
+    for column, values in parsed.items():
+        df[column] = values.to_numpy() if values.dtype == object else values.array
+    return df
+
+
+def normalizeQueryTitle(title: str) -> str:
+    """
+    Cache key of an OMDB query title - case folded with collapsed whitespace.
+    """
+    return " ".join(str(title).casefold().split())
+
+
+class OMDBResponseCache:
+    """
+    Persistent OMDB response cache in a single SQLite file.
+
+    Keeps the raw JSON answer per normalized query title, including "not found"
+    answers (negative caching), with the time it was fetched. Entries older than
+    their TTL are treated as missing. Safe to share between fetch threads.
+
+    Args:
+        path: SQLite file path (created if missing)
+        ttl_found_days: How long a found movie is served from cache
+        ttl_not_found_days: How long a not found title is not requested again
+    """
+
+    def __init__(self, path: str, ttl_found_days: float = 30, ttl_not_found_days: float = 7):
+        import sqlite3
+        import threading
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = {
+            'found': ttl_found_days * 86400,
+            'not_found': ttl_not_found_days * 86400
+        }
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS omdb_response (
+                query_key TEXT PRIMARY KEY,
+                query_title TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT,
+                fetched_at INTEGER NOT NULL
+            )""")
+        self._conn.commit()
+
+    def get(self, title: str) -> dict:
+        """
+        Fresh cache entry for title.
+
+        Returns:
+            dict: {'status', 'payload', 'fetched_at'} or None if missing/expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, payload, fetched_at FROM omdb_response WHERE query_key = ?",
+                (normalizeQueryTitle(title),)
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl[row[0]]:
+            return None
+        return {'status': row[0], 'payload': row[1], 'fetched_at': row[2]}
+
+    def put(self, title: str, status: str, payload: str):
+        """
+        Store raw response for title, status is 'found' or 'not_found'.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO omdb_response VALUES (?, ?, ?, ?, ?)",
+                (normalizeQueryTitle(title), title, status, payload, int(time.time()))
+            )
+            self._conn.commit()
+
+    def freshTitles(self, titles) -> set:
+        """
+        Subset of titles that have a fresh cache entry (found or not found).
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT query_key, status, fetched_at FROM omdb_response").fetchall()
+        now = time.time()
+        fresh = {key for key, status, fetched_at in rows if now - fetched_at <= self.ttl[status]}
+        return {title for title in titles if normalizeQueryTitle(title) in fresh}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def canonicalTitles(titles):
+    """
+    Matching form of movie titles - accents stripped, lower case, "&" spelled "and",
+    apostrophes dropped, other punctuation as spaces, a trailing "(year)" / "[year]" and a
+    leading (or trailing ", The") article removed: "The Lord of the Rings: The Return of the King (2003)" ->
+    "lord of the rings the return of the king". Vectorized with arrow string kernels.
+
+    Args:
+        titles: Titles (list, Series or arrow array), nulls stay null
+
+    Returns:
+        pa.Array: Canonical form per title
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    forms = pc.utf8_normalize(pa.array(titles, type=pa.string()), "NFKD")
+    forms = pc.utf8_lower(pc.replace_substring_regex(forms, r"\p{Mn}+", ""))
+    forms = pc.replace_substring_regex(forms, r"\s*[\(\[]\s*\d{4}\s*[\)\]]\s*$", "")
+    forms = pc.replace_substring_regex(forms, r",\s*(?:the|an|a)\s*$", "")
+    forms = pc.replace_substring(forms, "&", " and ")
+    forms = pc.replace_substring_regex(forms, r"['’]", "")
+    forms = pc.utf8_trim_whitespace(pc.replace_substring_regex(forms, r"[^\p{L}\p{N}]+", " "))
+    return pc.replace_substring_regex(forms, r"^(?:the|an|a) +(\S)", r"\1")
+
+
+def _numberSignatures(forms):
+    """Numbers of each canonical form in order ("blade runner 2049" -> "2049") - sequels and
+    remakes differ in them, so titles are only compared fuzzily within the same signature."""
+    import pyarrow.compute as pc
+
+    numbers = pc.replace_substring_regex(forms, r"\S*[^\d\s]\S*", "")
+    return pc.utf8_trim_whitespace(pc.replace_substring_regex(numbers, r" +", " "))
+
+
+def _trigrams(form: str) -> frozenset:
+    padded = f"  {form} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TitleIndex:
+    """
+    Approximate lookup of titles in a set of known titles (e.g. the OMDB titles).
+
+    A title matches a known title
+        exact       - same string (score 1)
+        normalized  - same canonical form, see canonicalTitles (score 1)
+        fuzzy       - the most similar canonical form with the same numbers: Jaccard
+                      similarity of the padded character trigrams, at least min_score
+
+    Fuzzy candidates come from an inverted trigram index, built lazily per number
+    signature. Only known titles sharing a trigram with the query are counted, trigrams
+    of more than max_posting titles are not followed, and the max_candidates titles
+    sharing most trigrams are scored - a lookup costs O(trigrams * max_posting), not
+    O(known titles). Among equally good matches the smallest known title wins.
+
+    Args:
+        titles: Known titles
+        min_score: Lowest similarity accepted as a fuzzy match
+        max_candidates: Candidates scored per fuzzy lookup
+        max_posting: Trigrams in more known titles than this are not used for candidates
+    """
+
+    def __init__(self, titles, min_score: float = 0.8, max_candidates: int = 20, max_posting: int = 2000):
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        self.min_score = min_score
+        self.max_candidates = max_candidates
+        self.max_posting = max_posting
+
+        known = pc.drop_null(pa.array(titles, type=pa.string())).unique()
+        known = known.take(pc.sort_indices(known))
+        self._titles = set(known.to_pylist())
+
+        # one entry per canonical form, represented by its smallest title
+        known = pa.table({'title': known, 'form': canonicalTitles(known)})
+        known = known.filter(pc.not_equal(known['form'], "")).group_by('form', use_threads=False).aggregate(
+            [('title', 'first')])
+        self._forms = known['form'].to_pylist()
+        self._form_titles = known['title_first'].to_pylist()
+        self._by_form = dict(zip(self._forms, self._form_titles))
+
+        # entries sorted by number signature - a signature is a contiguous range of them
+        signatures = _numberSignatures(known['form'])
+        self._order = pc.sort_indices(signatures).to_numpy()
+        self._signatures = np.asarray(signatures.take(self._order).to_pylist(), dtype=object)
+        self._postings = {}
+
+    def _signaturePostings(self, signature: str) -> dict:
+        """Trigram -> known entries of one number signature, built on first use."""
+        if signature not in self._postings:
+            import numpy as np
+
+            first = np.searchsorted(self._signatures, signature, side="left")
+            last = np.searchsorted(self._signatures, signature, side="right")
+            postings = {}
+            for entry in self._order[first:last]:
+                for gram in _trigrams(self._forms[entry]):
+                    postings.setdefault(gram, []).append(int(entry))
+            self._postings[signature] = postings
+        return self._postings[signature]
+
+    def _fuzzy(self, form: str, signature: str) -> tuple:
+        """Best fuzzy match of a canonical form - (known title, score) or (None, None)."""
+        import heapq
+        from collections import Counter
+
+        grams = _trigrams(form)
+        postings = self._signaturePostings(signature)
+        shared, skipped = Counter(), 0
+        for gram in grams:
+            posting = postings.get(gram, ())
+            if len(posting) > self.max_posting:
+                skipped += 1
+                continue
+            shared.update(posting)
+
+        # a title sharing fewer trigrams than this cannot reach min_score
+        needed = self.min_score * len(grams) - skipped
+        candidates = [item for item in shared.items() if item[1] >= needed]
+
+        best, best_score = None, 0.0
+        for entry, _ in heapq.nsmallest(self.max_candidates, candidates, key=lambda item: (-item[1], item[0])):
+            candidate = _trigrams(self._forms[entry])
+            common = len(grams & candidate)
+            score = common / (len(grams) + len(candidate) - common)
+            if score > best_score or (score == best_score and self._form_titles[entry] < self._form_titles[best]):
+                best, best_score = entry, score
+
+        if best is None or best_score < self.min_score:
+            return None, None
+        return self._form_titles[best], round(best_score, 4)
+
+    def match(self, titles) -> pd.DataFrame:
+        """
+        Best known title for every distinct title.
+
+        Returns:
+            pd.DataFrame: title, match_title, match_score, match_method - nulls where nothing matched
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        queries = pc.drop_null(pa.array(titles, type=pa.string())).unique()
+        forms = canonicalTitles(queries)
+        signatures = _numberSignatures(forms)
+
+        rows = []
+        for title, form, signature in zip(queries.to_pylist(), forms.to_pylist(), signatures.to_pylist()):
+            if title in self._titles:
+                rows.append((title, title, 1.0, 'exact'))
+            elif form in self._by_form:
+                rows.append((title, self._by_form[form], 1.0, 'normalized'))
+            elif form:
+                match_title, score = self._fuzzy(form, signature)
+                rows.append((title, match_title, score, 'fuzzy' if match_title is not None else None))
+            else:
+                rows.append((title, None, None, None))
+
+        return pd.DataFrame(rows, columns=['title', 'match_title', 'match_score', 'match_method'])
+
+
+@instrumented
+def matchTitles(titles, known_titles, min_score: float = 0.8, max_candidates: int = 20,
+                max_posting: int = 2000) -> pd.DataFrame:
+    """
+    Match titles against known titles (exact, normalized or fuzzy - see TitleIndex).
+
+    Args:
+        titles: Titles to match
+        known_titles: Titles to match them to
+        min_score: Lowest similarity accepted as a fuzzy match
+        max_candidates: Candidates scored per fuzzy lookup
+        max_posting: Trigrams in more known titles than this are not used for candidates
+
+    Returns:
+        pd.DataFrame: title, match_title, match_score, match_method per distinct title
+    """
+    index = TitleIndex(known_titles, min_score=min_score, max_candidates=max_candidates, max_posting=max_posting)
+    df = index.match(titles)
+
+    methods = df['match_method'].value_counts()
+    print(f"✓ Matched {int(methods.sum())}/{len(df)} titles ({methods.get('exact', 0)} exact, "
+          f"{methods.get('normalized', 0)} normalized, {methods.get('fuzzy', 0)} fuzzy)")
     return df
 
 
+@instrumented
+def replaceByKey(df: pd.DataFrame, target_path: str, key_column: str, key_values,
+                 storage: dict = None) -> pd.DataFrame:
+    """
+    Replace all rows of a small table whose key_column is in key_values with df.
+
+    Meant for rollup tables: rows of touched keys (e.g. dates) are recomputed and
+    swapped in as a whole, so groups that disappeared from a key are removed too.
+    Existing rows are kept in arrow and compared in their storage type (e.g. date32
+    keys against ISO date strings). The table is written aside and renamed into place.
+
+    Args:
+        df: Recomputed rows for key_values
+        target_path: Path to single-file parquet table
+        key_column: Column the rollup is refreshed by (e.g., 'date')
+        key_values: Touched key values
+        storage: Table storage config (see storageConfig)
+
+    Returns:
+        pd.DataFrame: Full table after replacement
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+    key_values = list(key_values)
+
+    table = toStorageTable(df, storage)
+    if Path(target_path).exists():
+        countIO(read=[target_path])
+        existing = pq.read_table(target_path)
+        if table.num_rows == 0:
+            # nothing recomputed - an empty frame carries no column types, keep the table's own
+            table = toStorageTable(existing.schema.empty_table(), storage)
+        key_type = table.schema.field(key_column).type
+        if pa.types.is_dictionary(key_type):
+            key_type = key_type.value_type
+        touched = pc.is_in(existing[key_column].cast(key_type), value_set=pa.array(key_values).cast(key_type))
+        # rows written before a storage change are cast to the current types
+        keep = existing.filter(pc.invert(touched)).select(table.column_names).cast(table.schema)
+        table = pa.concat_tables([keep, table]) if keep.num_rows else table
+        kept = keep.num_rows
+    else:
+        kept = 0
+
+    tmp_path = Path(target_path).with_name(f".{Path(target_path).name}.tmp")
+    pq.write_table(table, tmp_path, row_group_size=(storage or {}).get("row_group_size"),
+                   **parquetWriteOptions(storage))
+    os.replace(tmp_path, target_path)
+    countIO(written=[target_path])
+
+    print(f"✓ Replaced {len(df)} rows for {len(set(key_values))} keys in {target_path} (total: {kept + len(df)})")
+    return table.to_pandas()
@@ -0,0 +1,535 @@
+"""
+DuckDB execution engine for the silver merges and the gold rollups.
+
+A pipeline runs on it when its config selects it (see common_function.engineConfig):
+
+    "engine": {
+        "name": "duckdb",
+        "memory_limit": "4GB",
+        "temp_directory": "data\\_spill"
+    }
+
+Instead of loading tables into pandas, the transforms run as queries over the parquet
+files of the tables. Sorts, window functions, joins and aggregations use all cores and
+spill to temp_directory once memory_limit is reached, so tables larger than memory can
+be merged. Results are streamed back in arrow record batches and written in the storage
+types, row groups and partition layout of the pandas engine, so both engines produce
+the same tables.
+
+duckdb is an optional dependency - it is imported only when a pipeline selects the engine.
+"""
+import os
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from common_function import (absPath, toStorageTable, parquetWriteOptions, tableFiles, updateManifest,
+                             OMDB_NUMERIC_FIELDS, OMDB_DATE_FIELDS)
+from instrumentation import instrumented, countIO, countRows
+
+
+def connect(engine: dict):
+    """
+    Open an in-memory DuckDB connection with the settings of the engine config.
+
+    Args:
+        engine: Engine config - memory_limit (e.g. '4GB', default: DuckDB's 80% of RAM),
+                temp_directory (spill folder relative to the project, default: data\\_spill),
+                threads (default: all cores)
+
+    Returns:
+        duckdb.DuckDBPyConnection: Connection (use it as a context manager)
+
+    Raises:
+        ImportError: duckdb is not installed
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("engine 'duckdb' needs the duckdb package: pip install duckdb") from e
+
+    temp_directory = os.path.join(absPath(), engine.get("temp_directory", "data\\_spill"))
+    Path(temp_directory).mkdir(parents=True, exist_ok=True)
+
+    settings = {
+        "threads": engine.get("threads", os.cpu_count() or 1),
+        "temp_directory": temp_directory,
+        # row order is restored explicitly where it matters, everything else may run out of order
+        "preserve_insertion_order": False
+    }
+    if "memory_limit" in engine:
+        settings["memory_limit"] = engine["memory_limit"]
+
+    return duckdb.connect(config=settings)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _columns(columns: list) -> str:
+    return ", ".join(_quote(col) for col in columns)
+
+
+def _orderColumns(order_by) -> list:
+    if order_by is None:
+        return []
+    return [order_by] if isinstance(order_by, str) else list(order_by)
+
+
+def scanParquet(path: str, files: list, row_position: bool = False) -> str:
+    """
+    read_parquet() over files of the table at path. Hive partition columns are typed the
+    way readTable infers them (int32 when every value is numeric, strings otherwise), so
+    e.g. date=2024-01-01 stays a string and _tf_ingestion_time=1770720298 a number.
+    Compacted files (partition column stored in the file) are unioned with the partitions by name.
+
+    Args:
+        path: Table path the files belong to
+        files: Files to read (see tableFiles)
+        row_position: Add filename / file_row_number columns (input order of the pandas engine)
+
+    Returns:
+        str: SQL table expression
+    """
+    partitions, hive_files, plain_files = {}, [], []
+    is_dir = Path(path).is_dir()
+    for file in files:
+        parts = [part for part in Path(file).relative_to(path).parts[:-1] if "=" in part] if is_dir else []
+        for part in parts:
+            col, _, value = part.partition("=")
+            partitions.setdefault(col, set()).add(value)
+        (hive_files if parts else plain_files).append(file)
+
+    def hiveType(values):
+        if not all(value.lstrip("-").isdigit() for value in values):
+            return "VARCHAR"
+        return "INTEGER" if all(-2**31 <= int(value) < 2**31 for value in values) else "BIGINT"
+
+    def readParquet(files, hive):
+        options = ["union_by_name = true"]
+        if hive:
+            hive_types = ", ".join(f"{_literal(col)}: {_literal(hiveType(values))}" for col, values in partitions.items())
+            options += ["hive_partitioning = true", f"hive_types = {{{hive_types}}}"]
+        if row_position:
+            options += ["filename = true", "file_row_number = true"]
+        return f"read_parquet([{', '.join(_literal(file) for file in files)}], {', '.join(options)})"
+
+    # the files a query over the scan reads
+    countIO(read=files)
+    if hive_files and plain_files:
+        # compacted files hold the partition column themselves (see common_function.compactTable)
+        return f"(SELECT * FROM {readParquet(hive_files, True)} UNION ALL BY NAME SELECT * FROM {readParquet(plain_files, False)})"
+    return readParquet(files, bool(hive_files))
+
+
+def _count(con, relation: str) -> int:
+    return con.execute(f"SELECT count(*) FROM {relation}").fetchone()[0]
+
+
+@instrumented
+def loadBronzeInDelta(con, bronze_path: str, partition_col: str, last_success_unix: int) -> str:
+    """
+    Register the bronze records ingested since the last successful run as view bronze_delta.
+    Partitions at or below last_success_unix are pruned from their hive path.
+
+    Args:
+        con: DuckDB connection
+        bronze_path: Path to bronze parquet data
+        partition_col: Partition column name (e.g., '_tf_ingestion_time')
+        last_success_unix: Last successful run Unix timestamp (0 for full load)
+
+    Returns:
+        str: View name, None if bronze has no files
+    """
+    # the manifest rules out files holding only records at or below the watermark
+    files = tableFiles(bronze_path, filters=[(partition_col, '>', int(last_success_unix))])
+    if not files:
+        print(f"✓ No bronze files with {partition_col} > {last_success_unix} in {bronze_path}")
+        return None
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP VIEW bronze_delta AS
+        SELECT * FROM {scanParquet(bronze_path, files, row_position=True)}
+        WHERE {_quote(partition_col)} > {int(last_success_unix)}
+    """)
+
+    print(f"✓ Loaded {_count(con, 'bronze_delta')} records from {bronze_path}")
+    return "bronze_delta"
+
+
+@instrumented
+def deduplicateRecords(con, relation: str, business_keys: list, order_by, ascending: bool = False) -> str:
+    """
+    Keep one record per business key - the highest order_by (lowest when ascending), the
+    first record in file order on ties - like common_function.deduplicateRecords.
+    The result is materialized as temp table bronze_deduplicated (spills to disk when large).
+
+    Args:
+        con: DuckDB connection
+        relation: View with filename / file_row_number columns (see loadBronzeInDelta)
+        business_keys: Columns defining uniqueness
+        order_by: Column(s) to order by
+        ascending: False = keep highest value
+
+    Returns:
+        str: Table name
+    """
+    direction = "ASC" if ascending else "DESC"
+    order = [f"{_quote(col)} {direction} NULLS LAST" for col in _orderColumns(order_by)]
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE bronze_deduplicated AS
+        SELECT * EXCLUDE (filename, file_row_number) FROM {relation}
+        QUALIFY row_number() OVER (
+            PARTITION BY {_columns(business_keys)}
+            ORDER BY {", ".join(order + ["filename", "file_row_number"])}
+        ) = 1
+    """)
+
+    initial_count = _count(con, relation)
+    deduplicated_count = _count(con, "bronze_deduplicated")
+    countRows(rows_in=initial_count, rows_out=deduplicated_count)
+    print(f"✓ Deduplication: {initial_count} → {deduplicated_count} records "
+          f"({initial_count - deduplicated_count} duplicates removed)")
+    return "bronze_deduplicated"
+
+
+_SQL_TYPES = {'float64': 'DOUBLE', 'int32': 'INTEGER', 'int64': 'BIGINT'}
+
+
+@instrumented
+def parseOMDBFields(con, relation: str) -> str:
+    """
+    Register relation with its raw OMDB strings parsed into typed columns as view omdb_typed,
+    like common_function.parseOMDBFields (same RE2 patterns, so both engines parse alike).
+
+    Args:
+        con: DuckDB connection
+        relation: Table / view with OMDB records
+
+    Returns:
+        str: View name
+    """
+    columns = {name: type_name for name, type_name, *_ in con.execute(f"DESCRIBE {relation}").fetchall()}
+
+    typed = {}
+    for column, (source, pattern, type_name) in OMDB_NUMERIC_FIELDS.items():
+        if columns.get(source) == 'VARCHAR':
+            value = f"regexp_extract(replace({_quote(source)}, ',', ''), {_literal(pattern)}, 1)"
+            typed[column] = f"CAST(nullif({value}, '') AS {_SQL_TYPES[type_name]})"
+    for column, format in OMDB_DATE_FIELDS.items():
+        if columns.get(column) == 'VARCHAR':
+            typed[column] = f"CAST(try_strptime({_quote(column)}, {_literal(format)}) AS DATE)"
+
+    replaced = [f"{sql} AS {_quote(column)}" for column, sql in typed.items() if column in columns]
+    added = [f"{sql} AS {_quote(column)}" for column, sql in typed.items() if column not in columns]
+    con.execute(f"""
+        CREATE OR REPLACE TEMP VIEW omdb_typed AS
+        SELECT * {f"REPLACE ({', '.join(replaced)})" if replaced else ""}{"".join(", " + sql for sql in added)}
+        FROM {relation}
+    """)
+    return "omdb_typed"
+
+
+@instrumented
+def mergeSilver(con, relation: str, target_path: str, primary_keys: list, order_by,
+                partition_by: list = None, storage: dict = None, row_group_size: int = 100_000):
+    """
+    MERGE relation into a parquet table, like common_function.mergeSilver: per primary key
+    the highest order_by wins, incoming records win ties (always when order_by is None).
+
+    Unpartitioned targets are rewritten as one file. With partition_by only the partitions
+    present in relation are read and rewritten; the merged rows come back sorted by
+    partition, so one partition file is written at a time and memory stays bounded by a
+    record batch. New files are written first, the replaced ones are removed at the end.
+    A legacy single-file target is migrated into partitions, its rows ranking between the
+    partitioned rows and relation (like the one-off migration of mergePartitions).
+
+    Args:
+        con: DuckDB connection
+        relation: Table / view with the new records
+        target_path: Path to Silver parquet file (directory when partitioned)
+        primary_keys: List of columns defining primary key
+        order_by: Column(s) to order by, latest is kept, or None
+        partition_by: List of partition columns (e.g., ['date'])
+        storage: Table storage config (see storageConfig)
+        row_group_size: max rows per parquet row group (storage row_group_size overrides it)
+    """
+    row_group_size = (storage or {}).get("row_group_size", row_group_size)
+    target = Path(target_path)
+
+    incoming_count = _count(con, relation)
+    if incoming_count == 0:
+        print("✓ MERGE skipped: no new records")
+        return
+
+    legacy = None
+    if partition_by and target.is_file():
+        legacy = target.with_name(f".{target.name}.legacy")
+        os.replace(target, legacy)
+        print(f"✓ Migrating unpartitioned {target_path}")
+
+    # sources in ascending priority: existing rows < legacy file < incoming records
+    incoming = [f"SELECT * FROM {relation}"]
+    if legacy is not None:
+        incoming.insert(0, f"SELECT * FROM {scanParquet(legacy, [str(legacy)])}")
+
+    if partition_by:
+        touched = con.execute(f"SELECT DISTINCT {_columns(partition_by)} FROM ({' UNION ALL BY NAME '.join(incoming)})").fetchall()
+        # writers plan from the manifest (or a listing), the date index may be behind them
+        old_files = tableFiles(target_path, {col: [row[i] for row in touched] for i, col in enumerate(partition_by)},
+                               use_index=False)
+    else:
+        old_files = tableFiles(target_path)
+
+    sources = [f"SELECT * FROM {scanParquet(target_path, old_files)}"] if old_files else []
+    sources += incoming
+    union = " UNION ALL BY NAME ".join(f"SELECT *, {rank} AS _merge_source FROM ({sql})" for rank, sql in enumerate(sources))
+
+    order = [f"{_quote(col)} DESC NULLS LAST" for col in _orderColumns(order_by)] + ["_merge_source DESC"]
+    query = f"""
+        SELECT * EXCLUDE (_merge_source) FROM ({union})
+        QUALIFY row_number() OVER (PARTITION BY {_columns(primary_keys)} ORDER BY {", ".join(order)}) = 1
+        {f"ORDER BY {_columns(partition_by)}" if partition_by else ""}
+    """
+
+    existing_count = _count(con, f"({sources[0]})") if old_files else 0
+    batches = con.execute(query).fetch_record_batch(row_group_size)
+
+    if partition_by:
+        merged_count, partitions, written = _writePartitions(batches, target_path, partition_by, row_group_size, storage)
+        # the rewritten partitions replace the old ones in one manifest swap
+        updateManifest(target_path, added=written, removed=[file for file in old_files if file != str(target)])
+    else:
+        merged_count, partitions = _writeFile(batches, target_path, row_group_size, storage), 1
+
+    for file in old_files:
+        if file != str(target):
+            os.remove(file)
+    if legacy is not None:
+        os.remove(legacy)
+
+    inserts = merged_count - existing_count
+    countRows(rows_in=incoming_count, rows_out=merged_count)
+    print(f"✓ MERGE complete ({partitions} partitions rewritten):" if partition_by else "✓ MERGE complete:")
+    print(f"  - Updated: {incoming_count - inserts} records")
+    print(f"  - Inserted: {inserts} records")
+    print(f"  - Total: {merged_count} records")
+
+
+def _storageBatch(batch, storage: dict = None):
+    """Record batch in storage types - strings as large_string, like the frames of the pandas engine."""
+    import pyarrow as pa
+
+    table = pa.Table.from_batches([batch])
+    table = table.cast(pa.schema([field.with_type(pa.large_string()) if pa.types.is_string(field.type) else field
+                                  for field in table.schema]))
+    return toStorageTable(table, storage)
+
+
+def _writeFile(batches, path: str, row_group_size: int, storage: dict = None) -> int:
+    """
+    Stream record batches into one parquet file in its storage types, written aside and
+    renamed into place. Returns the number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+
+    writer, rows = None, 0
+    try:
+        for batch in batches:
+            table = _storageBatch(batch, storage)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, **parquetWriteOptions(storage))
+            writer.write_table(table.cast(writer.schema), row_group_size=row_group_size)
+            rows += table.num_rows
+        if writer is None:
+            empty = pa.RecordBatch.from_pylist([], schema=batches.schema)
+            writer = pq.ParquetWriter(tmp_path, _storageBatch(empty, storage).schema, **parquetWriteOptions(storage))
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    writer.close()
+    os.replace(tmp_path, path)
+    countIO(written=[path])
+    return rows
+
+
+def _writePartitions(batches, path: str, partition_by: list, row_group_size: int, storage: dict = None) -> tuple:
+    """
+    Stream record batches sorted by partition_by into one new hive partition file per
+    partition value (partition columns are dropped from the file, like _writeParquetPartitions).
+
+    Returns:
+        tuple: (rows written, partitions written, written files)
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    current = {'key': None, 'writer': None, 'tmp': None, 'final': None}
+    rows, partitions, written = 0, 0, []
+
+    def close():
+        if current['writer'] is not None:
+            current['writer'].close()
+            os.replace(current['tmp'], current['final'])
+            countIO(written=[current['final']])
+            written.append(str(current['final']))
+
+    try:
+        for batch in batches:
+            table = _storageBatch(batch)
+            if table.num_rows == 0:
+                continue
+
+            # start of every run of equal partition values in the sorted batch
+            changed = None
+            for col in partition_by:
+                values = table[col]
+                step = pc.fill_null(pc.not_equal(values.slice(1), values.slice(0, len(values) - 1)), True)
+                changed = step if changed is None else pc.or_(changed, step)
+            starts = [0] + [i + 1 for i in pc.indices_nonzero(changed).to_pylist()] + [table.num_rows]
+
+            for start, end in zip(starts[:-1], starts[1:]):
+                part = table.slice(start, end - start)
+                key = tuple(part[col][0].as_py() for col in partition_by)
+                data = toStorageTable(part.drop_columns(partition_by), storage)
+
+                if key != current['key']:
+                    close()
+                    part_dir = Path(path).joinpath(*[f"{col}={val}" for col, val in zip(partition_by, key)])
+                    part_dir.mkdir(parents=True, exist_ok=True)
+                    file_name = f"{uuid.uuid4().hex}-0.parquet"
+                    current.update(key=key, tmp=part_dir / f".{file_name}.tmp", final=part_dir / file_name,
+                                   writer=pq.ParquetWriter(part_dir / f".{file_name}.tmp", data.schema,
+                                                           **parquetWriteOptions(storage)))
+                    partitions += 1
+
+                current['writer'].write_table(data.cast(current['writer'].schema), row_group_size=row_group_size)
+                rows += data.num_rows
+    except BaseException:
+        if current['writer'] is not None:
+            current['writer'].close()
+            current['tmp'].unlink(missing_ok=True)
+        raise
+
+    close()
+    return rows, partitions, written
+
+
+# gold columns the rollups read, typed for a selection without files
+_COLUMN_TYPES = {'revenue': 'BIGINT', 'theaters': 'INTEGER', 'imdb_rating': 'DOUBLE', 'is_enriched': 'INTEGER'}
+_FACT_COLUMNS = ['_sk_movie', '_sk_distributor', 'date', 'revenue', 'theaters']
+
+
+def _registerTable(con, name: str, path: str, columns: list, partition_values: dict = None):
+    """View name over the projected columns of a parquet table (empty typed view if no files match)."""
+    files = tableFiles(path, partition_values)
+    if files:
+        source = f"SELECT {_columns(columns)} FROM {scanParquet(path, files)}"
+    else:
+        source = "SELECT " + ", ".join(f"NULL::{_COLUMN_TYPES.get(col, 'VARCHAR')} AS {_quote(col)}"
+                                       for col in columns) + " WHERE false"
+    con.execute(f"CREATE OR REPLACE TEMP VIEW {_quote(name)} AS {source}")
+
+
+def _frame(con, query: str) -> pd.DataFrame:
+    """Query result as DataFrame with arrow-backed strings, like readTable."""
+    import pyarrow as pa
+
+    string_dtype = pd.StringDtype("pyarrow")
+    table = con.execute(query).fetch_arrow_table()
+    return table.to_pandas(types_mapper={pa.string(): string_dtype, pa.large_string(): string_dtype}.get)
+
+
+# additive rollup measures of jobs._rollup over fact f / dimMovies m, typed like their pandas results
+_ROLLUP_MEASURES = {
+    'revenue': "coalesce(sum(f.revenue), 0)::BIGINT",
+    'revenue_rows': "count(f.revenue)",
+    'theaters_sum': "coalesce(sum(f.theaters), 0)::INTEGER",
+    'theaters_rows': "count(f.theaters)",
+    'rows': "count(*)",
+    'enriched_rows': "coalesce(sum(coalesce(m.is_enriched, 0)), 0)::BIGINT",
+    'rating_sum': "coalesce(sum(m.imdb_rating), 0)::DOUBLE",
+    'rating_rows': "count(m.imdb_rating)"
+}
+
+
+def _rollupMeasures(measures: list) -> str:
+    return ",\n            ".join(f"{_ROLLUP_MEASURES[name]} AS {_quote(name)}" for name in measures)
+
+
+@instrumented
+def revenueRollups(con, gold_path: str, touched_dates: list, touched_movies: list) -> tuple:
+    """
+    Daily, movie and genre rollups of aggRevenues-Gold as joins / aggregations over the gold
+    tables (see jobs._revenueRollups for the pandas version).
+
+    Args:
+        con: DuckDB connection
+        gold_path: Gold layer folder
+        touched_dates: Dates whose daily / genre rollups are recomputed
+        touched_movies: Movies whose totals are recomputed
+
+    Returns:
+        tuple: (daily, movies, genre daily) DataFrames
+    """
+    import pyarrow as pa
+
+    fact_path = os.path.join(gold_path, "factRevenues")
+    _registerTable(con, "fact_dates", fact_path, _FACT_COLUMNS, {'date': touched_dates})
+    _registerTable(con, "fact", fact_path, _FACT_COLUMNS)
+    _registerTable(con, "dim_movies", os.path.join(gold_path, "dimMovies"), ['_sk_movie', 'imdb_rating', 'is_enriched'])
+    _registerTable(con, "bridge", os.path.join(gold_path, "bridgeMovieGenre"), ['_sk_movie', '_sk_genre'])
+    _registerTable(con, "dim_genre", os.path.join(gold_path, "dimGenre"), ['_sk_genre', 'genre'])
+    con.register("touched_movies", pa.table({'_sk_movie': pa.array(touched_movies, pa.string())}))
+
+    df_daily = _frame(con, f"""
+        SELECT f.date, substr(f.date, 1, 7) AS month, f._sk_distributor,
+            {_rollupMeasures(list(_ROLLUP_MEASURES))}
+        FROM fact_dates f LEFT JOIN dim_movies m USING (_sk_movie)
+        GROUP BY ALL
+        ORDER BY ALL NULLS LAST
+    """)
+
+    df_movies = _frame(con, """
+        SELECT _sk_movie, _sk_distributor,
+            coalesce(sum(revenue), 0)::BIGINT AS revenue,
+            coalesce(sum(theaters), 0)::INTEGER AS theaters_sum,
+            count(theaters) AS theaters_rows,
+            count(*) AS "rows",
+            min(date) AS first_date,
+            max(date) AS last_date
+        FROM fact
+        WHERE _sk_movie IN (SELECT _sk_movie FROM touched_movies)
+        GROUP BY ALL
+        ORDER BY _sk_movie, _sk_distributor NULLS LAST
+    """)
+
+    # enriched rows only, one row per genre of the movie
+    df_genre_daily = _frame(con, f"""
+        SELECT f.date, b._sk_genre, g.genre, f._sk_distributor,
+            {_rollupMeasures(['revenue', 'theaters_sum', 'theaters_rows', 'rows', 'rating_sum', 'rating_rows'])}
+        FROM fact_dates f
+            JOIN dim_movies m USING (_sk_movie)
+            JOIN bridge b USING (_sk_movie)
+            JOIN dim_genre g USING (_sk_genre)
+        WHERE m.is_enriched = 1
+        GROUP BY ALL
+        ORDER BY ALL NULLS LAST
+    """)
+
+    return df_daily, df_movies, df_genre_daily
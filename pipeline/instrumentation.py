@@ -0,0 +1,352 @@
+"""
+Stage timings of pipeline runs.
+
+Every job in jobs.PIPELINES runs as an instrumented run (pipelineRun) and the heavy
+common_function / duckdb_engine helpers are stages of it (instrumented). A stage records
+
+    wall_s, cpu_s                    time.perf_counter / time.process_time (all threads)
+    peak_rss_mb, peak_rss_growth_mb  process high-water mark at the end of the stage and how much
+                                     the stage raised it
+    rows_in, rows_out                length of the first DataFrame / arrow Table argument and of
+                                     the result (or what the helper reports with countRows)
+    bytes_read, bytes_written        on-disk size of the files the stage read / wrote (countIO)
+
+Nested stages are recorded with their path (e.g. "factRevenuesGold/mergeSilver/readTable"),
+so a parent's time includes its children. When the run ends all records are appended to
+metadata/runs/<pipeline_id>.jsonl, one JSON line per stage plus one for the whole run
+(stage "run"), and a run can be compared with earlier ones:
+
+    python pipeline/instrumentation.py factRevenues-Gold
+
+Profiling: PIPELINE_PROFILE="mergeSilver,readTable" (or "*" for every stage, runner.py
+--profile) runs the outermost matching stage under cProfile and dumps the stats to
+metadata/runs/profiles/. PIPELINE_PROFILER=pyinstrument writes a pyinstrument HTML report
+instead (optional dependency, imported only then).
+
+Outside of a run (dashboard, exploration notebooks) stages are not recorded.
+"""
+import argparse
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+RUNS_PATH = "../metadata/runs/"
+
+_LOCK = threading.Lock()
+_RUN = None       # {'pipeline_id', 'run_id', 'records'} of the active run
+_STACK = []       # open stages, outermost first
+_PROFILING = False
+
+
+def _peakRssMb() -> float:
+    """High-water mark of the process' resident memory in MB, None if it cannot be read."""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / 2**20 if os.uname().sysname == "Darwin" else peak / 2**10
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().peak_wset / 2**20
+    except (ImportError, AttributeError):
+        return None
+
+
+def _rows(value) -> int:
+    """Rows of a DataFrame / arrow Table (summed over a tuple of them), None for anything else."""
+    if isinstance(value, tuple):
+        counts = [_rows(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    if hasattr(value, "num_rows"):
+        return value.num_rows
+    if hasattr(value, "columns") and hasattr(value, "__len__"):
+        return len(value)
+    return None
+
+
+def _profiled(name: str) -> bool:
+    selected = os.environ.get("PIPELINE_PROFILE", "")
+    stages = {stage.strip() for stage in selected.split(",") if stage.strip()}
+    return "*" in stages or name in stages
+
+
+@contextmanager
+def _profile(name: str):
+    """Run the block under the configured profiler and write its report to RUNS_PATH/profiles/."""
+    global _PROFILING
+
+    if _RUN is None or _PROFILING or not _profiled(name):
+        yield
+        return
+
+    profiles_path = Path(RUNS_PATH) / "profiles"
+    profiles_path.mkdir(parents=True, exist_ok=True)
+    report = profiles_path / f"{_RUN['pipeline_id']}-{_RUN['run_id']}-{name}"
+
+    _PROFILING = True
+    try:
+        if os.environ.get("PIPELINE_PROFILER", "cProfile") == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                report = report.with_suffix(".html")
+                report.write_text(profiler.output_html(), encoding="utf-8")
+        else:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                report = report.with_suffix(".prof")
+                profiler.dump_stats(report)
+    finally:
+        _PROFILING = False
+        print(f"✓ Profile of {name}: {report}")
+
+
+@contextmanager
+def stage(name: str, rows_in: int = None):
+    """
+    Record the enclosed block as a stage of the active run (no-op without one).
+
+    Yields:
+        dict: The stage record - rows_out etc. can be set on it
+    """
+    if _RUN is None or threading.current_thread() is not threading.main_thread():
+        yield {}
+        return
+
+    record = {
+        'pipeline_id': _RUN['pipeline_id'],
+        'run_id': _RUN['run_id'],
+        'stage': name,
+        'path': "/".join([parent['stage'] for parent in _STACK] + [name]),
+        'depth': len(_STACK),
+        'started_at': datetime.now().isoformat(),
+        'status': 'success',
+        'rows_in': rows_in,
+        'rows_out': None,
+        'bytes_read': 0,
+        'bytes_written': 0
+    }
+    peak_before = _peakRssMb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    _STACK.append(record)
+    try:
+        with _profile(name):
+            yield record
+    except BaseException:
+        record['status'] = 'failed'
+        raise
+    finally:
+        _STACK.pop()
+        peak = _peakRssMb()
+        record['wall_s'] = round(time.perf_counter() - wall_start, 6)
+        record['cpu_s'] = round(time.process_time() - cpu_start, 6)
+        record['peak_rss_mb'] = None if peak is None else round(peak, 1)
+        record['peak_rss_growth_mb'] = None if peak is None else round(peak - peak_before, 1)
+        _RUN['records'].append(record)
+
+
+def instrumented(function):
+    """
+    Decorator: run function as a stage named after it. rows_in / rows_out are taken from the
+    first DataFrame / Table argument and the result unless the function reports them (countRows).
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _RUN is None:
+            return function(*args, **kwargs)
+
+        rows_in = next((rows for rows in map(_rows, list(args) + list(kwargs.values())) if rows is not None), None)
+        with stage(function.__name__, rows_in=rows_in) as record:
+            result = function(*args, **kwargs)
+            if record.get('rows_out') is None:
+                record['rows_out'] = _rows(result)
+            return result
+
+    return wrapper
+
+
+def countRows(rows_in: int = None, rows_out: int = None):
+    """Report the rows the innermost stage consumed / produced (e.g. for streamed input or writes)."""
+    if _RUN is None or not _STACK:
+        return
+    if rows_in is not None:
+        _STACK[-1]['rows_in'] = rows_in
+    if rows_out is not None:
+        _STACK[-1]['rows_out'] = rows_out
+
+
+def _fileBytes(files) -> int:
+    total = 0
+    for file in files:
+        try:
+            total += os.path.getsize(file)
+        except OSError:
+            pass
+    return total
+
+
+def countIO(read: list = (), written: list = ()):
+    """
+    Add the on-disk size of files read / written to every open stage and the run.
+
+    Args:
+        read: Paths of files read
+        written: Paths of files written (after they were renamed into place)
+    """
+    if _RUN is None:
+        return
+    bytes_read, bytes_written = _fileBytes(read), _fileBytes(written)
+    with _LOCK:
+        for record in _STACK:
+            record['bytes_read'] += bytes_read
+            record['bytes_written'] += bytes_written
+
+
+def pipelineRun(job):
+    """
+    Decorator for the jobs of jobs.PIPELINES: the call is one run - recorded as stage "run"
+    with every instrumented helper below it - and written to RUNS_PATH/<pipeline_id>.jsonl.
+    A job called inside another run is a stage of that run.
+    """
+    signature = inspect.signature(job)
+
+    @functools.wraps(job)
+    def wrapper(*args, **kwargs):
+        global _RUN
+
+        if _RUN is not None:
+            with stage(job.__name__):
+                return job(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        pipeline_id = bound.arguments.get('pipeline_id', job.__name__)
+
+        _RUN = {'pipeline_id': pipeline_id, 'run_id': uuid.uuid4().hex[:12], 'records': []}
+        try:
+            with stage(job.__name__):
+                return job(*args, **kwargs)
+        finally:
+            run, _RUN = _RUN, None
+            _writeRun(run)
+
+    return wrapper
+
+
+def _writeRun(run: dict):
+    """Append the run's records (run summary first, stages in start order) as JSON lines."""
+    records = sorted(run['records'], key=lambda record: (record['started_at'], record['depth']))
+    job = next(record for record in records if record['depth'] == 0)
+    summary = {**job, 'stage': 'run', 'path': 'run', 'stages': len(records) - 1}
+
+    Path(RUNS_PATH).mkdir(parents=True, exist_ok=True)
+    runs_file = Path(RUNS_PATH) / f"{run['pipeline_id']}.jsonl"
+    with open(runs_file, "a", encoding="utf-8") as f:
+        for record in [summary] + records[1:]:
+            f.write(json.dumps(record) + "\n")
+
+    print(f"✓ Run {run['run_id']} recorded: {summary['wall_s']:.2f}s wall, {summary['cpu_s']:.2f}s cpu, "
+          f"{len(records) - 1} stages -> {runs_file}")
+
+
+def readRuns(pipeline_id: str) -> list:
+    """
+    Recorded runs of a pipeline, oldest first.
+
+    Returns:
+        list: One list of records per run (run summary first)
+    """
+    runs_file = Path(RUNS_PATH) / f"{pipeline_id}.jsonl"
+    if not runs_file.exists():
+        return []
+
+    runs = {}
+    with open(runs_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                runs.setdefault(record['run_id'], []).append(record)
+    return list(runs.values())
+
+
+def summarizeRuns(pipeline_id: str, history: int = 10):
+    """
+    Print where the last run of a pipeline spent its time, stage by stage, next to the
+    median of up to history earlier runs (regressions show up as a large ratio).
+    """
+    import statistics
+
+    runs = readRuns(pipeline_id)
+    if not runs:
+        print(f"⚠️  No recorded runs of {pipeline_id} in {RUNS_PATH}")
+        return
+
+    last, earlier = runs[-1], runs[-history - 1:-1]
+    # a stage called several times in a run (e.g. readTable) is summed per path
+    def totals(run):
+        per_path = {}
+        for record in run:
+            total = per_path.setdefault(record['path'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                         'rows_out': 0, 'bytes_read': 0, 'bytes_written': 0})
+            total['calls'] += 1
+            for key in ('wall_s', 'cpu_s', 'bytes_read', 'bytes_written'):
+                total[key] += record[key] or 0
+            total['rows_out'] += record['rows_out'] or 0
+            total['peak_rss_mb'] = max(total.get('peak_rss_mb') or 0, record['peak_rss_mb'] or 0)
+        return per_path
+
+    last_totals = totals(last)
+    earlier_totals = [totals(run) for run in earlier]
+
+    print(f"{pipeline_id} run {last[0]['run_id']} ({last[0]['started_at']}, {last[0]['status']}), "
+          f"compared with {len(earlier)} earlier runs")
+    print(f"{'stage':<60} {'calls':>5} {'wall s':>8} {'median':>8} {'cpu s':>8} {'rows out':>10} "
+          f"{'MB read':>8} {'MB written':>10} {'peak MB':>8}")
+    for path, total in last_totals.items():
+        previous = [run[path]['wall_s'] for run in earlier_totals if path in run]
+        median = f"{statistics.median(previous):>8.2f}" if previous else f"{'-':>8}"
+        print(f"{path:<60} {total['calls']:>5} {total['wall_s']:>8.2f} {median} {total['cpu_s']:>8.2f} "
+              f"{total['rows_out']:>10} {total['bytes_read'] / 2**20:>8.1f} {total['bytes_written'] / 2**20:>10.1f} "
+              f"{total['peak_rss_mb']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize recorded pipeline runs")
+    parser.add_argument("pipelines", nargs="*", help="pipeline ids (default: every recorded pipeline)")
+    parser.add_argument("--history", type=int, default=10, help="earlier runs the last run is compared with")
+    args = parser.parse_args()
+
+    # metadata paths are resolved relative to pipeline/, like in the notebooks
+    os.chdir(Path(__file__).resolve().parent)
+
+    pipelines = args.pipelines or sorted(path.stem for path in Path(RUNS_PATH).glob("*.jsonl"))
+    for pipeline_id in pipelines:
+        summarizeRuns(pipeline_id, args.history)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,777 @@
+"""
+Pipeline logic as importable functions - one function per pipeline id.
+
+The notebooks in this folder are thin wrappers around these functions, runner.py
+executes them as a DAG. Every function expects the working directory to be
+pipeline/ (metadata is resolved relative to it) and writes its own status on success.
+"""
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from common_function import (readConfig, appendMode, absPath, updatePipelineStatus, getLastSuccessUnix,
+                             loadBronzeInDelta, deduplicateRecords, mergeSilver, createHashKey,
+                             lookupSurrogateKeys, readTable, getWatermark, getDeltaWatermark, dropTable,
+                             appendDimensionMembers, replaceByKey, fetchOMDBData, OMDBResponseCache, readCsvChunks,
+                             fileChecksum, SourceSnapshotIndex, storageConfig, engineConfig, readDates, updateDateIndex,
+                             compactTable, matchTitles, parallelMap, parseOMDBFields, writeParquetFile)
+from instrumentation import pipelineRun, instrumented
+
+
+# ---------------------------------------------------------------- bronze
+
+@pipelineRun
+def revenuesBronze(pipeline_id: str = "Revenues-Bronze"):
+    """
+    Source CSV -> Bronze: read the daily revenues file and append it with technical fields.
+
+    The CSV is streamed with the pyarrow CSV reader and typed by the config schema; every
+    chunk is written as parquet row groups right after it is parsed, so memory does not
+    grow with the file size.
+
+    With "change_detection" in the source config only rows that are new or changed since
+    the last ingested snapshot are appended, and an unchanged file (same checksum) is not
+    read at all - the run ends without touching bronze or the pipeline status.
+
+    Args:
+        pipeline_id: Pipeline identifier (config name)
+    """
+    config = readConfig(pipeline_id)
+    source_path = os.path.join(absPath(), config["source"]["path"])
+    change_detection = config["source"].get("change_detection")
+
+    if change_detection:
+        checksum = fileChecksum(source_path)
+        snapshot_index = SourceSnapshotIndex(os.path.join(absPath(), change_detection["index_path"]),
+                                             key_columns=change_detection["keys"])
+        if snapshot_index.checksum == checksum:
+            print(f"✓ Source file unchanged since last ingestion ({checksum[:12]}) - nothing to ingest")
+            return
+
+    # Read CSV using config parameters - typed chunks of block_size_mb
+    chunks = readCsvChunks(
+        source_path,
+        schema=config["source"]["schema"],
+        delimiter=config["source"]["delimiter"],
+        encoding=config["source"]["encoding"],
+        header=config["source"]["header"],
+        block_size_mb=config["source"].get("block_size_mb", 4)
+    )
+
+    # keep only rows that are new or changed since the last snapshot
+    if change_detection:
+        chunks = snapshot_index.changedRows(chunks)
+
+    # Add technical fields - one ingestion time for the whole file
+    ingestion_time = int(time.time())  # Unix timestamp
+    ingestion_date = datetime.now().strftime("%Y-%m-%d")
+
+    def withTechnicalFields(chunks):
+        for df in chunks:
+            df["_tf_ingestion_time"] = ingestion_time
+            df["_tf_ingestion_date"] = ingestion_date
+            yield df
+
+    appendMode(withTechnicalFields(chunks), os.path.join(absPath(), f"{config['target']['path']}\\{config['target']['name']}"),
+               format="parquet",
+               partition_cols=config['target']["partition_by"],
+               row_group_size=config['target'].get("row_group_size", 100_000),
+               storage=storageConfig(config, config['target']['name']))
+
+    # the snapshot only becomes the new baseline once its rows are safely in bronze
+    if change_detection:
+        snapshot_index.save(checksum)
+
+    updatePipelineStatus(pipeline_id, status='success')
+
+
+@instrumented
+def getNewTitlesToFetch(revenues_path: str, omdb_path: str, cache: OMDBResponseCache = None,
+                        matching: dict = None) -> list:
+    """
+    Get list of new titles from revenues that don't exist in OMDB bronze layer.
+    Titles with a fresh response cache entry (found under another title or not found) are skipped too,
+    and so are titles matching an OMDB title in another spelling (see matchTitles).
+
+    Args:
+        revenues_path: Path to bronze revenues parquet
+        omdb_path: Path to bronze OMDB parquet
+        cache: Optional OMDB response cache
+        matching: matchTitles options (min_score, max_candidates, max_posting)
+
+    Returns:
+        list: Distinct titles that need to be fetched from OMDB API
+    """
+    # Load distinct titles from revenues
+    df_revenues = readTable(revenues_path, columns=['title'])
+    titles_in_revenues = set(df_revenues['title'].unique())
+    print(f"✓ Found {len(titles_in_revenues)} distinct titles in revenues")
+
+    # Load existing titles from OMDB (if exists)
+    if Path(omdb_path).exists():
+        df_omdb = readTable(omdb_path, columns=['title'])
+        titles_in_omdb = set(df_omdb['title'].unique())
+        print(f"✓ Found {len(titles_in_omdb)} existing titles in OMDB bronze")
+    else:
+        titles_in_omdb = set()
+        print("✓ No existing OMDB data found (first run)")
+
+    # Find new titles (set difference)
+    new_titles = titles_in_revenues - titles_in_omdb
+
+    # skip titles already answered by the API recently
+    if cache is not None:
+        cached_titles = cache.freshTitles(new_titles)
+        new_titles = new_titles - cached_titles
+        print(f"✓ {len(cached_titles)} titles skipped - fresh response in cache")
+
+    # titles OMDB knows in another spelling (case, punctuation, articles, year suffix)
+    if new_titles and titles_in_omdb:
+        matches = matchTitles(sorted(new_titles), sorted(titles_in_omdb), **(matching or {}))
+        matched_titles = set(matches.loc[matches['match_title'].notna(), 'title'])
+        new_titles = new_titles - matched_titles
+        print(f"✓ {len(matched_titles)} titles skipped - matched to an OMDB title")
+
+    print(f"✓ {len(new_titles)} new titles to fetch from OMDB API")
+
+    return sorted(list(new_titles))
+
+
+@pipelineRun
+def omdbBronze(pipeline_id: str = "OMDB-Bronze"):
+    """
+    OMDB API -> Bronze: fetch titles from revenues that are not in OMDB bronze yet and append them.
+
+    Args:
+        pipeline_id: Pipeline identifier (config name)
+    """
+    from dotenv import load_dotenv
+
+    # Load environment variables
+    load_dotenv()
+
+    config = readConfig(pipeline_id)
+
+    # generate titles that are not present in db
+    cache = OMDBResponseCache(
+        os.path.join(absPath(), config["cache"]["path"]),
+        ttl_found_days=config["cache"]["ttl_found_days"],
+        ttl_not_found_days=config["cache"]["ttl_not_found_days"]
+    )
+
+    revenues_path = os.path.join(absPath(), config["validation_path"])
+    omdb_path = os.path.join(absPath(), config["target"]["path"], config["target"]["name"])
+    titles = getNewTitlesToFetch(revenues_path, omdb_path, cache, config.get("title_matching"))
+
+    # fetched records are checkpointed, so a run cut short by the daily limit resumes where it stopped
+    checkpoint_path = Path(f"../metadata/checkpoint/{pipeline_id}.jsonl")
+
+    try:
+        df = fetchOMDBData(
+            titles,
+            base_url=config["source"]["url"],
+            max_in_flight=config["source"]["max_in_flight"],
+            rate_per_second=config["source"]["rate_per_second"],
+            max_retries=config["source"]["max_retries"],
+            checkpoint_path=checkpoint_path,
+            cache=cache
+        )
+    finally:
+        cache.close()
+
+    df["_tf_ingestion_time"] = int(time.time())  # Unix timestamp
+    df["_tf_ingestion_date"] = datetime.now().strftime("%Y-%m-%d")
+
+    appendMode(df, os.path.join(absPath(), f"{config['target']['path']}\\{config['target']['name']}"),
+               format="parquet",
+               partition_cols=config['target']["partition_by"],
+               storage=storageConfig(config, config['target']['name']))
+
+    # records are safely in bronze now
+    checkpoint_path.unlink(missing_ok=True)
+
+    updatePipelineStatus(pipeline_id, status='success')
+
+
+@pipelineRun
+def compactBronze(pipeline_id: str = "Bronze-Compaction"):
+    """
+    Bronze maintenance: merge the small _tf_ingestion_time=<unix> partitions every run adds
+    into compacted files and drop partitions past the retention period (see compactTable).
+
+    Retention never drops data a consumer of the table has not processed yet: the cut-off
+    is the earlier of now - retention_days and the last success of every consumer.
+
+    Args:
+        pipeline_id: Pipeline identifier (config name)
+    """
+    config = readConfig(pipeline_id)
+
+    for table in config["tables"]:
+        retention_before = None
+        if table.get("retention_days") is not None:
+            retention_before = min([int(time.time() - table["retention_days"] * 86400)]
+                                   + [getLastSuccessUnix(consumer) for consumer in table.get("consumers", [])])
+
+        compactTable(
+            os.path.join(absPath(), table["path"]),
+            partition_col=table["partition_by"],
+            target_file_mb=table.get("target_file_mb", 128),
+            min_age_hours=table.get("min_age_hours", 24),
+            retention_before=retention_before,
+            row_group_size=table.get("row_group_size", 100_000)
+        )
+
+    updatePipelineStatus(pipeline_id, status='success')
+
+
+# ---------------------------------------------------------------- silver
+
+def mergeBronzeDelta(pipeline_id: str, parse_omdb_fields: bool = False):
+    """
+    Bronze -> Silver: load bronze delta since the last successful run, deduplicate it on
+    the primary keys and merge it into silver. Shared by Revenues-Silver and OMDB-Silver.
+
+    Args:
+        pipeline_id: Pipeline identifier (config name)
+        parse_omdb_fields: Parse the raw OMDB strings of the delta into typed columns (parseOMDBFields)
+    """
+    config = readConfig(pipeline_id)
+
+    # get last successful run date
+    last_completed_date = getLastSuccessUnix(pipeline_id)
+
+    # Read data from bronze in delta.
+    # Meaning - take all data which was loaded to bronze since last successful silver run
+    bronze_path = os.path.join(absPath(), config["source"]["path"])
+    silver_path = os.path.join(absPath(), config["target"]["path"])
+
+    engine = engineConfig(config)
+    if engine['name'] == 'duckdb':
+        # same steps as queries over the parquet files - out of core, all cores
+        import duckdb_engine
+
+        with duckdb_engine.connect(engine) as con:
+            delta = duckdb_engine.loadBronzeInDelta(con, bronze_path, '_tf_ingestion_time', last_completed_date)
+            if delta is not None:
+                deduplicated = duckdb_engine.deduplicateRecords(con, delta, config['target']['pk'],
+                                                                config['target']['order_pk'], ascending=False)
+                if parse_omdb_fields:
+                    deduplicated = duckdb_engine.parseOMDBFields(con, deduplicated)
+                duckdb_engine.mergeSilver(con, deduplicated, silver_path,
+                                          primary_keys=config['target']['pk'],
+                                          order_by=config['target']['order_pk'],
+                                          partition_by=config['target'].get('partition_by'),
+                                          storage=storageConfig(config, config['target']['name']))
+
+        updatePipelineStatus(pipeline_id, status='success')
+        return
+
+    df_delta = loadBronzeInDelta(
+        bronze_path=bronze_path,
+        partition_col='_tf_ingestion_time',
+        last_success_unix=last_completed_date
+    )
+
+    # deduplicate data from bronze basing on primary keys defined, order by ingestion date
+    df_insert = deduplicateRecords(
+        df=df_delta,
+        business_keys=config['target']['pk'],  # Business uniqueness
+        order_by=config['target']['order_pk'],  # Keep latest ingestion
+        ascending=False  # False = keep highest timestamp
+    )
+
+    # typed once here, gold and the dashboard read numbers and dates
+    if parse_omdb_fields:
+        df_insert = parseOMDBFields(df_insert)
+
+    # merge to silver layer based on pk
+    mergeSilver(
+        df_bronze=df_insert,
+        target_path=silver_path,
+        primary_keys=config['target']['pk'],
+        order_by=config['target']['order_pk'],
+        partition_by=config['target'].get('partition_by'),
+        storage=storageConfig(config, config['target']['name'])
+    )
+
+    updatePipelineStatus(pipeline_id, status='success')
+
+
+@pipelineRun
+def revenuesSilver(pipeline_id: str = "Revenues-Silver"):
+    """Bronze -> Silver for revenues (delta + merge)."""
+    mergeBronzeDelta(pipeline_id)
+
+
+@pipelineRun
+def omdbSilver(pipeline_id: str = "OMDB-Silver"):
+    """Bronze -> Silver for OMDB (delta + merge), raw OMDB strings parsed into typed columns."""
+    import pyarrow.parquet as pq
+
+    config = readConfig(pipeline_id)
+    silver_path = os.path.join(absPath(), config["target"]["path"])
+
+    # One-off migration: silver written before the fields were typed holds the raw strings
+    if os.path.exists(silver_path) and 'year_end' not in pq.read_schema(silver_path).names:
+        print(f"⚠️  {config['target']['name']} holds raw OMDB strings - parsing them into typed columns")
+        df_silver = parseOMDBFields(readTable(silver_path))
+        writeParquetFile(df_silver, silver_path, storage=storageConfig(config, config['target']['name']))
+
+    mergeBronzeDelta(pipeline_id, parse_omdb_fields=True)
+
+
+# ---------------------------------------------------------------- gold
+
+@pipelineRun
+def factRevenuesGold(pipeline_id: str = "factRevenues-Gold", full_refresh: bool = False):
+    """
+    Silver -> Gold fact table: upsert revenues changed since the watermark into the
+    date partitioned fact table.
+
+    Args:
+        pipeline_id: Pipeline identifier (config name)
+        full_refresh: True = rebuild the whole table from silver
+    """
+    config = readConfig(pipeline_id)
+
+    # Read data from silver in delta.
+    # Meaning - take all rows merged into silver since last successful gold run (watermark), everything on full refresh
+    target_path = os.path.join(absPath(), config["target"]["path"], config["target"]["name"])
+    if full_refresh:
+        dropTable(target_path)
+
+    watermark = 0 if full_refresh else getWatermark(pipeline_id, 'revenues')
+
+    path = os.path.join(absPath(), "data\\02_silver\\revenues")
+
+    df = readTable(path, columns=['title', 'date', 'distributor', 'revenue', 'theaters', '_tf_ingestion_time'],
+                   filters=[('_tf_ingestion_time', '>', watermark)])
+    new_watermark = getDeltaWatermark(df, watermark)
+
+    # row chunks of large deltas are hashed on the engine's worker processes
+    workers = engineConfig(config).get("workers", 1)
+
+    # Create hash
+    df = createHashKey(
+        df=df,
+        key_columns=['title', 'date'],
+        hash_column='_sk_revenue_id',
+        n_workers=workers
+    )
+
+    # dimension keys come from the shared key dictionary - only unseen titles/distributors are hashed
+    keys_path = os.path.join(absPath(), config["target"]["path"], "_keys")
+
+    df = lookupSurrogateKeys(
+        df=df,
+        key_column='title',
+        hash_column='_sk_movie',
+        dictionary_path=os.path.join(keys_path, "_sk_movie.parquet"),
+        n_workers=workers
+    )
+
+    df = lookupSurrogateKeys(
+        df=df,
+        key_column='distributor',
+        hash_column='_sk_distributor',
+        dictionary_path=os.path.join(keys_path, "_sk_distributor.parquet"),
+        n_workers=workers
+    )
+
+    df = df[[
+        '_sk_revenue_id',
+        '_sk_movie',
+        '_sk_distributor',
+        'date',
+        'revenue',
+        'theaters'
+    ]]
+
+    # upsert delta into the date partitioned fact table - untouched dates are not rewritten
+    mergeSilver(
+        df_bronze=df,
+        target_path=target_path,
+        primary_keys=config['target']['pk'],
+        order_by=None,
+        partition_by=config['target']['partition_by'],
+        storage=storageConfig(config, config['target']['name'])
+    )
+
+    # date -> (file, row group, offset) sidecar - range readers open only the files of their dates
+    if config['target'].get('index_by'):
+        updateDateIndex(target_path, config['target']['index_by'], values=df['date'].unique())
+
+    updatePipelineStatus(pipeline_id, watermark={'revenues': new_watermark})
+
+
+@pipelineRun
+def dimDistributorGold(pipeline_id: str = "dimDistributor-Gold", full_refresh: bool = False):
+    """
+    Silver -> Gold distributor dimension: append distributors not in the dimension yet.
+
+    Args:
+        pipeline_id: Pipeline identifier (config name)
+        full_refresh: True = rebuild the whole table from silver
+    """
+    config = readConfig(pipeline_id)
+
+    # Read data changed since last successful run (watermark), everything on full refresh
+    target_path = os.path.join(absPath(), config["target"]["path"], config["target"]["name"])
+    if full_refresh:
+        dropTable(target_path)
+
+    watermark = 0 if full_refresh else getWatermark(pipeline_id, 'revenues')
+
+    path = os.path.join(absPath(), "data\\02_silver\\revenues")
+
+    df = readTable(path, columns=["distributor", "_tf_ingestion_time"],
+                   filters=[('_tf_ingestion_time', '>', watermark)])
+    new_watermark = getDeltaWatermark(df, watermark)
+
+    df = df[["distributor"]].drop_duplicates()
+
+    keys_path = os.path.join(absPath(), config["target"]["path"], "_keys")
+
+    df = lookupSurrogateKeys(
+        df=df,
+        key_column='distributor',
+        hash_column='_sk_distributor',
+        dictionary_path=os.path.join(keys_path, "_sk_distributor.parquet")
+    )
+
+    df = df[[
+        '_sk_distributor',
+        'distributor'
+    ]]
+
+    # append only distributors not in the dimension yet
+    appendDimensionMembers(df, target_path, primary_keys=config['target']['pk'],
+                           storage=storageConfig(config, config['target']['name']))
+
+    updatePipelineStatus(pipeline_id, watermark={'revenues': new_watermark})
+
+
+def _splitGenres(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per (movie, genre) of the comma separated OMDB genre strings."""
+    df = df[['_sk_movie', 'genre']].copy()
+    df['genre'] = df['genre'].str.split(',')
+    df = df.explode('genre')
+    df['genre'] = df['genre'].str.strip()
+    return df[df['genre'].notna() & ~df['genre'].isin(['', 'N/A'])]
+
+
+@pipelineRun
+def dimMoviesGold(pipeline_id: str = "dimMovies-Gold", full_refresh: bool = False):
+    """
+    Silver -> Gold movie dimension: rebuild new titles and movies whose OMDB data changed,
+    upsert them and refresh their rows of the genre bridge.
+
+    Movies are enriched from the OMDB title they match - exact, normalized or fuzzy
+    (matchTitles) - and keep it with the confidence of the match (match_title, match_score,
+    match_method), so titles spelled differently in revenues and OMDB still join.
+
+    Args:
+        pipeline_id: Pipeline identifier (config name)
+        full_refresh: True = rebuild the whole table from silver
+    """
+    import pyarrow.parquet as pq
+
+    config = readConfig(pipeline_id)
+
+    # Read what changed since last successful run (watermark per silver source), everything on full refresh
+    target_path = os.path.join(absPath(), config["target"]["path"], config["target"]["name"])
+    genre_path = os.path.join(absPath(), config["target"]["path"], config["target"]["tables"]["genre"])
+    bridge_path = os.path.join(absPath(), config["target"]["path"], config["target"]["tables"]["bridge"])
+    if not full_refresh and Path(target_path).exists() and 'year_end' not in pq.read_schema(target_path).names:
+        # built from the raw OMDB strings - rebuild every movie from the typed silver columns
+        print(f"⚠️  {config['target']['name']} predates the typed OMDB fields - full refresh")
+        full_refresh = True
+    if full_refresh:
+        for path in [target_path, genre_path, bridge_path]:
+            dropTable(path)
+
+    watermark = {
+        'revenues': 0 if full_refresh else getWatermark(pipeline_id, 'revenues'),
+        'omdb': 0 if full_refresh else getWatermark(pipeline_id, 'omdb')
+    }
+
+    reve_path = os.path.join(absPath(), "data\\02_silver\\revenues")
+    omdb_path = os.path.join(absPath(), "data\\02_silver\\omdb")
+
+    df_reve = readTable(reve_path, columns=['title', '_tf_ingestion_time'],
+                        filters=[('_tf_ingestion_time', '>', watermark['revenues'])])
+    df_omdb_changed = readTable(omdb_path, columns=['title', '_tf_ingestion_time'],
+                                filters=[('_tf_ingestion_time', '>', watermark['omdb'])])
+
+    new_watermark = {
+        'revenues': getDeltaWatermark(df_reve, watermark['revenues']),
+        'omdb': getDeltaWatermark(df_omdb_changed, watermark['omdb'])
+    }
+
+    # Movies to (re)build: new titles from revenues + existing movies whose OMDB match may have changed -
+    # enriched from a changed OMDB title, or not enriched yet and matching one of the changed titles
+    matching = config.get("title_matching", {})
+    titles = set(df_reve['title'].dropna())
+    changed_omdb_titles = set(df_omdb_changed['title'].dropna())
+    if Path(target_path).exists() and changed_omdb_titles:
+        if 'match_title' in pq.read_schema(target_path).names:
+            df_existing = readTable(target_path, columns=['title', 'match_title'])
+        else:
+            # built before title matching - movies were enriched from their exact title
+            df_existing = readTable(target_path, columns=['title', 'is_enriched'])
+            df_existing['match_title'] = df_existing['title'].where(df_existing['is_enriched'] == 1)
+        titles |= set(df_existing.loc[df_existing['match_title'].isin(changed_omdb_titles), 'title'])
+
+        unmatched_titles = df_existing.loc[df_existing['match_title'].isna(), 'title']
+        if len(unmatched_titles):
+            rematched = matchTitles(unmatched_titles, sorted(changed_omdb_titles), **matching)
+            titles |= set(rematched.loc[rematched['match_title'].notna(), 'title'])
+    titles = sorted(titles)
+
+    # OMDB title of every movie (exact, normalized or fuzzy match) and the confidence of the match
+    df_reve = matchTitles(titles, readTable(omdb_path, columns=['title'])['title'], **matching)
+    df_omdb = readTable(omdb_path, columns=['title', 'year', 'year_end', 'rated', 'released', 'runtime',
+                                            'genre', 'director', 'writer', 'actors', 'plot', 'language', 'country',
+                                            'awards', 'poster', 'imdb_rating', 'rotten_tomatoes', 'metacritic',
+                                            'metascore', 'imdb_votes', 'imdb_id', 'box_office', 'production'],
+                        filters=[('title', 'in', sorted(set(df_reve['match_title'].dropna())))])
+
+    # create list of movies from revenue (master table) and enrich them with available data from omdb
+    keys_path = os.path.join(absPath(), config["target"]["path"], "_keys")
+
+    df_reve = lookupSurrogateKeys(
+        df=df_reve,
+        key_column='title',
+        hash_column='_sk_movie',
+        dictionary_path=os.path.join(keys_path, "_sk_movie.parquet")
+    )
+
+    df = df_reve.merge(
+        df_omdb.rename(columns={'title': 'match_title'}),
+        on='match_title',
+        how='left'
+    )
+
+    # adding a flag for enriched data
+    df['is_enriched'] = df['match_title'].notna().astype(int)
+
+    df = df[['_sk_movie', 'title', 'year', 'year_end', 'rated', 'released', 'runtime',
+             'genre', 'director', 'writer', 'actors', 'plot', 'language', 'country',
+             'awards', 'poster', 'imdb_rating', 'rotten_tomatoes', 'metacritic',
+             'metascore', 'imdb_votes', 'imdb_id', 'box_office', 'production',
+             'is_enriched', 'match_title', 'match_score', 'match_method']]
+
+    # upsert rebuilt movies into the dimension
+    mergeSilver(
+        df_bronze=df,
+        target_path=target_path,
+        primary_keys=config['target']['pk'],
+        order_by=None,
+        storage=storageConfig(config, config['target']['name'])
+    )
+
+    # genre bridge - one row per (movie, genre) of the rebuilt movies, replacing their previous genres
+    df_bridge = parallelMap(df[['_sk_movie', 'genre']], _splitGenres,
+                            n_workers=engineConfig(config).get("workers", 1))
+
+    df_bridge = lookupSurrogateKeys(
+        df=df_bridge,
+        key_column='genre',
+        hash_column='_sk_genre',
+        dictionary_path=os.path.join(keys_path, "_sk_genre.parquet")
+    )
+
+    appendDimensionMembers(
+        df=df_bridge[['_sk_genre', 'genre']].drop_duplicates(),
+        target_path=genre_path,
+        primary_keys=['_sk_genre'],
+        storage=storageConfig(config, config['target']['tables']['genre'])
+    )
+
+    replaceByKey(df_bridge[['_sk_movie', '_sk_genre']].drop_duplicates(), bridge_path, '_sk_movie', df['_sk_movie'],
+                 storage=storageConfig(config, config['target']['tables']['bridge']))
+
+    updatePipelineStatus(pipeline_id, watermark=new_watermark)
+
+
+def _rollup(df: pd.DataFrame, by: list) -> pd.DataFrame:
+    """Additive measures per group - the dashboard derives averages as sum / rows"""
+    return (df
+            .groupby(by, dropna=False, observed=True)
+            .agg(revenue=('revenue', 'sum'),
+                 revenue_rows=('revenue', 'count'),
+                 theaters_sum=('theaters', 'sum'),
+                 theaters_rows=('theaters', 'count'),
+                 rows=('revenue', 'size'),
+                 enriched_rows=('is_enriched', 'sum'),
+                 rating_sum=('imdb_rating', 'sum'),
+                 rating_rows=('imdb_rating', 'count'))
+            .reset_index())
+
+
+_ROLLUP_MEASURES = ['revenue', 'revenue_rows', 'theaters_sum', 'theaters_rows', 'rows',
+                    'enriched_rows', 'rating_sum', 'rating_rows']
+
+
+@instrumented
+def _revenueRollups(gold_path: str, touched_dates: list, touched_movies: list) -> tuple:
+    """
+    Daily, movie and genre rollups of the touched dates / movies in pandas
+    (duckdb_engine.revenueRollups runs the same joins as queries).
+
+    Returns:
+        tuple: (daily, movies, genre daily) DataFrames
+    """
+    fact_path = os.path.join(gold_path, "factRevenues")
+
+    # Fact rows of touched dates, enriched with the movie attributes rollups need
+    df = readDates(fact_path, values=touched_dates, columns=['_sk_movie', '_sk_distributor', 'date', 'revenue', 'theaters'])
+
+    dim_movies = readTable(os.path.join(gold_path, "dimMovies"), columns=['_sk_movie', 'imdb_rating', 'is_enriched'])
+
+    df = df.merge(dim_movies, on='_sk_movie', how='left')
+    df['is_enriched'] = df['is_enriched'].fillna(0).astype(int)
+    df['month'] = df['date'].str[:7]
+
+    # daily x distributor
+    df_daily = _rollup(df, ['date', 'month', '_sk_distributor'])
+
+    # movie totals - whole history of touched movies (projected scan of the fact table)
+    df_movie_rows = readTable(fact_path, columns=['_sk_movie', '_sk_distributor', 'date', 'revenue', 'theaters'],
+                              filters=[('_sk_movie', 'in', touched_movies)])
+
+    df_movies = (df_movie_rows
+                 .groupby(['_sk_movie', '_sk_distributor'], dropna=False, observed=True)
+                 .agg(revenue=('revenue', 'sum'),
+                      theaters_sum=('theaters', 'sum'),
+                      theaters_rows=('theaters', 'count'),
+                      rows=('revenue', 'size'),
+                      first_date=('date', 'min'),
+                      last_date=('date', 'max'))
+                 .reset_index())
+
+    # genre x day x distributor - enriched rows only, one row per genre of the movie (bridgeMovieGenre)
+    bridge = (readTable(os.path.join(gold_path, "bridgeMovieGenre"), columns=['_sk_movie', '_sk_genre'])
+              .merge(readTable(os.path.join(gold_path, "dimGenre"), columns=['_sk_genre', 'genre']), on='_sk_genre'))
+
+    df_genre = df[df['is_enriched'] == 1].merge(bridge, on='_sk_movie')
+
+    df_genre_daily = _rollup(df_genre, ['date', '_sk_genre', 'genre', '_sk_distributor'])[[
+        'date', '_sk_genre', 'genre', '_sk_distributor', 'revenue', 'theaters_sum', 'theaters_rows',
+        'rows', 'rating_sum', 'rating_rows']]
+
+    return df_daily, df_movies, df_genre_daily
+
+
+@pipelineRun
+def aggRevenuesGold(pipeline_id: str = "aggRevenues-Gold", full_refresh: bool = False):
+    """
+    Gold -> Gold rollups for the dashboard: recompute the daily, monthly, movie and genre
+    rollups for the dates / movies touched since the last run.
+
+    Args:
+        pipeline_id: Pipeline identifier (config name)
+        full_refresh: True = rebuild all rollups from the fact table
+    """
+    config = readConfig(pipeline_id)
+
+    # Read silver rows changed since last successful run (watermark per silver source).
+    # Capped at what factRevenues / dimMovies already processed, so rollups never run ahead of the model.
+    gold_path = os.path.join(absPath(), config["target"]["path"])
+    fact_path = os.path.join(gold_path, "factRevenues")
+    rollup_path = {key: os.path.join(gold_path, name) for key, name in config["target"]["tables"].items()}
+    rollup_storage = {key: storageConfig(config, name) for key, name in config["target"]["tables"].items()}
+
+    if full_refresh:
+        for path in rollup_path.values():
+            dropTable(path)
+
+    watermark = {
+        'revenues': 0 if full_refresh else getWatermark(pipeline_id, 'revenues'),
+        'omdb': 0 if full_refresh else getWatermark(pipeline_id, 'omdb')
+    }
+    processed = {
+        'revenues': getWatermark('factRevenues-Gold', 'revenues'),
+        'omdb': getWatermark('dimMovies-Gold', 'omdb')
+    }
+
+    df_reve = readTable(os.path.join(absPath(), "data\\02_silver\\revenues"), columns=['title', 'date', '_tf_ingestion_time'],
+                        filters=[('_tf_ingestion_time', '>', watermark['revenues']),
+                                 ('_tf_ingestion_time', '<=', processed['revenues'])])
+    df_omdb = readTable(os.path.join(absPath(), "data\\02_silver\\omdb"), columns=['title', '_tf_ingestion_time'],
+                        filters=[('_tf_ingestion_time', '>', watermark['omdb']),
+                                 ('_tf_ingestion_time', '<=', processed['omdb'])])
+
+    new_watermark = {
+        'revenues': getDeltaWatermark(df_reve, watermark['revenues']),
+        'omdb': getDeltaWatermark(df_omdb, watermark['omdb'])
+    }
+
+    # Touched keys: dates/movies with changed revenues + dates of movies whose OMDB data (genre, rating) changed
+    keys_path = os.path.join(gold_path, "_keys")
+
+    reve_movies = lookupSurrogateKeys(df_reve[['title']].drop_duplicates(), 'title', '_sk_movie',
+                                      os.path.join(keys_path, "_sk_movie.parquet"))
+    omdb_movies = lookupSurrogateKeys(df_omdb[['title']].drop_duplicates(), 'title', '_sk_movie',
+                                      os.path.join(keys_path, "_sk_movie.parquet"))
+
+    touched_movies = sorted(set(reve_movies['_sk_movie']) | set(omdb_movies['_sk_movie']))
+    touched_dates = set(df_reve['date'])
+    if len(omdb_movies):
+        df_enriched_dates = readTable(fact_path, columns=['date'],
+                                      filters=[('_sk_movie', 'in', list(omdb_movies['_sk_movie']))])
+        touched_dates |= set(df_enriched_dates['date'])
+    touched_dates = sorted(touched_dates)
+    touched_months = sorted({date[:7] for date in touched_dates})
+
+    print(f"✓ Touched: {len(touched_dates)} dates, {len(touched_months)} months, {len(touched_movies)} movies")
+
+    engine = engineConfig(config)
+    if engine['name'] == 'duckdb':
+        # joins / aggregations as queries over the gold parquet files
+        import duckdb_engine
+
+        with duckdb_engine.connect(engine) as con:
+            df_daily, df_movies, df_genre_daily = duckdb_engine.revenueRollups(con, gold_path, touched_dates,
+                                                                               touched_movies)
+    else:
+        df_daily, df_movies, df_genre_daily = _revenueRollups(gold_path, touched_dates, touched_movies)
+
+    # daily x distributor - refreshed for touched dates
+    replaceByKey(df_daily, rollup_path['daily'], 'date', touched_dates, storage=rollup_storage['daily'])
+
+    # monthly x distributor - re-summed from the daily rollup for touched months
+    df_month_days = readTable(rollup_path['daily'], filters=[('month', 'in', touched_months)])
+
+    df_monthly = (df_month_days
+                  .groupby(['month', '_sk_distributor'], dropna=False, observed=True)[_ROLLUP_MEASURES]
+                  .sum()
+                  .reset_index())
+
+    replaceByKey(df_monthly, rollup_path['monthly'], 'month', touched_months, storage=rollup_storage['monthly'])
+
+    # movie totals - whole history of touched movies
+    replaceByKey(df_movies, rollup_path['movies'], '_sk_movie', touched_movies, storage=rollup_storage['movies'])
+
+    # genre x day x distributor - enriched rows only
+    replaceByKey(df_genre_daily, rollup_path['genre'], 'date', touched_dates, storage=rollup_storage['genre'])
+
+    updatePipelineStatus(pipeline_id, watermark=new_watermark)
+
+
+# pipeline id (metadata/config/<id>.json) -> function running it
+PIPELINES = {
+    "Revenues-Bronze": revenuesBronze,
+    "OMDB-Bronze": omdbBronze,
+    "Bronze-Compaction": compactBronze,
+    "Revenues-Silver": revenuesSilver,
+    "OMDB-Silver": omdbSilver,
+    "factRevenues-Gold": factRevenuesGold,
+    "dimDistributor-Gold": dimDistributorGold,
+    "dimMovies-Gold": dimMoviesGold,
+    "aggRevenues-Gold": aggRevenuesGold,
+}
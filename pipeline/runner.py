@@ -0,0 +1,276 @@
+"""
+DAG runner for the medallion pipelines.
+
+Builds the dependency graph from metadata/config/*.json ("dependency": id or list of ids),
+runs every pipeline whose dependencies are done in a process pool (independent branches run
+concurrently) and skips pipelines that are up to date according to metadata/status.
+
+Usage (from the repository root or pipeline/):
+    python pipeline/runner.py                       # whole DAG
+    python pipeline/runner.py aggRevenues-Gold      # target + everything upstream of it
+    python pipeline/runner.py --force --workers 2 factRevenues-Gold
+    python pipeline/runner.py --profile mergeSilver,readTable Revenues-Silver
+
+Every run records its stage timings in metadata/runs/ (see instrumentation.py).
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from pathlib import Path
+
+from common_function import absPath, updatePipelineStatus
+
+
+def getDependencies(config: dict) -> list:
+    """
+    Dependencies declared in a pipeline config (missing, a single id or a list of ids).
+
+    Args:
+        config: Pipeline configuration
+
+    Returns:
+        list: Pipeline ids the pipeline depends on
+    """
+    dependency = config.get("dependency")
+    if dependency is None:
+        return []
+    if isinstance(dependency, str):
+        return [dependency]
+    return list(dependency)
+
+
+def loadDag(config_dir: str = "../metadata/config") -> tuple:
+    """
+    Read all pipeline configs and build the dependency graph.
+
+    Args:
+        config_dir: Folder with <pipeline_id>.json configs
+
+    Returns:
+        tuple: (configs by pipeline id, dependencies by pipeline id)
+
+    Raises:
+        ValueError: Unknown dependency, pipeline without implementation or a cycle
+    """
+    from jobs import PIPELINES
+
+    configs = {}
+    for config_file in sorted(Path(config_dir).glob("*.json")):
+        with open(config_file, "r") as f:
+            configs[config_file.stem] = json.load(f)
+
+    dag = {pipeline_id: getDependencies(config) for pipeline_id, config in configs.items()}
+
+    for pipeline_id, dependencies in dag.items():
+        if pipeline_id not in PIPELINES:
+            raise ValueError(f"No job registered for pipeline '{pipeline_id}' (see jobs.PIPELINES)")
+        unknown = [dep for dep in dependencies if dep not in dag]
+        if unknown:
+            raise ValueError(f"Pipeline '{pipeline_id}' depends on unknown pipelines: {unknown}")
+
+    topologicalOrder(dag)
+    return configs, dag
+
+
+def topologicalOrder(dag: dict) -> list:
+    """
+    Order pipelines so every pipeline comes after its dependencies.
+
+    Args:
+        dag: Dependencies by pipeline id
+
+    Returns:
+        list: Pipeline ids in execution order
+
+    Raises:
+        ValueError: If the graph has a cycle
+    """
+    remaining = {pipeline_id: set(dependencies) for pipeline_id, dependencies in dag.items()}
+    order = []
+    while remaining:
+        ready = sorted(pipeline_id for pipeline_id, dependencies in remaining.items() if not dependencies)
+        if not ready:
+            raise ValueError(f"Dependency cycle between pipelines: {sorted(remaining)}")
+        for pipeline_id in ready:
+            del remaining[pipeline_id]
+        for dependencies in remaining.values():
+            dependencies.difference_update(ready)
+        order.extend(ready)
+    return order
+
+
+def upstreamOf(dag: dict, targets: list) -> set:
+    """
+    Targets plus every pipeline they (transitively) depend on.
+    """
+    selected = set()
+    stack = list(targets)
+    while stack:
+        pipeline_id = stack.pop()
+        if pipeline_id not in dag:
+            raise ValueError(f"Unknown pipeline: {pipeline_id}")
+        if pipeline_id not in selected:
+            selected.add(pipeline_id)
+            stack.extend(dag[pipeline_id])
+    return selected
+
+
+def _readStatus(pipeline_id: str) -> dict:
+    status_file = Path(f"../metadata/status/{pipeline_id}.json")
+    if not status_file.exists():
+        return {}
+    try:
+        with open(status_file, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return {}
+
+
+def _lastSuccess(status: dict) -> float:
+    # ISO timestamp keeps microseconds - a dependency finishing in the same second still counts as newer
+    if "last_success_timestamp" in status:
+        return datetime.fromisoformat(status["last_success_timestamp"]).timestamp()
+    return status.get("last_success_timestamp_unix", 0)
+
+
+def isUpToDate(pipeline_id: str, config: dict, dependencies: list) -> bool:
+    """
+    A pipeline is up to date when its last run succeeded after the last success of every
+    dependency and, for file sources, after the source file was last modified.
+
+    Pipelines reading an API (source type "api") and maintenance jobs ("maintenance": true)
+    are never up to date: new API answers (titles left by a run the daily limit cut short)
+    and the age of partitions do not show up in any status or file time.
+
+    Args:
+        pipeline_id: Pipeline identifier
+        config: Pipeline configuration
+        dependencies: Pipeline ids it depends on
+
+    Returns:
+        bool: True if running it again would not see new input
+    """
+    source = config.get("source", {})
+    if source.get("type") == "api" or config.get("maintenance", False):
+        return False
+
+    status = _readStatus(pipeline_id)
+    if status.get("last_run_status") != "success":
+        return False
+    last_success = _lastSuccess(status)
+
+    for dependency in dependencies:
+        if _lastSuccess(_readStatus(dependency)) > last_success:
+            return False
+
+    if source.get("type") in ("csv", "json"):
+        source_path = Path(os.path.join(absPath(), source["path"]))
+        return source_path.exists() and source_path.stat().st_mtime <= last_success
+
+    return len(dependencies) > 0
+
+
+def _runJob(pipeline_id: str) -> float:
+    """Run one pipeline in a worker process, returns its duration in seconds."""
+    from jobs import PIPELINES
+
+    start = time.perf_counter()
+    PIPELINES[pipeline_id](pipeline_id)
+    return time.perf_counter() - start
+
+
+def runDag(targets: list = None, max_workers: int = None, force: bool = False) -> dict:
+    """
+    Run the pipelines of the DAG, independent ones concurrently.
+
+    Every pipeline starts as soon as all its dependencies finished successfully (or were
+    skipped as up to date). A failed pipeline gets 'failed' status and its downstream
+    pipelines are not run.
+
+    Args:
+        targets: Pipeline ids to run (with everything upstream); None = whole DAG
+        max_workers: Size of the process pool (default: min(4, cpu count))
+        force: Run selected pipelines even if they are up to date
+
+    Returns:
+        dict: Outcome per pipeline id ('success', 'skipped', 'failed', 'blocked')
+    """
+    configs, dag = loadDag()
+    selected = upstreamOf(dag, targets) if targets else set(dag)
+    order = [pipeline_id for pipeline_id in topologicalOrder(dag) if pipeline_id in selected]
+    max_workers = max_workers or min(4, os.cpu_count() or 1)
+
+    outcome = {}
+    running = {}
+    pending = list(order)
+
+    print(f"✓ Running {len(order)} pipelines with {max_workers} workers: {', '.join(order)}")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # start everything whose dependencies are finished
+            for pipeline_id in list(pending):
+                dependencies = [dep for dep in dag[pipeline_id] if dep in selected]
+                if any(outcome.get(dep) in ("failed", "blocked") for dep in dependencies):
+                    outcome[pipeline_id] = "blocked"
+                    pending.remove(pipeline_id)
+                    print(f"⚠️  {pipeline_id} not run - upstream pipeline failed")
+                    continue
+                if not all(dep in outcome for dep in dependencies):
+                    continue
+
+                pending.remove(pipeline_id)
+                if not force and isUpToDate(pipeline_id, configs[pipeline_id], dag[pipeline_id]):
+                    outcome[pipeline_id] = "skipped"
+                    print(f"✓ {pipeline_id} is up to date - skipped")
+                    continue
+                running[pool.submit(_runJob, pipeline_id)] = pipeline_id
+                print(f"✓ {pipeline_id} started")
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                pipeline_id = running.pop(future)
+                try:
+                    duration = future.result()
+                    outcome[pipeline_id] = "success"
+                    print(f"✓ {pipeline_id} finished in {duration:.1f}s")
+                except BaseException as e:
+                    outcome[pipeline_id] = "failed"
+                    updatePipelineStatus(pipeline_id, status='failed')
+                    print(f"⚠️  {pipeline_id} failed: {e!r}")
+
+    summary = {state: sum(1 for value in outcome.values() if value == state)
+               for state in ("success", "skipped", "failed", "blocked")}
+    print(f"✓ DAG finished: {summary}")
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the medallion pipelines as a DAG")
+    parser.add_argument("targets", nargs="*", help="pipelines to run with their upstream (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size")
+    parser.add_argument("--force", action="store_true", help="run even if up to date")
+    parser.add_argument("--profile", default=None,
+                        help="stages to run under cProfile, comma separated or '*' (see instrumentation.py)")
+    args = parser.parse_args()
+
+    # read by the worker processes (the pool is started after this)
+    if args.profile:
+        os.environ["PIPELINE_PROFILE"] = args.profile
+
+    # metadata paths are resolved relative to pipeline/, like in the notebooks
+    os.chdir(Path(__file__).resolve().parent)
+
+    outcome = runDag(args.targets or None, max_workers=args.workers, force=args.force)
+    if any(state in ("failed", "blocked") for state in outcome.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
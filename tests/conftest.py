@@ -0,0 +1,19 @@
+"""
+Shared fixtures. The pipeline modules import each other as top-level modules and resolve
+metadata relative to pipeline/, like the notebooks - tests do the same in a scratch project.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "pipeline"))
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Scratch project root (PROJECT_PATH) with pipeline/ as working directory."""
+    (tmp_path / "pipeline").mkdir()
+    monkeypatch.setenv("PROJECT_PATH", str(tmp_path))
+    monkeypatch.chdir(tmp_path / "pipeline")
+    return tmp_path
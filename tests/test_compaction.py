@@ -0,0 +1,127 @@
+import os
+
+import pandas as pd
+import pytest
+
+from common_function import (appendMode, compactTable, readTable, readManifest, tableFiles, MANIFEST,
+                             _liveFiles, _liveRanges, _tableUnits, _writeCompacted)
+
+PARTITION = '_tf_ingestion_time'
+
+
+def appendPartitions(path, values):
+    """One bronze partition per value with two rows each (v = value * 10 + row)."""
+    for value in values:
+        appendMode(pd.DataFrame({PARTITION: [value, value], 'v': [value * 10, value * 10 + 1]}), str(path),
+                   partition_cols=[PARTITION])
+
+
+def rows(path):
+    return sorted(readTable(str(path))['v'].tolist())
+
+
+def expected(values):
+    return sorted(v for value in values for v in (value * 10, value * 10 + 1))
+
+
+def listedRows(path):
+    """Rows as a reader without a manifest sees them (directory listing)."""
+    os.remove(os.path.join(path, MANIFEST))
+    return rows(path)
+
+
+@pytest.fixture
+def bronze(tmp_path):
+    return tmp_path / "bronze"
+
+
+def test_compaction_keeps_every_row_once(bronze):
+    appendPartitions(bronze, range(1000, 1006))
+
+    stats = compactTable(str(bronze), PARTITION, min_age_hours=0)
+
+    assert stats['compacted_units'] == 6 and stats['files_written'] == 1
+    assert rows(bronze) == expected(range(1000, 1006))
+    # superseded partitions are on disk until the next run - readers skip them
+    assert len(tableFiles(str(bronze))) == 1
+    assert len([name for name in os.listdir(bronze) if name.startswith(PARTITION)]) == 6
+
+    stats = compactTable(str(bronze), PARTITION, min_age_hours=0)
+
+    assert stats['removed_units'] == 6
+    assert not [name for name in os.listdir(bronze) if name.startswith(PARTITION)]
+    assert rows(bronze) == expected(range(1000, 1006))
+
+
+def test_recompacting_a_small_compacted_file_with_newer_partitions(bronze):
+    appendPartitions(bronze, range(1000, 1003))
+    compactTable(str(bronze), PARTITION, min_age_hours=0)
+    appendPartitions(bronze, range(1003, 1006))
+
+    # the first compacted file is far under half the target - it is compacted again with 1003-1005
+    compactTable(str(bronze), PARTITION, min_age_hours=0)
+
+    compacted = sorted(os.listdir(bronze / "compacted"))
+    assert [name.split("-")[:2] for name in compacted] == [["1000", "1002"], ["1000", "1005"]]
+    assert rows(bronze) == expected(range(1000, 1006))
+    assert listedRows(bronze) == expected(range(1000, 1006))
+
+
+def test_later_partitions_stay_live_next_to_a_compacted_range(bronze):
+    appendPartitions(bronze, range(1000, 1004))
+    compactTable(str(bronze), PARTITION, min_age_hours=0)
+    appendPartitions(bronze, [1004])
+
+    assert rows(bronze) == expected(range(1000, 1005))
+    assert listedRows(bronze) == expected(range(1000, 1005))
+
+
+def test_live_ranges_drop_nested_ranges():
+    assert _liveRanges([(1000, 1010), (1002, 1004), (1000, 1010), (1011, 1012), (1000, 1002)]) == \
+           [(1000, 1010), (1011, 1012)]
+
+
+def test_live_files_skip_files_inside_a_larger_compacted_range(tmp_path):
+    path = str(tmp_path)
+    outer = os.path.join(path, "compacted", "1000-1010-aaaaaaaa.parquet")
+    nested = os.path.join(path, "compacted", "1002-1004-bbbbbbbb.parquet")
+    covered = os.path.join(path, f"{PARTITION}=1003", "x.parquet")
+    edge = os.path.join(path, f"{PARTITION}=1010", "x.parquet")
+    after = os.path.join(path, f"{PARTITION}=1011", "x.parquet")
+
+    live = _liveFiles(path, [outer, nested, covered, edge, after])
+
+    assert live == [outer, after]
+
+
+def test_retention_drops_only_units_entirely_before_the_cut_off(bronze):
+    appendPartitions(bronze, range(1000, 1003))
+    compactTable(str(bronze), PARTITION, min_age_hours=0)
+    appendPartitions(bronze, range(1003, 1006))
+
+    # the compacted file 1000-1002 lies before the cut-off, partition 1003 does not
+    stats = compactTable(str(bronze), PARTITION, min_age_hours=1e9, retention_before=1003)
+
+    assert stats['expired_units'] == 1
+    assert rows(bronze) == expected(range(1003, 1006))
+
+    # a unit reaching into the retained range is kept whole
+    stats = compactTable(str(bronze), PARTITION, min_age_hours=1e9, retention_before=1004)
+
+    assert stats['expired_units'] == 1
+    assert rows(bronze) == expected(range(1004, 1006))
+
+
+def test_reads_between_rename_and_manifest_update_see_each_row_once(bronze):
+    appendPartitions(bronze, range(1000, 1004))
+    live, _ = _tableUnits(str(bronze))
+
+    # compactTable renames the compacted file into place, then updates the manifest
+    file, written = _writeCompacted(str(bronze), PARTITION, live, row_group_size=100)
+
+    assert written == 8 and os.path.exists(file)
+    # planned from the manifest: still the partitions
+    assert readManifest(str(bronze)).num_rows == 4
+    assert rows(bronze) == expected(range(1000, 1004))
+    # planned from a listing: the compacted file supersedes them
+    assert listedRows(bronze) == expected(range(1000, 1004))
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from common_function import deduplicateRecords, latestRowMask
+
+
+def reference(df, keys, order_by, ascending):
+    """deduplicateRecords before the kernel: sort (nulls last), keep the first row per key."""
+    return set(df.sort_values(by=order_by, ascending=ascending, kind='stable')
+               .drop_duplicates(subset=keys, keep='first')['row'])
+
+
+def randomFrame(seed, rows=400):
+    """Few keys and few order values, so groups hold ties and missing values."""
+    rng = np.random.default_rng(seed)
+    version = rng.integers(0, 4, rows).astype(float)
+    version[rng.random(rows) < 0.2] = np.nan
+    batch = pd.array(rng.choice(["a", "b", "c", None], rows), dtype=pd.StringDtype("pyarrow"))
+    return pd.DataFrame({'row': np.arange(rows),
+                         'id': rng.integers(0, 40, rows),
+                         'date': rng.choice(["2024-01-01", "2024-01-02"], rows),
+                         'version': version,
+                         'batch': batch})
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("ascending", [False, True])
+@pytest.mark.parametrize("order_by", [['version'], ['batch'], ['version', 'batch'], ['batch', 'version']])
+def test_matches_sort_and_drop_duplicates(seed, ascending, order_by):
+    df = randomFrame(seed)
+
+    kept = deduplicateRecords(df, ['id', 'date'], order_by, ascending=ascending)
+
+    assert set(kept['row']) == reference(df, ['id', 'date'], order_by, ascending)
+    assert kept['row'].is_monotonic_increasing
+
+
+def test_ties_keep_the_first_row():
+    df = pd.DataFrame({'row': [0, 1, 2, 3], 'id': [1, 1, 1, 1], 'version': [2, 5, 5, 1]})
+
+    assert deduplicateRecords(df, ['id'], ['version'])['row'].tolist() == [1]
+    assert deduplicateRecords(df, ['id'], ['version'], ascending=True)['row'].tolist() == [3]
+
+
+def test_missing_order_values_lose_unless_the_whole_group_is_missing():
+    df = pd.DataFrame({'row': [0, 1, 2, 3, 4], 'id': [1, 1, 2, 2, 2],
+                       'version': [np.nan, 1.0, np.nan, np.nan, np.nan]})
+
+    assert deduplicateRecords(df, ['id'], ['version'])['row'].tolist() == [1, 2]
+    assert deduplicateRecords(df, ['id'], ['version'], ascending=True)['row'].tolist() == [1, 2]
+
+
+def test_merge_mask_lets_the_later_row_win_ties():
+    # mergeSilver concatenates silver and then the delta - the delta wins equal order values
+    df = pd.DataFrame({'id': [1, 2, 1, 2], 'version': [3, 3, 3, 2]})
+
+    assert latestRowMask(df, ['id'], 'version').tolist() == [False, True, True, False]
+    assert latestRowMask(df, ['id'], 'version', ties='first').tolist() == [True, True, False, False]
@@ -0,0 +1,56 @@
+import hashlib
+import sys
+
+import pandas as pd
+import pytest
+
+from common_function import createHashKey
+
+
+def rowDigests(df, key_columns):
+    """MD5 of every row hashed one by one, as createHashKey documents its keys."""
+    return [hashlib.md5("|".join(str(value) for value in row).encode()).digest()
+            for row in df[key_columns].itertuples(index=False)]
+
+
+@pytest.fixture(params=["duckdb", "hashlib"])
+def hasher(request, monkeypatch):
+    """Hash with duckdb's md5 and with the hashlib fallback (duckdb not installed)."""
+    if request.param == "hashlib":
+        monkeypatch.setitem(sys.modules, "duckdb", None)
+    else:
+        pytest.importorskip("duckdb")
+    return request.param
+
+
+@pytest.fixture
+def keys():
+    return pd.DataFrame({'title': ["Heat", "Alien", None, "Heat", "Amélie"],
+                         'revenue': [1.0, 2.5, None, 1.0, 3.0],
+                         'date': ["2024-01-01", "2024-01-02", "2024-01-02", "2024-01-01", "2024-01-03"]})
+
+
+def test_hex_keys_match_row_by_row_md5(keys, hasher):
+    df = createHashKey(keys.copy(), ['title', 'revenue', 'date'], 'key')
+
+    assert df['key'].tolist() == [digest.hex() for digest in rowDigests(keys, ['title', 'revenue', 'date'])]
+    assert df['key'][0] == df['key'][3]
+
+
+def test_int64_and_binary_keys_are_the_digest(keys, hasher):
+    digests = rowDigests(keys, ['title', 'date'])
+
+    as_int = createHashKey(keys.copy(), ['title', 'date'], 'key', key_format='int64')['key']
+    as_binary = createHashKey(keys.copy(), ['title', 'date'], 'key', key_format='binary')['key']
+
+    assert as_int.dtype == "int64"
+    assert as_int.tolist() == [int.from_bytes(digest[:8], "little", signed=True) for digest in digests]
+    assert str(as_binary.dtype) == "fixed_size_binary[16][pyarrow]"
+    assert as_binary.tolist() == digests
+
+
+@pytest.mark.parametrize("key_format", ["hex", "int64", "binary"])
+def test_empty_frame_gets_an_empty_key_column(key_format, hasher):
+    df = createHashKey(pd.DataFrame({'title': pd.Series([], dtype=object)}), ['title'], 'key', key_format=key_format)
+
+    assert 'key' in df.columns and len(df) == 0
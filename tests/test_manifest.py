@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import common_function
+from common_function import _manifestLock, readManifest, tableFiles, updateManifest
+
+
+def writePart(path, value):
+    """One hive partition file of the table at path, not yet recorded in its manifest."""
+    folder = os.path.join(path, f"date={value}")
+    os.makedirs(folder, exist_ok=True)
+    file = os.path.join(folder, "part-0.parquet")
+    pq.write_table(pa.table({'v': [value]}), file)
+    return file
+
+
+def appendParts(path, values):
+    for value in values:
+        updateManifest(path, added=[writePart(path, value)])
+
+
+def holdLock(path, locked, release):
+    with _manifestLock(path):
+        locked.set()
+        release.wait(10)
+
+
+def dieHoldingLock(path):
+    with _manifestLock(path):
+        os._exit(1)
+
+
+@pytest.fixture
+def table(tmp_path):
+    path = str(tmp_path / "table")
+    os.makedirs(path)
+    updateManifest(path)
+    return path
+
+
+def test_concurrent_writers_lose_no_entries(table):
+    writers = [multiprocessing.Process(target=appendParts, args=(table, range(k * 100, k * 100 + 10)))
+               for k in range(4)]
+    [writer.start() for writer in writers]
+    [writer.join() for writer in writers]
+
+    assert readManifest(table).num_rows == 40
+
+
+def test_lock_times_out_while_held_by_another_process(table):
+    locked, release = multiprocessing.Event(), multiprocessing.Event()
+    holder = multiprocessing.Process(target=holdLock, args=(table, locked, release))
+    holder.start()
+    try:
+        assert locked.wait(10)
+        with pytest.raises(TimeoutError):
+            with _manifestLock(table, timeout=0.2):
+                pass
+    finally:
+        release.set()
+        holder.join()
+
+    with _manifestLock(table, timeout=1):
+        pass
+
+
+def test_lock_of_a_dead_writer_is_released(table):
+    holder = multiprocessing.Process(target=dieHoldingLock, args=(table,))
+    holder.start()
+    holder.join()
+
+    with _manifestLock(table, timeout=1):
+        pass
+
+
+def test_reader_rereads_manifest_swapped_after_its_first_read(table, monkeypatch):
+    old = writePart(table, 1)
+    updateManifest(table, added=[old])
+    stale = readManifest(table)
+    # a writer replaces the file and deletes the old one after the reader read the manifest
+    new = writePart(table, 2)
+    updateManifest(table, added=[new], removed=[old])
+    os.remove(old)
+    # and the next write is under way
+    writePart(table, 3)
+    reads = iter([stale])
+    monkeypatch.setattr(common_function, "readManifest", lambda path: next(reads, None) or readManifest(path))
+
+    assert tableFiles(table) == [new]
+    assert readManifest(table)['file'].to_pylist() == ["date=2/part-0.parquet"]
+
+
+def test_files_deleted_by_hand_are_dropped_without_listing_the_directory(table):
+    appendParts(table, [1, 2])
+    os.remove(os.path.join(table, "date=1", "part-0.parquet"))
+    # written by a writer that has not updated the manifest yet
+    writePart(table, 3)
+
+    files = tableFiles(table)
+
+    assert files == [os.path.join(table, "date=2", "part-0.parquet")]
+    assert readManifest(table)['file'].to_pylist() == ["date=2/part-0.parquet"]
@@ -0,0 +1,60 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common_function import parallelMap
+
+
+def describe(df):
+    """Row-wise transform with a string result - what createHashKey / the genre split do."""
+    return pd.DataFrame({'row': df['row'], 'label': df['title'].str.upper() + "|" + (df['row'] * 2).astype(str)})
+
+
+def slowFirstChunk(df):
+    """The first chunk finishes last, so completion order differs from chunk order."""
+    if df['row'].iloc[0] == 0:
+        time.sleep(0.3)
+    return df.assign(pid=os.getpid())
+
+
+def failOnSecondChunk(df):
+    if df['row'].iloc[0] > 0:
+        raise ValueError("broken chunk")
+    return df
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'row': np.arange(95), 'title': [f"Movie {i % 7}" for i in range(95)]})
+
+
+def test_results_match_a_serial_transform(frame):
+    result = parallelMap(frame, describe, n_workers=2, chunk_rows=10)
+
+    pd.testing.assert_frame_equal(result, describe(frame), check_dtype=False)
+
+
+def test_chunks_are_concatenated_in_chunk_order(frame):
+    result = parallelMap(frame, slowFirstChunk, n_workers=2, chunk_rows=10)
+
+    assert result['row'].tolist() == list(range(95))
+    assert os.getpid() not in set(result['pid'])
+
+
+def test_single_chunk_runs_in_this_process(frame):
+    result = parallelMap(frame, slowFirstChunk, n_workers=2, chunk_rows=100)
+
+    assert set(result['pid']) == {os.getpid()}
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs /dev/shm")
+def test_shared_memory_is_released_when_a_worker_raises(frame):
+    before = set(os.listdir("/dev/shm"))
+
+    with pytest.raises(ValueError, match="broken chunk"):
+        parallelMap(frame, failOnSecondChunk, n_workers=2, chunk_rows=10)
+
+    assert set(os.listdir("/dev/shm")) - before == set()
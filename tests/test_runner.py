@@ -0,0 +1,158 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+import runner
+
+
+def writeStatus(pipeline_id: str, status: str = "success", when: float = None):
+    """Status file as updatePipelineStatus writes it, with the success at when (default: now)."""
+    when = time.time() if when is None else when
+    os.makedirs("../metadata/status", exist_ok=True)
+    record = {"last_run_status": status}
+    if status == "success":
+        record["last_success_timestamp"] = datetime.fromtimestamp(when).isoformat()
+        record["last_success_timestamp_unix"] = int(when)
+    with open(f"../metadata/status/{pipeline_id}.json", "w") as f:
+        json.dump(record, f)
+
+
+# ---------------------------------------------------------------- graph
+
+def test_topological_order_puts_dependencies_first():
+    dag = {"gold": ["silver_a", "silver_b"], "silver_a": ["bronze"], "silver_b": ["bronze"], "bronze": []}
+
+    order = runner.topologicalOrder(dag)
+
+    assert order == ["bronze", "silver_a", "silver_b", "gold"]
+
+
+def test_topological_order_rejects_cycles():
+    dag = {"a": ["c"], "b": ["a"], "c": ["b"], "d": []}
+
+    with pytest.raises(ValueError, match="cycle"):
+        runner.topologicalOrder(dag)
+
+
+def test_load_dag_rejects_unknown_dependency(tmp_path, monkeypatch):
+    import jobs
+
+    (tmp_path / "Revenues-Bronze.json").write_text(json.dumps({"dependency": "Missing-Job"}))
+    monkeypatch.setattr(jobs, "PIPELINES", {"Revenues-Bronze": None})
+
+    with pytest.raises(ValueError, match="unknown pipelines"):
+        runner.loadDag(str(tmp_path))
+
+
+def test_load_dag_rejects_pipeline_without_job(tmp_path, monkeypatch):
+    import jobs
+
+    (tmp_path / "Unregistered.json").write_text(json.dumps({}))
+    monkeypatch.setattr(jobs, "PIPELINES", {})
+
+    with pytest.raises(ValueError, match="No job registered"):
+        runner.loadDag(str(tmp_path))
+
+
+def test_upstream_of_collects_transitive_dependencies():
+    dag = {"gold": ["silver"], "silver": ["bronze"], "bronze": [], "other": ["bronze"]}
+
+    assert runner.upstreamOf(dag, ["gold"]) == {"gold", "silver", "bronze"}
+    assert runner.upstreamOf(dag, ["bronze"]) == {"bronze"}
+    with pytest.raises(ValueError, match="Unknown pipeline"):
+        runner.upstreamOf(dag, ["missing"])
+
+
+# ---------------------------------------------------------------- up to date
+
+def test_file_source_is_up_to_date_until_modified(project):
+    source = project / "revenues.csv"
+    source.write_text("id\n1\n")
+    config = {"source": {"type": "csv", "path": "revenues.csv"}}
+    os.utime(source, (time.time() - 60, time.time() - 60))
+    writeStatus("Revenues-Bronze")
+
+    assert runner.isUpToDate("Revenues-Bronze", config, [])
+
+    os.utime(source, (time.time() + 60, time.time() + 60))
+    assert not runner.isUpToDate("Revenues-Bronze", config, [])
+
+
+def test_missing_source_file_is_not_up_to_date(project):
+    writeStatus("Revenues-Bronze")
+
+    assert not runner.isUpToDate("Revenues-Bronze", {"source": {"type": "csv", "path": "missing.csv"}}, [])
+
+
+def test_newer_dependency_makes_pipeline_stale(project):
+    config = {"source": {"type": "parquet"}}
+    writeStatus("Revenues-Bronze", when=time.time() - 120)
+    writeStatus("Revenues-Silver", when=time.time() - 60)
+
+    assert runner.isUpToDate("Revenues-Silver", config, ["Revenues-Bronze"])
+
+    writeStatus("Revenues-Bronze")
+    assert not runner.isUpToDate("Revenues-Silver", config, ["Revenues-Bronze"])
+
+
+def test_failed_last_run_is_not_up_to_date(project):
+    writeStatus("Revenues-Bronze", when=time.time() - 120)
+    writeStatus("Revenues-Silver", status="failed")
+
+    assert not runner.isUpToDate("Revenues-Silver", {}, ["Revenues-Bronze"])
+
+
+def test_api_source_and_maintenance_jobs_are_never_up_to_date(project):
+    writeStatus("Revenues-Bronze", when=time.time() - 120)
+    writeStatus("OMDB-Bronze")
+    writeStatus("Revenues-Silver", when=time.time() - 120)
+    writeStatus("Bronze-Compaction")
+
+    assert not runner.isUpToDate("OMDB-Bronze", {"source": {"type": "api"}}, ["Revenues-Bronze"])
+    assert not runner.isUpToDate("Bronze-Compaction", {"maintenance": True}, ["Revenues-Silver"])
+
+
+# ---------------------------------------------------------------- runDag
+
+@pytest.fixture
+def fakeDag(project, monkeypatch):
+    """runDag over a fixed graph, jobs run in threads and recorded in ran (failing ids raise)."""
+    dag = {"bronze": [], "silver": ["bronze"], "gold": ["silver"], "side": [], "side_gold": ["side"]}
+    ran, failing = [], set()
+
+    def runJob(pipeline_id):
+        ran.append(pipeline_id)
+        if pipeline_id in failing:
+            raise RuntimeError(f"{pipeline_id} broke")
+        return 0.0
+
+    monkeypatch.setattr(runner, "loadDag", lambda: ({pipeline_id: {} for pipeline_id in dag}, dag))
+    monkeypatch.setattr(runner, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(runner, "_runJob", runJob)
+    return ran, failing
+
+
+def test_run_dag_blocks_downstream_of_failure(fakeDag):
+    ran, failing = fakeDag
+    failing.add("silver")
+
+    outcome = runner.runDag(max_workers=2, force=True)
+
+    assert outcome == {"bronze": "success", "silver": "failed", "gold": "blocked",
+                       "side": "success", "side_gold": "success"}
+    assert "gold" not in ran
+    with open("../metadata/status/silver.json") as f:
+        assert json.load(f)["last_run_status"] == "failed"
+
+
+def test_run_dag_runs_only_targets_and_their_upstream(fakeDag):
+    ran, _ = fakeDag
+
+    outcome = runner.runDag(["silver"], max_workers=1, force=True)
+
+    assert outcome == {"bronze": "success", "silver": "success"}
+    assert ran == ["bronze", "silver"]
@@ -0,0 +1,70 @@
+import pytest
+
+from common_function import TitleIndex, canonicalTitles, matchTitles
+
+
+@pytest.mark.parametrize("title, form", [
+    ("The Lord of the Rings: The Return of the King (2003)", "lord of the rings the return of the king"),
+    ("Thing, The", "thing"),
+    ("An American in Paris", "american in paris"),
+    ("Amélie [2001]", "amelie"),
+    ("Tom & Jerry", "tom and jerry"),
+    ("Schindler's List", "schindlers list"),
+    ("  Se7en  ", "se7en"),
+    ("Blade Runner 2049", "blade runner 2049"),
+    # a lone article is the title itself
+    ("The", "the"),
+    ("!!!", ""),
+])
+def test_canonical_form(title, form):
+    assert canonicalTitles([title]).to_pylist() == [form]
+
+
+def test_canonical_form_keeps_nulls():
+    assert canonicalTitles(["Heat", None]).to_pylist() == ["heat", None]
+
+
+def matches(known, titles, **kwargs):
+    df = TitleIndex(known, **kwargs).match(titles)
+    return {row.title: (row.match_title, row.match_method) for row in df.itertuples()}
+
+
+def test_exact_and_normalized_matches():
+    found = matches(["The Godfather", "Amelie", "The Thing"], ["The Godfather", "godfather (1972)", "Amélie (2001)", "THING"])
+
+    assert found == {"The Godfather": ("The Godfather", "exact"),
+                     "godfather (1972)": ("The Godfather", "normalized"),
+                     "Amélie (2001)": ("Amelie", "normalized"),
+                     "THING": ("The Thing", "normalized")}
+
+
+def test_fuzzy_match_needs_the_similarity_threshold():
+    df = TitleIndex(["Schindler's List"]).match(["Schindlers Lis"])
+
+    assert df.loc[0, 'match_title'] == "Schindler's List" and df.loc[0, 'match_method'] == "fuzzy"
+    assert 0.8 <= df.loc[0, 'match_score'] < 0.85
+    assert matches(["Schindler's List"], ["Schindlers Lis"], min_score=0.85) == {"Schindlers Lis": (None, None)}
+
+
+@pytest.mark.parametrize("known", [["Midnight Expressa", "Midnight Expressb"], ["Midnight Expressb", "Midnight Expressa"]])
+def test_equally_similar_titles_resolve_to_the_smallest(known):
+    assert matches(known, ["Midnight Express"]) == {"Midnight Express": ("Midnight Expressa", "fuzzy")}
+
+
+def test_same_canonical_form_resolves_to_the_smallest_title():
+    assert matches(["Thing, The", "The Thing"], ["thing"]) == {"thing": ("The Thing", "normalized")}
+
+
+@pytest.mark.parametrize("title", ["Blade Runner 2049", "Toy Story 2", "Heat 2", "Titanic", "!!!"])
+def test_titles_that_must_not_match(title):
+    # sequels and remakes differ in their numbers, unrelated and empty titles match nothing
+    found = matches(["Blade Runner", "Toy Story 3", "Heat", "The Godfather"], [title])
+
+    assert found == {title: (None, None)}
+
+
+def test_match_titles_returns_one_row_per_distinct_title():
+    df = matchTitles(["Heat", "Heat", None, "Schindlers Lis"], ["Heat", "Schindler's List"])
+
+    assert df['title'].tolist() == ["Heat", "Schindlers Lis"]
+    assert df['match_method'].tolist() == ["exact", "fuzzy"]